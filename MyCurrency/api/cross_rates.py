@@ -0,0 +1,102 @@
+from decimal import Context, Decimal, ROUND_HALF_EVEN
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DIRECT = 'direct'
+INVERSE = 'inverse'
+CROSS = 'cross'
+
+
+class CrossRateMatrix:
+    """
+    Full currency matrix derived from quotes against a few pivot currencies.
+
+    Every currency gets its value in units per one primary pivot (the first
+    one); other pivots have to be quoted against the primary pivot directly or
+    inversely. A pair a -> b is then value[b] / value[a], computed in a Decimal
+    context of `precision` digits and rounded to `places` decimals - so the
+    result is exact up to the precision of the quotes it is derived from.
+    Quoted pairs keep their quote ('direct'), pivot -> x quotes read backwards
+    are 'inverse', everything else is 'cross' through the pivots on the way.
+    """
+
+    def __init__(self, quotes: Dict[str, Dict[str, Decimal]], pivots: Optional[List[str]] = None,
+                 places: int = 6, rounding: str = ROUND_HALF_EVEN, precision: int = 28,
+                 valuation_date=None):
+        pivots = [pivot for pivot in (pivots or list(quotes)) if pivot in quotes]
+        if not pivots:
+            raise ValueError('no quotes of the pivot currencies')
+        self.quotes = quotes
+        self.valuation_date = valuation_date
+        self.quantum = Decimal(1).scaleb(-places)
+        self.rounding = rounding
+        self.context = Context(prec=precision, rounding=rounding)
+        primary = pivots[0]
+        self._value = {primary: Decimal(1)}
+        self._via = {primary: primary}
+        for pivot in pivots[1:]:
+            if pivot in quotes[primary]:
+                self._value[pivot] = quotes[primary][pivot]
+            elif primary in quotes[pivot]:
+                self._value[pivot] = self.context.divide(1, quotes[pivot][primary])
+            else:
+                continue
+            self._via[pivot] = primary
+        self.pivots = [pivot for pivot in pivots if pivot in self._value]
+        for pivot in self.pivots:
+            pivot_value = self._value[pivot]
+            for target, rate in quotes[pivot].items():
+                if target not in self._value and rate:
+                    self._value[target] = self.context.multiply(pivot_value, rate)
+                    self._via[target] = pivot
+
+    @property
+    def currencies(self) -> List[str]:
+        return list(self._value)
+
+    def has(self, source_currency: str, target_currency: str) -> bool:
+        return source_currency in self._value and target_currency in self._value
+
+    def rate(self, source_currency: str, target_currency: str) -> Decimal:
+        """Rate of the pair, KeyError if one of the currencies is not quoted"""
+        return self._rate(source_currency, target_currency)[0]
+
+    def provenance(self, source_currency: str, target_currency: str) -> Dict:
+        """How the rate was obtained: {'method': direct/inverse/cross, 'pivots': [...]}"""
+        method, pivots = self._rate(source_currency, target_currency)[1:]
+        return {'method': method, 'pivots': list(pivots)}
+
+    def row(self, source_currency: str, targets: Optional[Iterable[str]] = None) -> Dict[str, Decimal]:
+        """Rates of one source against all (or given) currencies"""
+        return {
+            target: self._rate(source_currency, target)[0]
+            for target in (self._value if targets is None else targets)
+            if target != source_currency
+        }
+
+    def matrix(self) -> Dict[Tuple[str, str], Decimal]:
+        """All N x (N - 1) rates keyed by (source, target)"""
+        return {
+            (source, target): rate
+            for source in self._value
+            for target, rate in self.row(source).items()
+        }
+
+    def _rate(self, source_currency: str, target_currency: str) -> Tuple[Decimal, str, Tuple]:
+        value = self._value
+        source_value, target_value = value[source_currency], value[target_currency]
+        quote = self.quotes.get(source_currency, {}).get(target_currency)
+        if quote is not None:
+            return quote.quantize(self.quantum, rounding=self.rounding), DIRECT, (source_currency,)
+        quote = self.quotes.get(target_currency, {}).get(source_currency)
+        if quote:
+            rate = self.context.divide(1, quote)
+            return rate.quantize(self.quantum, rounding=self.rounding), INVERSE, (target_currency,)
+        rate = self.context.divide(target_value, source_value)
+        return rate.quantize(self.quantum, rounding=self.rounding), CROSS, self._route(source_currency, target_currency)
+
+    def _route(self, source_currency: str, target_currency: str) -> Tuple:
+        source_pivot = source_currency if source_currency in self.pivots else self._via[source_currency]
+        target_pivot = target_currency if target_currency in self.pivots else self._via[target_currency]
+        if source_pivot == target_pivot:
+            return source_pivot,
+        return tuple(dict.fromkeys((source_pivot, self.pivots[0], target_pivot)))
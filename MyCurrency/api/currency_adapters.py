@@ -1,11 +1,22 @@
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Optional, Dict, List
-from django.core.cache import cache
-import requests
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Max
 import random
-from api.models import CurrencyExchangeRateProvider, CurrencyExchangeRate, Currency
+import threading
+import time
+import uuid
+from api.cross_rates import CrossRateMatrix
+from api.http_transport import HttpTransport, get_transport
+from api.models import (CurrencyExchangeRateProvider, CurrencyExchangeRate, Currency,
+                        CurrencyExchangeRateSeriesDate)
+
+
+class ProviderError(Exception):
+    """Upstream provider failed or returned unusable data"""
 
 
 class ExchangeRateProviderBase(ABC):
@@ -18,11 +29,27 @@ class ExchangeRateProviderBase(ABC):
                              date_from: datetime, date_to: datetime) -> List[Dict]:
         pass
 
+    def get_rates_for_symbols(self, source_currency: str, target_currencies: List[str],
+                              valuation_date: datetime) -> Dict:
+        """Rates of one base against many targets; providers override it with a single call"""
+        rates = {
+            target: self.get_exchange_rate_data(source_currency, target, valuation_date)['rate_value']
+            for target in target_currencies
+        }
+        return {
+            'source_currency': source_currency,
+            'rates': rates,
+            'date': valuation_date.strftime('%Y-%m-%d'),
+            'provider': None
+        }
+
 
 class CurrencyBeaconProvider(ExchangeRateProviderBase):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, transport: Optional[HttpTransport] = None,
+                 base_url: str = 'https://api.currencybeacon.com/v1'):
         self.api_key = api_key
-        self.base_url = 'https://api.currencybeacon.com/v1'
+        self.base_url = base_url
+        self.transport = transport or get_transport()
 
 
     def get_exchange_rate_data(self, source_currency: str, target_currency: str, valuation_date: datetime)-> Optional[Dict]:
@@ -37,19 +64,39 @@ class CurrencyBeaconProvider(ExchangeRateProviderBase):
                 'symbols': target_currency
             }
 
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
+            response = self.transport.get(endpoint, params=params)
             data = response.json()
             return {
                     'source_currency': source_currency,
                     'target_currency': target_currency,
-                    'rate_value': Decimal(data['rates'][target_currency]),
+                    'rate_value': Decimal(str(data['rates'][target_currency])),
                     'date': date_str,
                     'provider':  'currencybeacon'
             }
 
         except Exception as e:
-            raise Exception(f'CurrencyBeacon API error: {str(e)}')
+            raise ProviderError(f'CurrencyBeacon API error: {str(e)}')
+
+    def get_rates_for_symbols(self, source_currency: str, target_currencies: List[str],
+                              valuation_date: datetime) -> Dict:
+        try:
+            date_str = valuation_date.strftime('%Y-%m-%d')
+            params = {
+                'api_key': self.api_key,
+                'base': source_currency,
+                'date': date_str,
+                'symbols': ','.join(target_currencies)
+            }
+            response = self.transport.get(f'{self.base_url}/historical', params=params)
+            rates = response.json()['rates']
+            return {
+                'source_currency': source_currency,
+                'rates': {curr: Decimal(str(rates[curr])) for curr in target_currencies if curr in rates},
+                'date': date_str,
+                'provider': 'currencybeacon'
+            }
+        except Exception as e:
+            raise ProviderError(f'CurrencyBeacon API error: {str(e)}')
 
     def get_rates_for_period(self, source_currency: str, date_from: datetime,
                                  date_to: datetime) -> List[Dict]:
@@ -61,8 +108,7 @@ class CurrencyBeaconProvider(ExchangeRateProviderBase):
                 'start_date': date_from.strftime('%Y-%m-%d'),
                 'end_date': date_to.strftime('%Y-%m-%d')
             }
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
+            response = self.transport.get(endpoint, params=params)
             data = response.json()
             return [
                 {
@@ -73,7 +119,7 @@ class CurrencyBeaconProvider(ExchangeRateProviderBase):
                 } for date, rates in data.items()
             ]
         except Exception as e:
-            raise Exception(f'CurrencyBeacon API error: {str(e)}')
+            raise ProviderError(f'CurrencyBeacon API error: {str(e)}')
 
 
 class MockExchangeRateProvider(ExchangeRateProviderBase):
@@ -89,6 +135,18 @@ class MockExchangeRateProvider(ExchangeRateProviderBase):
             'provider': 'mock'
         }
 
+    def get_rates_for_symbols(self, source_currency: str, target_currencies: List[str],
+                              valuation_date: datetime) -> Dict:
+        return {
+            'source_currency': source_currency,
+            'rates': {
+                curr: Decimal(str(round(random.uniform(0.5, 2.0), 6)))
+                for curr in target_currencies
+            },
+            'date': valuation_date.strftime('%Y-%m-%d'),
+            'provider': 'mock'
+        }
+
     def get_rates_for_period(self, source_currency: str, date_from: datetime,
                             date_to: datetime, provider: str = None) -> List[Dict]:
 
@@ -113,26 +171,108 @@ class MockExchangeRateProvider(ExchangeRateProviderBase):
         return rates
 
 
+PROVIDERS_VERSION_KEY = 'exchange_rate_providers_version'
+# cache alias shared by all worker processes, holds only the providers version
+PROVIDERS_CACHE = 'exchange_rates'
+_STALE = object()
+
+
+def as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def missing_ranges(present, date_from: date, date_to: date, merge_days: int = 0) -> List[tuple]:
+    """
+    Coalesced (first, last) ranges of the dates from date_from to date_to which are
+    not in present; gaps separated by at most merge_days present dates are joined
+    """
+    one_day = timedelta(days=1)
+    ranges = []
+    day = date_from
+    while day <= date_to:
+        if day in present:
+            day += one_day
+            continue
+        start = day
+        while day <= date_to and day not in present:
+            day += one_day
+        if ranges and (start - ranges[-1][1]).days - 1 <= merge_days:
+            ranges[-1] = (ranges[-1][0], day - one_day)
+        else:
+            ranges.append((start, day - one_day))
+    return ranges
+
+
 class ExchangeRateService:
+    """
+    Use ExchangeRateService.instance() - one service per process keeps the
+    provider registry in memory. The registry is rebuilt only when the
+    providers version in the shared PROVIDERS_CACHE changes (invalidate_providers(),
+    called on provider save/delete). Other processes look at the version at
+    most every EXCHANGE_RATE_PROVIDERS_CHECK_INTERVAL seconds, so requests
+    in between run no queries at all.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
     def __init__(self):
         self._provider_instance = {}
         self._provider_order = []
+        self._version = _STALE
+        self._checked_at = 0.0
         self.refresh_providers()
 
+    @classmethod
+    def instance(cls) -> 'ExchangeRateService':
+        """Process-wide service with an up to date provider registry"""
+        service = cls._shared
+        if service is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+                service = cls._shared
+        service.ensure_fresh()
+        return service
+
+    @classmethod
+    def invalidate_providers(cls):
+        """Mark provider registries of all processes as outdated"""
+        caches[PROVIDERS_CACHE].set(PROVIDERS_VERSION_KEY, uuid.uuid4().hex, None)
+        if cls._shared is not None:
+            cls._shared._version = _STALE
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._version is not _STALE and now - self._checked_at < getattr(
+                settings, 'EXCHANGE_RATE_PROVIDERS_CHECK_INTERVAL', 1.0):
+            return
+        self._checked_at = now
+        if self._version is _STALE or caches[PROVIDERS_CACHE].get(PROVIDERS_VERSION_KEY) != self._version:
+            self.refresh_providers()
+
     def refresh_providers(self):
+        # version is read first - a change during the rebuild triggers another one
+        version = caches[PROVIDERS_CACHE].get(PROVIDERS_VERSION_KEY)
         providers = CurrencyExchangeRateProvider.objects.filter(is_active=True).order_by('-priority')
 
-        self._provider_instance = {}
-        self._provider_order = []
+        provider_instance = {}
+        provider_order = []
 
-        if providers.exists():
-            for provider in providers:
-                if provider.name == 'currencybeacon':
-                    self._provider_instance['currencybeacon'] = CurrencyBeaconProvider(provider.api_key)
-                    self._provider_order.append('currencybeacon')
-        else:
-            self._provider_instance['mock'] = MockExchangeRateProvider()
-            self._provider_order = ['mock']
+        for provider in providers:
+            if provider.name == 'currencybeacon':
+                provider_instance['currencybeacon'] = CurrencyBeaconProvider(provider.api_key)
+                provider_order.append('currencybeacon')
+        if not providers:
+            provider_instance['mock'] = MockExchangeRateProvider()
+            provider_order = ['mock']
+
+        # swapped in at once - concurrent requests see the old or the new registry
+        self._provider_instance, self._provider_order = provider_instance, provider_order
+        self._version = version
 
     def _get_provider(self, provider_name: Optional[str] = None) -> ExchangeRateProviderBase:
         if provider_name:
@@ -148,6 +288,14 @@ class ExchangeRateService:
 
         return MockExchangeRateProvider()
 
+    def _resolve_provider(self, provider_name: Optional[str] = None) -> tuple:
+        """(name, instance) of the given provider, the highest priority active one by default"""
+        if not provider_name:
+            if not self._provider_order:
+                raise ProviderError('No supported exchange rate provider is active.')
+            provider_name = self._provider_order[0]
+        return provider_name, self._get_provider(provider_name)
+
     def get_exchange_rate_data(self, source_currency: str, target_currency: str,
                                valuation_date: datetime, provider: str = None) -> Dict:
         """Get exchange rate data with caching"""
@@ -157,12 +305,15 @@ class ExchangeRateService:
         if cached_data:
             return cached_data
 
-        provider_instance = self._get_provider(provider)
+        provider_name, provider_instance = self._resolve_provider(provider)
         rate_data = provider_instance.get_exchange_rate_data(
             source_currency, target_currency, valuation_date
         )
 
         cache.set(cache_key, rate_data, 3600)
+        # random mock rates are never stored
+        if isinstance(provider_instance, MockExchangeRateProvider):
+            return rate_data
 
         CURRENCY_METADATA = {
             'USD': {'name': 'US Dollar', 'symbol': '$'},
@@ -182,8 +333,6 @@ class ExchangeRateService:
         )
 
         # Get provider object
-        provider_name = provider or self._provider_order[0]
-
         source_currency_obj, _ = Currency.objects.get_or_create(
             code=source_currency,
             defaults=CURRENCY_METADATA.get(source_currency, {'name': source_currency, 'symbol': source_currency})
@@ -210,26 +359,205 @@ class ExchangeRateService:
                 'rate_value': rate_data['rate_value'],
             }
         )
+        if source_currency in self.cross_rate_config['pivots']:
+            self.invalidate_cross_rates(valuation_date)
 
         return rate_data
 
+    def refresh_rates(self, currencies: List[str], valuation_date: datetime,
+                      provider: str = None, batch_size: int = 1000,
+                      bases: Optional[List[str]] = None) -> Dict:
+        """
+        Fetch rates of all currency pairs (or only of the given base currencies, e.g. the
+        cross rate pivots) with one provider call per base currency and store them with
+        bulk upserts. Returns {'stored': count, 'failed': {base: error}}
+        """
+        provider_name, provider_instance = self._resolve_provider(provider)
+        if isinstance(provider_instance, MockExchangeRateProvider):
+            raise ProviderError('Rates of the mock provider are not stored, activate a real provider.')
+        currency_objs = Currency.for_codes(list(currencies) + list(bases or []))
+        provider_obj, _ = CurrencyExchangeRateProvider.objects.get_or_create(
+            name=provider_name,
+            defaults={
+                'priority': 0,
+                'is_active': False,
+                'api_key': ''
+            }
+        )
+        valuation_day = valuation_date.date() if isinstance(valuation_date, datetime) else valuation_date
+        rows = []
+        failed = {}
+        stored = 0
+        for base in bases or currencies:
+            targets = [target for target in currencies if target != base]
+            try:
+                data = provider_instance.get_rates_for_symbols(base, targets, valuation_date)
+            except Exception as e:
+                failed[base] = str(e)
+                continue
+            for target, rate in data['rates'].items():
+                rows.append(CurrencyExchangeRate(
+                    source_currency=currency_objs[base],
+                    target_currency=currency_objs[target],
+                    valuation_date=valuation_day,
+                    provider=provider_obj,
+                    rate_value=rate
+                ))
+            if len(rows) >= batch_size:
+                stored += self._upsert_rates(rows)
+                rows = []
+        if rows:
+            stored += self._upsert_rates(rows)
+        self.invalidate_cross_rates(valuation_day)
+        return {'stored': stored, 'failed': failed}
+
+    @staticmethod
+    def _upsert_rates(rows: List[CurrencyExchangeRate]) -> int:
+        CurrencyExchangeRate.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['source_currency', 'target_currency', 'valuation_date', 'provider'],
+            update_fields=['rate_value']
+        )
+        return len(rows)
+
+    @property
+    def cross_rate_config(self) -> Dict:
+        config = {'pivots': ['USD'], 'places': 6, 'rounding': 'ROUND_HALF_EVEN', 'precision': 28}
+        config.update(getattr(settings, 'EXCHANGE_RATE_CROSS', {}))
+        return config
+
+    def _cross_rates_key(self, valuation_date) -> str:
+        day = valuation_date.date() if isinstance(valuation_date, datetime) else valuation_date
+        return f"cross_rates_{'_'.join(self.cross_rate_config['pivots'])}_{day or 'latest'}"
+
+    def invalidate_cross_rates(self, valuation_date=None):
+        cache.delete_many([self._cross_rates_key(None), self._cross_rates_key(valuation_date)])
+
+    def get_cross_rates(self, valuation_date=None) -> Optional[CrossRateMatrix]:
+        """
+        Full rate matrix derived from the stored quotes of the pivot currencies
+        (EXCHANGE_RATE_CROSS setting) on valuation_date, the latest date by default
+        """
+        cache_key = self._cross_rates_key(valuation_date)
+        matrix = cache.get(cache_key)
+        if matrix is not None:
+            return matrix
+
+        config = self.cross_rate_config
+        rows = CurrencyExchangeRate.objects.filter(source_currency__code__in=config['pivots'])
+        if valuation_date is None:
+            valuation_date = rows.aggregate(latest=Max('valuation_date'))['latest']
+            if valuation_date is None:
+                return None
+        quotes = {}
+        # lower priority first - quotes of the preferred provider overwrite them
+        for source, target, rate in rows.filter(valuation_date=valuation_date).order_by(
+                'provider__priority').values_list('source_currency__code', 'target_currency__code', 'rate_value'):
+            quotes.setdefault(source, {})[target] = rate
+        if not quotes:
+            return None
+
+        matrix = CrossRateMatrix(quotes, config['pivots'], places=config['places'],
+                                 rounding=config['rounding'], precision=config['precision'],
+                                 valuation_date=valuation_date)
+        cache.set(cache_key, matrix, 3600)
+        return matrix
+
     def get_rates_for_period(self, source_currency: str, date_from: datetime,
                              date_to: datetime, provider: str = None) -> List[Dict]:
-        """Get exchange rates for a period with caching"""
-        cache_key = f"rates_{source_currency}_{date_from}_{date_to}_{provider or 'default'}"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return cached_data
-
-        provider_instance = self._get_provider(provider)
-        rates_data = provider_instance.get_rates_for_period(
-            source_currency, date_from, date_to
+        """
+        Get exchange rates for a period (up to today) - dates whose full timeseries was fetched
+        before are served from the DB, only the other dates are fetched (in coalesced ranges,
+        EXCHANGE_RATE_GAP_MERGE_DAYS) and stored. Dates with rates stored only for some pairs
+        (get_exchange_rate_data, refresh_rates) count as missing. Fetched days before today
+        are complete even without rates (weekends, holidays); today is fetched again until it
+        is over. Mock provider rates are returned but not stored.
+        """
+        today = date.today()
+        date_from, date_to = as_date(date_from), min(as_date(date_to), today)
+        provider_name, provider_instance = self._resolve_provider(provider)
+        persist = not isinstance(provider_instance, MockExchangeRateProvider)
+
+        complete = set(CurrencyExchangeRateSeriesDate.objects.filter(
+            source_currency__code=source_currency,
+            provider__name=provider_name,
+            valuation_date__range=(date_from, date_to)
+        ).values_list('valuation_date', flat=True))
+        rates_by_date = {}
+        if complete:
+            rows = CurrencyExchangeRate.objects.filter(
+                source_currency__code=source_currency,
+                provider__name=provider_name,
+                valuation_date__in=complete
+            ).values_list('valuation_date', 'target_currency__code', 'rate_value')
+            for day, target, rate in rows:
+                rates_by_date.setdefault(day, {})[target] = rate
+
+        merge_days = getattr(settings, 'EXCHANGE_RATE_GAP_MERGE_DAYS', 2)
+        for gap_from, gap_to in missing_ranges(complete, date_from, date_to, merge_days):
+            fetched = provider_instance.get_rates_for_period(source_currency, gap_from, gap_to)
+            fetched = {
+                as_date(item['date']): item['rates'] for item in fetched
+                if item['rates'] and gap_from <= as_date(item['date']) <= gap_to
+            }
+            if persist:
+                # days before today are final, also the ones without rates
+                complete_to = min(gap_to, today - timedelta(days=1))
+                self._store_period(source_currency, provider_name, fetched, [
+                    gap_from + timedelta(days=offset) for offset in range((complete_to - gap_from).days + 1)])
+            rates_by_date.update(fetched)
+
+        return [
+            {
+                'source_currency': source_currency,
+                'rates': rates_by_date[day],
+                'date': day.strftime('%Y-%m-%d'),
+                'provider': provider_name
+            } for day in sorted(rates_by_date)
+        ]
+
+    def _store_period(self, source_currency: str, provider_name: str,
+                      rates_by_date: Dict[date, Dict], complete_days: List[date],
+                      batch_size: int = 1000):
+        if not rates_by_date and not complete_days:
+            return
+        targets = {target for rates in rates_by_date.values() for target in rates}
+        currency_objs = Currency.for_codes(targets | {source_currency})
+        provider_obj, _ = CurrencyExchangeRateProvider.objects.get_or_create(
+            name=provider_name,
+            defaults={
+                'priority': 0,
+                'is_active': False,
+                'api_key': ''
+            }
         )
-        cache.set(cache_key, rates_data, 3600)
-
-        return rates_data
-
-
-
-
+        rows = [
+            CurrencyExchangeRate(
+                source_currency=currency_objs[source_currency],
+                target_currency=currency_objs[target],
+                valuation_date=day,
+                provider=provider_obj,
+                rate_value=rate
+            )
+            for day, rates in rates_by_date.items()
+            for target, rate in rates.items()
+            if target != source_currency
+        ]
+        for start in range(0, len(rows), batch_size):
+            self._upsert_rates(rows[start:start + batch_size])
+        CurrencyExchangeRateSeriesDate.objects.bulk_create(
+            [
+                CurrencyExchangeRateSeriesDate(
+                    source_currency=currency_objs[source_currency],
+                    provider=provider_obj,
+                    valuation_date=day
+                )
+                for day in complete_days
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        if source_currency in self.cross_rate_config['pivots']:
+            for day in rates_by_date:
+                self.invalidate_cross_rates(day)
@@ -0,0 +1,106 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    pass
+
+
+class HttpTransport:
+    """
+    Shared HTTP client of the provider adapters:
+    - one requests.Session with pooled keep-alive connections per host
+    - connect and read timeouts on every call
+    - bounded retries of connection errors, timeouts and 429/5xx with
+      full-jitter exponential backoff (Retry-After is honoured), limited
+      by max_retries and retry_deadline seconds
+    - at most max_in_flight calls at once in the process; a call waits
+      up to acquire_timeout seconds for a slot
+    """
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 10,
+                 max_retries: int = 3, backoff: float = 0.25, max_backoff: float = 5,
+                 retry_deadline: float = 30, max_in_flight: int = 32,
+                 acquire_timeout: float = 10, pool_connections: int = 10,
+                 pool_maxsize: int = 32):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_deadline = retry_deadline
+        self.acquire_timeout = acquire_timeout
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.session = requests.Session()
+        # retries are done here, so that they release the in-flight slot while waiting
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """GET with retries; raises requests exceptions of the last attempt or TransportError"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self._send(url, params)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self._can_retry(attempt, started):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or not self._can_retry(attempt, started):
+                    response.raise_for_status()
+                    return response
+                retry_after = self._retry_after(response)
+                response.close()
+            time.sleep(self._delay(attempt, retry_after))
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+    def _send(self, url: str, params: Optional[Dict]) -> requests.Response:
+        if not self._in_flight.acquire(timeout=self.acquire_timeout):
+            raise TransportError('too many HTTP requests in flight')
+        try:
+            return self.session.get(url, params=params, timeout=self.timeout)
+        finally:
+            self._in_flight.release()
+
+    def _can_retry(self, attempt: int, started: float) -> bool:
+        return attempt < self.max_retries and time.monotonic() - started < self.retry_deadline
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Process-wide transport, configured by the EXCHANGE_RATE_HTTP setting"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport(**getattr(settings, 'EXCHANGE_RATE_HTTP', {}))
+    return _transport
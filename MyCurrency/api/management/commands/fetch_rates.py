@@ -1,21 +1,37 @@
-from django.core.management.base import BaseCommand
-from api.currency_adapters import ExchangeRateService  # Adjust import as needed
-from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from api.currency_adapters import ExchangeRateService, ProviderError  # Adjust import as needed
+from api.models import Currency
+from datetime import datetime
+
+DEFAULT_CURRENCIES = ['USD', 'EUR', 'GBP']
+
 
 class Command(BaseCommand):
     help = 'Fetches exchange rates from CurrencyBeacon'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--currencies', help='comma separated codes, default: all stored currencies')
+        parser.add_argument('--date', help='valuation date YYYY-MM-DD, default: today')
+        parser.add_argument('--provider', help='provider name, default: the highest priority one')
+        parser.add_argument('--pivots-only', action='store_true',
+                            help='fetch only the quotes of the cross rate pivots, other pairs are derived')
+
     def handle(self, *args, **kwargs):
-        service = ExchangeRateService()
-        today = datetime.today()
-        currencies = ['USD', 'EUR', 'GBP']  # customize as needed
+        service = ExchangeRateService.instance()
+        today = datetime.strptime(kwargs['date'], '%Y-%m-%d') if kwargs['date'] else datetime.today()
+        if kwargs['currencies']:
+            currencies = [code.strip().upper() for code in kwargs['currencies'].split(',')]
+        else:
+            currencies = list(Currency.objects.filter(is_deleted=False).values_list('code', flat=True))
+            currencies = currencies or DEFAULT_CURRENCIES
 
-        for base in currencies:
-            for target in currencies:
-                if base != target:
-                    self.stdout.write(f'Fetching rate {base} -> {target}')
-                    try:
-                        service.get_exchange_rate_data(base, target, today)
-                        self.stdout.write(self.style.SUCCESS(f'Success: {base} -> {target}'))
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f'Failed: {base} -> {target}: {e}'))
+        self.stdout.write(f'Fetching rates of {len(currencies)} currencies')
+        # one provider call per base currency, rows written with bulk upserts
+        bases = service.cross_rate_config['pivots'] if kwargs['pivots_only'] else None
+        try:
+            result = service.refresh_rates(currencies, today, kwargs['provider'], bases=bases)
+        except ProviderError as e:
+            raise CommandError(str(e))
+        for base, error in result['failed'].items():
+            self.stdout.write(self.style.ERROR(f'Failed: {base}: {error}'))
+        self.stdout.write(self.style.SUCCESS(f"Stored {result['stored']} rates"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyExchangeRateSeriesDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valuation_date', models.DateField()),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.currencyexchangerateprovider')),
+                ('source_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.currency')),
+            ],
+            options={
+                'unique_together': {('source_currency', 'provider', 'valuation_date')},
+            },
+        ),
+    ]
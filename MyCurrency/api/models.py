@@ -21,21 +21,40 @@ class ProtectedModel(models.Model):
     class Meta:
         abstract = True
 
+CURRENCY_INFO = {
+    'USD': ('United States Dollar', '$'),
+    'EUR': ('Euro', '€'),
+    'GBP': ('British Pound', '£'),
+}
+
 class Currency(ProtectedModel):
     code = models.CharField(max_length=3, unique=True)
     name = models.CharField(max_length=100, blank=True)
     symbol = models.CharField(max_length=10, blank=True)
 
     def save(self, *args, **kwargs):
-        currency_info = {
-            'USD': ('United States Dollar', '$'),
-            'EUR': ('Euro', '€'),
-            'GBP': ('British Pound', '£'),
-        }
-        if self.code in currency_info:
-            self.name, self.symbol = currency_info[self.code]
+        if self.code in CURRENCY_INFO:
+            self.name, self.symbol = CURRENCY_INFO[self.code]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def for_codes(cls, codes) -> dict:
+        """Currencies by code, missing ones are created with one bulk insert"""
+        codes = set(codes)
+        currencies = {currency.code: currency for currency in cls.objects.filter(code__in=codes)}
+        missing = [
+            cls(code=code, name=CURRENCY_INFO.get(code, (code, code))[0],
+                symbol=CURRENCY_INFO.get(code, (code, code))[1])
+            for code in codes - currencies.keys()
+        ]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            currencies.update(
+                (currency.code, currency)
+                for currency in cls.objects.filter(code__in=[c.code for c in missing])
+            )
+        return currencies
+
     class Meta:
         verbose_name_plural = "currencies"
     def __str__(self):
@@ -65,3 +84,14 @@ class CurrencyExchangeRate(models.Model):
     def __str__(self):
         return f"{self.source_currency.code}/{self.target_currency.code}: {self.rate_value} ({self.valuation_date})"
 
+
+class CurrencyExchangeRateSeriesDate(models.Model):
+    """A date whose full timeseries of a source currency was fetched from a provider"""
+    source_currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
+    provider = models.ForeignKey(CurrencyExchangeRateProvider, on_delete=models.CASCADE)
+    valuation_date = models.DateField()
+    class Meta:
+        unique_together = ('source_currency', 'provider', 'valuation_date')
+    def __str__(self):
+        return f"{self.source_currency.code} from {self.provider.name} ({self.valuation_date})"
+
@@ -18,7 +18,7 @@ class CurrencyExchangeRateSerializer(serializers.ModelSerializer):
         model = CurrencyExchangeRate
         fields = ['id', 'source_currency', 'target_currency', 'valuation_date', 'rate_value', 'provider']
 
-class ConversionSerializer(serializers.ModelSerializer):
+class ConversionSerializer(serializers.Serializer):
     source_currency = serializers.CharField(max_length=3)
     target_currency = serializers.CharField(max_length=3)
     amount = serializers.DecimalField(max_digits=18, decimal_places=2)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.currency_adapters import ExchangeRateService
+from api.models import CurrencyExchangeRate, CurrencyExchangeRateProvider
+
+
+@receiver([post_save, post_delete], sender=CurrencyExchangeRateProvider)
+def invalidate_provider_registry(sender, **kwargs):
+    # after commit, so other workers do not rebuild from the old rows
+    transaction.on_commit(ExchangeRateService.invalidate_providers)
+
+
+@receiver([post_save, post_delete], sender=CurrencyExchangeRate)
+def invalidate_cross_rate_matrix(sender, instance, **kwargs):
+    # a changed quote may feed the cached cross rate matrix of its date
+    valuation_date = instance.valuation_date
+    transaction.on_commit(lambda: ExchangeRateService.instance().invalidate_cross_rates(valuation_date))
@@ -1,3 +1,474 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import requests
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.cross_rates import CrossRateMatrix
+from api.currency_adapters import (CurrencyBeaconProvider, ExchangeRateProviderBase, ExchangeRateService,
+                                   MockExchangeRateProvider, PROVIDERS_CACHE,
+                                   PROVIDERS_VERSION_KEY, ProviderError, missing_ranges)
+from api.http_transport import HttpTransport, TransportError
+from api.models import (Currency, CurrencyExchangeRate, CurrencyExchangeRateProvider,
+                        CurrencyExchangeRateSeriesDate)
+
+
+class FixedRateProvider(ExchangeRateProviderBase):
+    """Provider with a fixed rate which records its calls, its rates are stored"""
+
+    def __init__(self, rate='1.5', closed_days=()):
+        self.rate = Decimal(rate)
+        self.closed_days = set(closed_days)
+        self.calls = []
+
+    def get_exchange_rate_data(self, source_currency, target_currency, valuation_date):
+        return {
+            'source_currency': source_currency,
+            'target_currency': target_currency,
+            'rate_value': self.rate,
+            'date': valuation_date.strftime('%Y-%m-%d'),
+            'provider': 'mock'
+        }
+
+    def get_rates_for_period(self, source_currency, date_from, date_to, provider=None):
+        self.calls.append((date_from, date_to))
+        days = (date_to - date_from).days + 1
+        return [
+            {
+                'source_currency': source_currency,
+                'rates': {'EUR': self.rate, 'GBP': self.rate},
+                'date': (date_from + timedelta(days=offset)).strftime('%Y-%m-%d'),
+                'provider': 'mock'
+            } for offset in range(days)
+            if date_from + timedelta(days=offset) not in self.closed_days
+        ]
+
+    def get_rates_for_symbols(self, source_currency, target_currencies, valuation_date):
+        self.calls.append(source_currency)
+        return {
+            'source_currency': source_currency,
+            'rates': {target: self.rate for target in target_currencies},
+            'date': valuation_date.strftime('%Y-%m-%d'),
+            'provider': 'mock'
+        }
+
+
+def use_provider(provider) -> ExchangeRateService:
+    ExchangeRateService._shared = None
+    service = ExchangeRateService.instance()
+    service._provider_instance = {'mock': provider}
+    service._provider_order = ['mock']
+    return service
+
+
+class StandInServer:
+    """Local HTTP server answering with queued (status, headers, body, delay) responses"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                status, headers, body, delay = (
+                    server.responses.pop(0) if server.responses else (200, {}, {}, 0))
+                time.sleep(delay)
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except ConnectionError:
+                    pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def respond(self, status=200, body=None, headers=None, delay=0):
+        self.responses.append((status, headers or {}, body or {}, delay))
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ExchangeRateServiceRegistryTests(TestCase):
+    def setUp(self):
+        ExchangeRateService._shared = None
+
+    def test_instance_is_shared_and_runs_no_queries(self):
+        service = ExchangeRateService.instance()
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertIs(ExchangeRateService.instance(), service)
+
+    def test_provider_save_and_delete_bump_version(self):
+        self.assertEqual(ExchangeRateService.instance()._provider_order, ['mock'])
+        with self.captureOnCommitCallbacks(execute=True):
+            provider = CurrencyExchangeRateProvider.objects.create(
+                name='currencybeacon', api_key='key', priority=1)
+        saved_version = caches[PROVIDERS_CACHE].get(PROVIDERS_VERSION_KEY)
+        self.assertIsNotNone(saved_version)
+        self.assertEqual(ExchangeRateService.instance()._provider_order, ['currencybeacon'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            provider.delete()
+        self.assertNotEqual(caches[PROVIDERS_CACHE].get(PROVIDERS_VERSION_KEY), saved_version)
+        self.assertEqual(ExchangeRateService.instance()._provider_order, ['mock'])
+
+    @override_settings(EXCHANGE_RATE_PROVIDERS_CHECK_INTERVAL=0)
+    def test_version_bumped_by_another_worker_rebuilds_registry(self):
+        service = ExchangeRateService.instance()
+        # a provider saved by another process: row and version changed, local state not
+        CurrencyExchangeRateProvider.objects.bulk_create([
+            CurrencyExchangeRateProvider(name='currencybeacon', api_key='key')
+        ])
+        self.assertEqual(ExchangeRateService.instance()._provider_order, ['mock'])
+        caches[PROVIDERS_CACHE].set(PROVIDERS_VERSION_KEY, 'other-worker', None)
+        self.assertIs(ExchangeRateService.instance(), service)
+        self.assertEqual(service._provider_order, ['currencybeacon'])
+
+
+class HttpTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        self.transport = HttpTransport(backoff=0.01, read_timeout=0.5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.close()
+
+    def test_retries_503_and_429_with_retry_after(self):
+        self.server.respond(503)
+        self.server.respond(429, headers={'Retry-After': '0.3'})
+        self.server.respond(200, {'ok': True})
+        started = time.monotonic()
+        response = self.transport.get(self.server.url + '/x')
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+    def test_gives_up_after_max_retries(self):
+        for _ in range(5):
+            self.server.respond(503)
+        with self.assertRaises(requests.HTTPError):
+            HttpTransport(max_retries=2, backoff=0.01).get(self.server.url + '/x')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_retry_deadline(self):
+        for _ in range(5):
+            self.server.respond(503)
+        with self.assertRaises(requests.HTTPError):
+            HttpTransport(max_retries=10, retry_deadline=0).get(self.server.url + '/x')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_read_timeout(self):
+        self.server.respond(200, delay=1)
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            HttpTransport(read_timeout=0.2, max_retries=0).get(self.server.url + '/slow')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_in_flight_limit(self):
+        transport = HttpTransport(max_in_flight=1, acquire_timeout=0.1, max_retries=0)
+        self.server.respond(200, delay=0.5)
+        slow = threading.Thread(target=transport.get, args=(self.server.url + '/slow',))
+        slow.start()
+        time.sleep(0.1)
+        with self.assertRaises(TransportError):
+            transport.get(self.server.url + '/x')
+        slow.join()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_currency_beacon_parsing(self):
+        provider = CurrencyBeaconProvider('key', transport=self.transport, base_url=self.server.url)
+        self.server.respond(200, {'rates': {'EUR': 0.91}})
+        self.server.respond(200, {'rates': {'EUR': 0.91, 'GBP': 0.79}})
+        rate = provider.get_exchange_rate_data('USD', 'EUR', datetime(2024, 3, 5))
+        self.assertEqual(rate['rate_value'], Decimal('0.91'))
+        self.assertEqual(rate['date'], '2024-03-05')
+        rates = provider.get_rates_for_symbols('USD', ['EUR', 'GBP'], datetime(2024, 3, 5))
+        self.assertEqual(rates['rates'], {'EUR': Decimal('0.91'), 'GBP': Decimal('0.79')})
+        query = parse_qs(urlparse(self.server.requests[1]).query)
+        self.assertEqual(query['symbols'], ['EUR,GBP'])
+        self.assertEqual(query['base'], ['USD'])
+        self.assertEqual(urlparse(self.server.requests[1]).path, '/historical')
+
+
+class RefreshRatesTests(TestCase):
+    def test_one_provider_call_per_base(self):
+        provider = FixedRateProvider()
+        service = use_provider(provider)
+        codes = ['USD', 'EUR', 'GBP', 'CHF', 'JPY']
+        result = service.refresh_rates(codes, datetime(2024, 3, 5))
+        self.assertEqual(result, {'stored': 20, 'failed': {}})
+        self.assertEqual(provider.calls, codes)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 20)
+        self.assertEqual(Currency.objects.get(code='EUR').name, 'Euro')
+
+        provider.calls = []
+        service.refresh_rates(codes, datetime(2024, 3, 5), bases=['USD'])
+        self.assertEqual(provider.calls, ['USD'])
+
+    def test_rerun_updates_rows_in_place(self):
+        provider = FixedRateProvider('1.5')
+        service = use_provider(provider)
+        service.refresh_rates(['USD', 'EUR', 'GBP'], datetime(2024, 3, 5))
+        ids = set(CurrencyExchangeRate.objects.values_list('id', flat=True))
+        provider.rate = Decimal('2.25')
+        service.refresh_rates(['USD', 'EUR', 'GBP'], datetime(2024, 3, 5))
+        self.assertEqual(set(CurrencyExchangeRate.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(
+            set(CurrencyExchangeRate.objects.values_list('rate_value', flat=True)), {Decimal('2.25')})
+
+
+class CrossRateTests(TestCase):
+    QUOTES = {
+        'USD': {'EUR': Decimal('0.9'), 'GBP': Decimal('0.8'), 'JPY': Decimal('150')},
+        'EUR': {'CHF': Decimal('0.95'), 'USD': Decimal('1.1111')},
+    }
+
+    def test_rates_and_provenance(self):
+        matrix = CrossRateMatrix(self.QUOTES, ['USD', 'EUR'])
+        expected = {
+            ('USD', 'JPY'): (Decimal('150'), 'direct', ['USD']),
+            ('EUR', 'USD'): (Decimal('1.1111'), 'direct', ['EUR']),
+            ('JPY', 'USD'): (Decimal('0.006667'), 'inverse', ['USD']),
+            ('EUR', 'GBP'): (Decimal('0.888889'), 'cross', ['EUR', 'USD']),
+            ('GBP', 'JPY'): (Decimal('187.5'), 'cross', ['USD']),
+            # CHF is quoted only by the non-primary pivot EUR
+            ('GBP', 'CHF'): (Decimal('1.06875'), 'cross', ['USD', 'EUR']),
+            ('CHF', 'EUR'): (Decimal('1.052632'), 'inverse', ['EUR']),
+        }
+        for (source, target), (rate, method, pivots) in expected.items():
+            self.assertEqual(matrix.rate(source, target), rate)
+            self.assertEqual(matrix.provenance(source, target), {'method': method, 'pivots': pivots})
+        self.assertEqual(len(matrix.matrix()), 5 * 4)
+        self.assertFalse(matrix.has('USD', 'AUD'))
+
+    def test_precision_policy(self):
+        matrix = CrossRateMatrix(self.QUOTES, ['USD'], places=2, precision=3)
+        self.assertEqual(matrix.rate('JPY', 'GBP'), Decimal('0.01'))
+        self.assertEqual(matrix.rate('EUR', 'JPY'), Decimal('167'))
+        self.assertEqual(CrossRateMatrix(self.QUOTES, ['USD']).rate('EUR', 'JPY'), Decimal('166.666667'))
+
+    @override_settings(EXCHANGE_RATE_CROSS={'pivots': ['USD'], 'places': 4, 'precision': 2})
+    def test_service_applies_cross_rate_settings(self):
+        service = use_provider(FixedRateProvider('3'))
+        service.refresh_rates(['USD', 'EUR', 'GBP'], datetime(2024, 3, 5), bases=['USD'])
+        matrix = service.get_cross_rates()
+        self.assertEqual(matrix.context.prec, 2)
+        self.assertEqual(matrix.rate('EUR', 'GBP'), Decimal('1.0000'))
+        self.assertEqual(str(matrix.valuation_date), '2024-03-05')
+
+
+@override_settings(EXCHANGE_RATE_CROSS={'pivots': ['USD']})
+class ConvertViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        use_provider(FixedRateProvider('1.5')).refresh_rates(
+            ['USD', 'EUR', 'GBP'], datetime(2024, 3, 5), bases=['USD'])
+        self.provider_id = CurrencyExchangeRate.objects.first().provider_id
+
+    def convert(self, source, target, amount='10'):
+        response = self.client.post(
+            '/exchange-rate/convert/', {'source_currency': source, 'target_currency': target, 'amount': amount})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def store_rate(self, source, target, valuation_date, rate):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/exchange-rate/', {
+                'source_currency': Currency.objects.get(code=source).id,
+                'target_currency': Currency.objects.get(code=target).id,
+                'valuation_date': valuation_date, 'rate_value': rate, 'provider': self.provider_id})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def test_derived_rate_without_stored_pair(self):
+        data = self.convert('EUR', 'GBP')
+        self.assertEqual(Decimal(str(data['rate'])), Decimal('1'))
+        self.assertEqual(data['provenance'], {'method': 'cross', 'pivots': ['USD']})
+
+    def test_direct_rate_wins_unless_pivot_quotes_are_newer(self):
+        self.store_rate('EUR', 'GBP', '2024-03-04', '0.85')
+        self.assertEqual(self.convert('EUR', 'GBP')['provenance']['method'], 'cross')
+
+        self.store_rate('EUR', 'GBP', '2024-03-05', '0.86')
+        data = self.convert('EUR', 'GBP')
+        self.assertEqual(Decimal(str(data['rate'])), Decimal('0.86'))
+        self.assertEqual(Decimal(str(data['converted_amount'])), Decimal('8.6'))
+        self.assertEqual(data['provenance'], {'method': 'direct', 'pivots': ['EUR']})
+
+    def test_rate_writes_invalidate_matrix(self):
+        self.assertEqual(Decimal(str(self.convert('EUR', 'GBP')['rate'])), Decimal('1'))
+        rate = CurrencyExchangeRate.objects.get(source_currency__code='USD', target_currency__code='GBP')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/exchange-rate/{rate.id}/', {'rate_value': '3'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(str(self.convert('EUR', 'GBP')['rate'])), Decimal('2'))
+
+        # newer pivot quotes stored through the API replace the matrix
+        self.store_rate('USD', 'EUR', '2024-03-06', '2')
+        self.store_rate('USD', 'GBP', '2024-03-06', '1')
+        data = self.convert('EUR', 'GBP')
+        self.assertEqual(Decimal(str(data['rate'])), Decimal('0.5'))
+        self.assertEqual(data['date'], '2024-03-06')
+
+    def test_unknown_pair_and_invalid_input(self):
+        self.assertEqual(self.convert('EUR', 'JPY'), {'error': 'No exchange rate found for the given currency pair'})
+        response = self.client.post('/exchange-rate/convert/', {'source_currency': 'EUR', 'target_currency': 'GBP'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RatesForPeriodTests(TestCase):
+    def test_missing_ranges(self):
+        present = {date(2024, 1, 3), date(2024, 1, 10)}
+        self.assertEqual(missing_ranges(present, date(2024, 1, 1), date(2024, 1, 12)), [
+            (date(2024, 1, 1), date(2024, 1, 2)),
+            (date(2024, 1, 4), date(2024, 1, 9)),
+            (date(2024, 1, 11), date(2024, 1, 12)),
+        ])
+        self.assertEqual(missing_ranges(present, date(2024, 1, 1), date(2024, 1, 12), 1), [
+            (date(2024, 1, 1), date(2024, 1, 12)),
+        ])
+        self.assertEqual(missing_ranges(present, date(2024, 1, 3), date(2024, 1, 3)), [])
+
+    def test_fetches_only_gaps(self):
+        provider = FixedRateProvider()
+        service = use_provider(provider)
+        first = service.get_rates_for_period('USD', '2024-01-10', '2024-01-20')
+        self.assertEqual(len(first), 11)
+        with self.settings(EXCHANGE_RATE_GAP_MERGE_DAYS=0):
+            service.get_rates_for_period('USD', date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(provider.calls, [
+            (date(2024, 1, 10), date(2024, 1, 20)),
+            (date(2024, 1, 1), date(2024, 1, 9)),
+            (date(2024, 1, 21), date(2024, 1, 31)),
+        ])
+        with self.assertNumQueries(2):
+            rates = service.get_rates_for_period('USD', '2024-01-05', '2024-01-25')
+        self.assertEqual(len(provider.calls), 3)
+        self.assertEqual([item['date'] for item in rates][::20], ['2024-01-05', '2024-01-25'])
+        self.assertEqual(rates[0]['rates'], {'EUR': Decimal('1.5'), 'GBP': Decimal('1.5')})
+
+    def test_single_pair_rows_do_not_hide_other_targets(self):
+        provider = FixedRateProvider()
+        service = use_provider(provider)
+        service.get_exchange_rate_data('USD', 'EUR', datetime(2024, 3, 5))
+        rates = service.get_rates_for_period('USD', '2024-03-05', '2024-03-05')
+        self.assertEqual(provider.calls, [(date(2024, 3, 5), date(2024, 3, 5))])
+        self.assertEqual(set(rates[0]['rates']), {'EUR', 'GBP'})
+
+    def test_future_dates_are_not_fetched(self):
+        provider = FixedRateProvider()
+        service = use_provider(provider)
+        today = date.today()
+        service.get_rates_for_period('USD', today - timedelta(days=1), today + timedelta(days=30))
+        self.assertEqual(provider.calls, [(today - timedelta(days=1), today)])
+
+    def test_empty_days_are_complete_but_today_is_not(self):
+        weekend = {date(2024, 3, 2), date(2024, 3, 3)}
+        provider = FixedRateProvider(closed_days=weekend)
+        service = use_provider(provider)
+        rates = service.get_rates_for_period('USD', '2024-03-01', '2024-03-04')
+        self.assertEqual([item['date'] for item in rates], ['2024-03-01', '2024-03-04'])
+        self.assertEqual(CurrencyExchangeRateSeriesDate.objects.count(), 4)
+        service.get_rates_for_period('USD', '2024-03-01', '2024-03-04')
+        self.assertEqual(len(provider.calls), 1)
+
+        today = date.today()
+        service.get_rates_for_period('USD', today, today)
+        service.get_rates_for_period('USD', today, today)
+        self.assertEqual(provider.calls[1:], [(today, today), (today, today)])
+        self.assertFalse(CurrencyExchangeRateSeriesDate.objects.filter(valuation_date=today).exists())
+
+    def test_mock_provider_rates_are_not_stored(self):
+        service = use_provider(MockExchangeRateProvider())
+        Currency.for_codes(['USD', 'EUR'])
+        rates = service.get_rates_for_period('USD', '2024-03-01', '2024-03-02')
+        self.assertEqual(len(rates), 2)
+        service.get_exchange_rate_data('USD', 'EUR', datetime(2024, 3, 1))
+        with self.assertRaises(ProviderError):
+            service.refresh_rates(['USD', 'EUR'], datetime(2024, 3, 1))
+        self.assertFalse(CurrencyExchangeRate.objects.exists())
+        self.assertFalse(CurrencyExchangeRateSeriesDate.objects.exists())
+
+    def test_no_active_provider(self):
+        cache.clear()
+        service = use_provider(FixedRateProvider())
+        service._provider_instance, service._provider_order = {}, []
+        for call in (lambda: service.get_rates_for_period('USD', '2024-03-01', '2024-03-01'),
+                     lambda: service.refresh_rates(['USD', 'EUR'], datetime(2024, 3, 1)),
+                     lambda: service.get_exchange_rate_data('USD', 'EUR', datetime(2024, 3, 1))):
+            with self.assertRaisesMessage(ProviderError, 'No supported exchange rate provider'):
+                call()
+
+
+class GetExchangeRateViewTests(TestCase):
+    URL = '/exchange-rate/get_exchange_rate/'
+
+    def setUp(self):
+        Currency.for_codes(['USD'])
+
+    def test_rejects_unknown_source_currency(self):
+        provider = FixedRateProvider()
+        use_provider(provider)
+        response = self.client.get(self.URL, {
+            'source_currency': 'XYZ', 'date_from': '2024-03-01', 'date_to': '2024-03-03'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(provider.calls, [])
+        self.assertEqual(list(Currency.objects.values_list('code', flat=True)), ['USD'])
+
+    def test_fills_gaps_and_serves_rows(self):
+        provider = FixedRateProvider()
+        use_provider(provider)
+        response = self.client.get(self.URL, {
+            'source_currency': 'USD', 'date_from': '2024-03-01', 'date_to': '2024-03-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 6)
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_rejects_malformed_and_too_long_ranges(self):
+        provider = FixedRateProvider()
+        use_provider(provider)
+        for date_from, date_to in [('2024-13-01', '2024-03-01'), ('2020-01-01', '2024-01-01'),
+                                   ('2024-03-02', '2024-03-01')]:
+            response = self.client.get(self.URL, {
+                'source_currency': 'USD', 'date_from': date_from, 'date_to': date_to})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(provider.calls, [])
+
+    def test_provider_error_is_logged_and_stored_rows_served(self):
+        provider = FixedRateProvider()
+        service = use_provider(provider)
+        service.get_rates_for_period('USD', '2024-03-01', '2024-03-01')
+
+        def failing(*args, **kwargs):
+            raise ProviderError('upstream down')
+
+        provider.get_rates_for_period = failing
+        with self.assertLogs('api.views', 'WARNING'):
+            response = self.client.get(self.URL, {
+                'source_currency': 'USD', 'date_from': '2024-03-01', 'date_to': '2024-03-02'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
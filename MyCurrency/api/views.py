@@ -1,4 +1,6 @@
-from datetime import datetime
+import logging
+from datetime import date, datetime
+from django.conf import settings
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
@@ -9,7 +11,9 @@ from api.models import Currency, CurrencyExchangeRate, CurrencyExchangeRateProvi
 from api.serializers import  (CurrencySerializer,
                               CurrencyExchangeRateSerializer,
                               ConversionSerializer, CurrencyExchangeRateProviderSerializer)
-from api.currency_adapters import ExchangeRateService
+from api.currency_adapters import ExchangeRateService, ProviderError
+
+logger = logging.getLogger(__name__)
 
 
 class CurrencyViewSet(viewsets.ModelViewSet):
@@ -36,11 +40,9 @@ class CurrencyExchangeRateProviderViewSet(viewsets.ModelViewSet):
             )
 
         provider.priority = priority
+        # post_save invalidates the provider registry of every worker
         provider.save()
 
-        exchange_rate_service = ExchangeRateService()
-        exchange_rate_service.refresh_providers()
-
         return Response(self.get_serializer(provider).data)
 
 
@@ -49,8 +51,7 @@ class CurrencyExchangeRateViewSet(viewsets.ModelViewSet):
     serializer_class = CurrencyExchangeRateSerializer
 
     def get_exchange_rate_service(self):
-        return ExchangeRateService()
-    # exchange_rate_service = ExchangeRateService()
+        return ExchangeRateService.instance()
 
     @action(detail=False, methods=['GET'])
     def get_exchange_rate(self, request):
@@ -63,6 +64,31 @@ class CurrencyExchangeRateViewSet(viewsets.ModelViewSet):
                 {'error': 'source_currency, date_from and date_to are required parameters'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            day_from, day_to = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        except ValueError:
+            return Response(
+                {'error': 'date_from and date_to must be YYYY-MM-DD dates'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not Currency.objects.filter(code=source_currency, is_deleted=False).exists():
+            return Response(
+                {'error': f'Unknown source_currency {source_currency}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_days = getattr(settings, 'EXCHANGE_RATE_MAX_PERIOD_DAYS', 366)
+        if day_to < day_from or (day_to - day_from).days >= max_days:
+            return Response(
+                {'error': f'date_to must be within {max_days} days after date_from'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            # stores the dates missing in the DB, the stored ones are not fetched again
+            self.get_exchange_rate_service().get_rates_for_period(source_currency, day_from, day_to)
+        except ProviderError:
+            # provider unavailable - serve what is stored
+            logger.warning('filling rates of %s from %s to %s failed', source_currency,
+                           day_from, day_to, exc_info=True)
         try:
             rates = CurrencyExchangeRate.objects.filter(
                 source_currency__code=source_currency,
@@ -82,26 +108,39 @@ class CurrencyExchangeRateViewSet(viewsets.ModelViewSet):
             source_currency = serializer.validated_data['source_currency']
             target_currency = serializer.validated_data['target_currency']
             amount = serializer.validated_data['amount']
-            try:
-                latest_rate = CurrencyExchangeRate.objects.filter(
-                    source_currency__code=source_currency,
-                    target_currency__code=target_currency
-                ).latest('valuation_date')
-                converted_amount = amount * latest_rate.rate_value
+            latest_rate = CurrencyExchangeRate.objects.filter(
+                source_currency__code=source_currency,
+                target_currency__code=target_currency
+            ).order_by('-valuation_date', '-provider__priority').first()
+            cross_rates = self.get_exchange_rate_service().get_cross_rates()
+            # a stored direct rate wins unless the pivot quotes are newer
+            if cross_rates is not None and cross_rates.has(source_currency, target_currency) and (
+                    latest_rate is None or latest_rate.valuation_date < cross_rates.valuation_date):
+                rate = cross_rates.rate(source_currency, target_currency)
                 return Response({
                     'source_currency': source_currency,
                     'target_currency': target_currency,
                     'amount': amount,
-                    'converted_amount': converted_amount,
-                    'rate': latest_rate.rate_value,
-                    'date': latest_rate.valuation_date,
+                    'converted_amount': amount * rate,
+                    'rate': rate,
+                    'date': cross_rates.valuation_date,
+                    'provenance': cross_rates.provenance(source_currency, target_currency),
                 })
-            except CurrencyExchangeRate.DoesNotExist:
+            if latest_rate is None:
                 return Response(
                     {
                         'error': 'No exchange rate found for the given currency pair'
                     }
                 )
+            return Response({
+                'source_currency': source_currency,
+                'target_currency': target_currency,
+                'amount': amount,
+                'converted_amount': amount * latest_rate.rate_value,
+                'rate': latest_rate.rate_value,
+                'date': latest_rate.valuation_date,
+                'provenance': {'method': 'direct', 'pivots': [source_currency]},
+            })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
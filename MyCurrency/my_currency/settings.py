@@ -84,6 +84,22 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by all worker processes, only for the exchange rate providers
+    # version (table created by the api 0002 migration)
+    'exchange_rates': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_cache',
+    },
+}
+
+# How often (seconds) a process checks the shared providers version
+EXCHANGE_RATE_PROVIDERS_CHECK_INTERVAL = 1.0
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,3 +140,27 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Shared HTTP transport of exchange rate providers (api.http_transport.HttpTransport)
+EXCHANGE_RATE_HTTP = {
+    'connect_timeout': 3.05,
+    'read_timeout': 10,
+    'max_retries': 3,
+    'max_in_flight': 32,
+}
+
+# Cross rates (api.cross_rates.CrossRateMatrix) - pairs derived from quotes of the pivot currencies
+EXCHANGE_RATE_CROSS = {
+    'pivots': ['USD', 'EUR'],
+    'places': 6,
+    'rounding': 'ROUND_HALF_EVEN',
+    # digits of the Decimal context the rates are derived in
+    'precision': 28,
+}
+
+# get_rates_for_period fetches missing dates in ranges; gaps separated by up to this
+# many stored dates are fetched with one provider call
+EXCHANGE_RATE_GAP_MERGE_DAYS = 2
+
+# Longest date range get_exchange_rate accepts (missing dates in it are fetched)
+EXCHANGE_RATE_MAX_PERIOD_DAYS = 366
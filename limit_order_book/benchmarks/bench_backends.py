@@ -0,0 +1,84 @@
+"""
+Compares SortedDict and PriceLadder backends of LimitOrderBook on the
+same seeded order flow and checks that both produce identical results,
+then compares the two containers alone on level churn (create / delete
+a level and read the best one).
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_backends [number_of_messages]
+"""
+import random
+import sys
+import time
+
+from sortedcontainers import SortedDict
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.data_structures.price_ladder import PriceLadder
+from benchmarks.flow_generator import generate_flow, run
+
+MIN_PRICE = 9_000
+MAX_PRICE = 11_000
+
+
+def compare_backends(n_messages: int, seed: int = 7) -> dict:
+    flow = generate_flow(n_messages, seed)
+    sorted_lob = LimitOrderBook(log_events=False)
+    ladder_lob = LimitOrderBook(
+        log_events=False, backend='ladder',
+        min_price=MIN_PRICE, max_price=MAX_PRICE
+    )
+    sorted_time, sorted_trades = run(sorted_lob, flow)
+    ladder_time, ladder_trades = run(ladder_lob, flow)
+    assert sorted_trades == ladder_trades
+    assert sorted_lob.order_status == ladder_lob.order_status
+    assert list(sorted_lob.buy_orders) == list(ladder_lob.buy_orders)
+    assert list(sorted_lob.sell_orders) == list(ladder_lob.sell_orders)
+    return {
+        'messages': n_messages,
+        'trades': len(sorted_trades),
+        'sorted_msgs_per_sec': round(n_messages / sorted_time),
+        'ladder_msgs_per_sec': round(n_messages / ladder_time),
+        'speedup': round(sorted_time / ladder_time, 2),
+    }
+
+
+def compare_levels(n_operations: int, width: int, seed: int = 7) -> dict:
+    """
+    Level churn without the book - every operation creates or deletes a
+    level at a random price of a width ticks wide grid and reads the
+    best level
+    Returns:
+        operations per second of both containers
+
+    """
+    generator = random.Random(seed)
+    prices = [
+        MIN_PRICE + generator.randrange(width) for _ in range(n_operations)
+    ]
+    result = {'operations': n_operations, 'width': width}
+    for name, book in (
+            ('sorted', SortedDict()),
+            ('ladder', PriceLadder(MIN_PRICE, MIN_PRICE + width))):
+        start = time.perf_counter()
+        for price in prices:
+            if price in book:
+                del book[price]
+            else:
+                book[price] = None
+            if book:
+                book.peekitem(0)
+        result[f'{name}_ops_per_sec'] = round(
+            n_operations / (time.perf_counter() - start)
+        )
+    result['speedup'] = round(
+        result['ladder_ops_per_sec'] / result['sorted_ops_per_sec'], 2
+    )
+    return result
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    print(compare_backends(n))
+    for width in (200, 2_000, 20_000):
+        print(compare_levels(n, width))
@@ -0,0 +1,34 @@
+"""
+Compares per-message add_order/cancel_order calls with process_batch
+on the same seeded order flow.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_batch [number_of_messages]
+"""
+import sys
+import time
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from benchmarks.flow_generator import batch_columns, generate_flow, run
+
+
+def compare(n_messages: int, seed: int = 7) -> dict:
+    flow = generate_flow(n_messages, seed)
+    columns = batch_columns(flow)
+    single_time, trades = run(LimitOrderBook(log_events=False), flow)
+    lob = LimitOrderBook(log_events=False)
+    start = time.perf_counter()
+    result = lob.process_batch(*columns)
+    batch_time = time.perf_counter() - start
+    assert len(result) == len(trades)
+    return {
+        'messages': n_messages,
+        'single_msgs_per_sec': round(n_messages / single_time),
+        'batch_msgs_per_sec': round(n_messages / batch_time),
+        'speedup': round(single_time / batch_time, 2),
+    }
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    print(compare(n))
@@ -0,0 +1,166 @@
+"""
+Load generator of the order-entry gateway - measures round-trip time
+from sending a message to its first execution report at a fixed rate.
+
+The gateway runs in a child process unless --port of a running one is
+given, so the clients and the matching loop do not share one core.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_gateway [--rate 10000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+from benchmarks.bench_suite import percentile
+from benchmarks.flow_generator import FlowGenerator, CANCEL
+from src.data_structures.order_pool import SIDE_CODES
+from src.gateway.client import GatewayClient
+from src.gateway.protocol import (
+    MSG_ADD, MSG_CANCEL, REPORT_ACCEPTED, REPORT_REJECTED, REPORT_CANCELLED,
+    REPORT_CANCEL_REJECTED
+)
+
+# report kinds answering a message -> message type they answer
+ANSWERS = {
+    REPORT_ACCEPTED: MSG_ADD,
+    REPORT_REJECTED: MSG_ADD,
+    REPORT_CANCELLED: MSG_CANCEL,
+    REPORT_CANCEL_REJECTED: MSG_CANCEL,
+}
+
+
+async def run_client(
+        host: str,
+        port: int,
+        rate: float,
+        seconds: float,
+        seed: int,
+        latencies: list
+) -> int:
+    """
+    To send seeded FlowGenerator flow at a fixed rate
+    Args:
+        host: gateway address
+        port: gateway port
+        rate: messages per second of this client
+        seconds: duration of sending
+        seed: seed of the flow
+        latencies: list to append round-trip times in ns to
+
+    Returns:
+        number of sent messages
+
+    """
+    sent_at = {}
+    pending = asyncio.Event()
+
+    def on_report(report):
+        message_type = ANSWERS.get(report[0])
+        if message_type is None:
+            return
+        started = sent_at.pop((message_type, report[1]), None)
+        if started is not None:
+            latencies.append(time.perf_counter_ns() - started)
+            if not sent_at:
+                pending.set()
+
+    client = GatewayClient(on_report)
+    await client.connect(host, port)
+    generator = FlowGenerator(seed=seed)
+    sent = 0
+    start = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+        due = int(rate * elapsed) - sent
+        if due > 0:
+            now = time.perf_counter_ns()
+            for kind, message in generator.generate(due):
+                order_id = message[1].encode()
+                if kind == CANCEL:
+                    sent_at[MSG_CANCEL, order_id] = now
+                    client.cancel(order_id)
+                else:
+                    sent_at[MSG_ADD, order_id] = now
+                    client.add(
+                        order_id, SIDE_CODES[message[2]], message[3],
+                        message[4]
+                    )
+            sent += due
+            await client.drain()
+        await asyncio.sleep(0.001)
+    if sent_at:
+        pending.clear()
+        try:
+            await asyncio.wait_for(pending.wait(), 10)
+        except asyncio.TimeoutError:
+            pass
+    await client.close()
+    return sent
+
+
+async def load(host: str, port: int, rate: float, seconds: float,
+               clients: int, seed: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    sent = await asyncio.gather(*(
+        run_client(host, port, rate / clients, seconds, seed + index,
+                   latencies)
+        for index in range(clients)
+    ))
+    duration = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'clients': clients,
+        'messages': sum(sent),
+        'answered': len(latencies),
+        'msgs_per_sec': round(sum(sent) / duration),
+        'rtt_p50_us': round(percentile(latencies, 0.5) / 1000, 1),
+        'rtt_p99_us': round(percentile(latencies, 0.99) / 1000, 1),
+        'rtt_p999_us': round(percentile(latencies, 0.999) / 1000, 1),
+        'rtt_max_us': round(latencies[-1] / 1000, 1) if latencies else 0,
+    }
+
+
+def _serve(connection) -> None:
+    from src.gateway.__main__ import serve
+    asyncio.run(serve('127.0.0.1', 0, 1024, connection.send))
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description='gateway load generator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--rate', type=float, default=10_000)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    server = None
+    port = args.port
+    if port is None:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        server = multiprocessing.Process(
+            target=_serve, args=(sender,), daemon=True
+        )
+        server.start()
+        port = receiver.recv()
+    try:
+        result = asyncio.run(load(
+            args.host, port, args.rate, args.seconds, args.clients,
+            args.seed
+        ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+    print(result)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures BookManager throughput for an increasing number of worker
+processes on the same multi-symbol order flow.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_manager [messages] [symbols] [max_workers]
+"""
+import os
+import sys
+import time
+
+from src.algorithms.book_manager import BookManager
+from benchmarks.flow_generator import generate_flow
+
+
+def multi_symbol_flow(n_messages: int, n_symbols: int) -> tuple:
+    symbols = [f'SYM{i}' for i in range(n_symbols)]
+    flow = [
+        (symbols[i % n_symbols],) + message
+        for i, message in enumerate(generate_flow(n_messages))
+    ]
+    return symbols, flow
+
+
+def measure(symbols: list, flow: list, workers: int) -> float:
+    with BookManager(symbols, workers=workers) as manager:
+        add_order, cancel_order = manager.add_order, manager.cancel_order
+        start = time.perf_counter()
+        for message in flow:
+            if message[1] == 'add':
+                add_order(message[0], *message[2:])
+            else:
+                cancel_order(message[0], message[2])
+        manager.flush()
+        elapsed = time.perf_counter() - start
+        manager.reports()
+    return len(flow) / elapsed
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    n_symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    symbol_list, messages = multi_symbol_flow(n, n_symbols)
+    results = {'in_process': round(measure(symbol_list, messages, 0))}
+    workers = 1
+    while workers <= max_workers:
+        results[f'workers_{workers}'] = round(
+            measure(symbol_list, messages, workers)
+        )
+        workers *= 2
+    print({'messages': n, 'symbols': n_symbols, 'msgs_per_sec': results})
@@ -0,0 +1,44 @@
+"""
+Measures bytes per resting order of LimitOrderBook.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_memory [number_of_orders]
+"""
+import sys
+import tracemalloc
+
+from src.algorithms.limit_order_book import LimitOrderBook
+
+
+def bytes_per_resting_order(n_orders: int, n_levels: int = 1000) -> dict:
+    """
+    Filling one side of a book with n_orders non-crossing orders spread
+    over n_levels price levels and measuring allocated memory.
+    Order id strings are created before measuring - they are owned by
+    the caller and shared with the order_status id table.
+    """
+    order_ids = [f'ORD{i}' for i in range(n_orders)]
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    lob = LimitOrderBook(capacity=n_orders, log_events=False)
+    for i, order_id in enumerate(order_ids):
+        lob.add_order(order_id, 'buy', 1 + i % n_levels, 10)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pool = lob.pool
+    pool_bytes = (
+        8 + pool.prices.itemsize + pool.quantities.itemsize
+        + pool.prev.itemsize + pool.next.itemsize + 1
+    )
+    return {
+        'orders': n_orders,
+        'levels': n_levels,
+        'bytes_total': used - base,
+        'bytes_per_order': round((used - base) / n_orders, 1),
+        'pool_bytes_per_order': pool_bytes,
+    }
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(bytes_per_resting_order(n))
@@ -0,0 +1,55 @@
+"""
+Measures snapshot write and restart (snapshot load + journal tail
+replay) time of LimitOrderBook.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_restore [resting_orders] [journal_tail]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.persistence.journal import Journal
+from src.persistence.snapshot import write_snapshot, restore
+from benchmarks.flow_generator import generate_flow, run
+
+
+def measure(n_orders: int, tail: int) -> dict:
+    lob = LimitOrderBook(capacity=n_orders, log_events=False)
+    add_order = lob.add_order
+    for i in range(n_orders):
+        if i % 2:
+            add_order(f'S{i}', 'sell', 10_001 + i % 500, 10)
+        else:
+            add_order(f'B{i}', 'buy', 9_999 - i % 500, 10)
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'book.snapshot')
+        journal_path = os.path.join(directory, 'book.journal')
+        with Journal(journal_path, fsync_every=1000) as journal:
+            lob.add_listener(journal)
+            start = time.perf_counter()
+            write_snapshot(lob, snapshot_path, seq=journal.seq)
+            snapshot_time = time.perf_counter() - start
+            run(lob, generate_flow(tail, seed=1))
+
+        restored = LimitOrderBook(capacity=n_orders, log_events=False)
+        start = time.perf_counter()
+        restore(restored, snapshot_path, journal_path)
+        restore_time = time.perf_counter() - start
+        assert len(restored.order_map) == len(lob.order_map)
+        return {
+            'resting_orders': n_orders,
+            'journal_tail': tail,
+            'snapshot_mb': round(os.path.getsize(snapshot_path) / 2**20, 1),
+            'snapshot_write_ms': round(snapshot_time * 1000),
+            'restore_ms': round(restore_time * 1000),
+        }
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    journal_tail = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    print(measure(n, journal_tail))
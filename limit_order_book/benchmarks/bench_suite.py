@@ -0,0 +1,164 @@
+"""
+Throughput and latency suite for LimitOrderBook.
+
+For every book depth the book is prefilled with passive orders and then
+a seeded mixed flow (passive adds, aggressive adds, cancels, amends) is
+replayed while every call is timed. Results are written as JSON, which
+benchmarks/compare.py can diff between commits.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.bench_suite [--depths 10,1000,100000,1000000]
+        [--messages 20000] [--output bench_results.json] [--seed 7]
+        [--add 0.6 --cancel 0.3 --aggressive 0.1 --amend 0]
+        [--distribution normal --price-scale 20] [--backend sorted]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from benchmarks.flow_generator import (
+    FlowGenerator, ADD, AGGRESSIVE, CANCEL, AMEND
+)
+
+DEFAULT_DEPTHS = (10, 1_000, 100_000, 1_000_000)
+
+
+def percentile(sorted_values: list, fraction: float) -> int:
+    if not sorted_values:
+        return 0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(depth: int, op: str, latencies: list) -> dict:
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'depth': depth,
+        'op': op,
+        'count': len(latencies),
+        'ops_per_sec': round(len(latencies) / (total / 1e9)) if total else 0,
+        'mean_ns': round(total / len(latencies)) if latencies else 0,
+        'p50_ns': percentile(latencies, 0.50),
+        'p99_ns': percentile(latencies, 0.99),
+        'p999_ns': percentile(latencies, 0.999),
+    }
+
+
+def run_depth(depth: int, n_messages: int, generator_kwargs: dict,
+              book_kwargs: dict) -> list:
+    """
+    Measuring one book depth
+    Args:
+        depth: number of resting orders before measuring
+        n_messages: number of measured messages
+        generator_kwargs: FlowGenerator arguments
+        book_kwargs: LimitOrderBook arguments
+
+    Returns:
+        list of summaries, one per operation kind
+
+    """
+    generator = FlowGenerator(**generator_kwargs)
+    lob = LimitOrderBook(capacity=depth + n_messages, **book_kwargs)
+    add_order, cancel_order = lob.add_order, lob.cancel_order
+    amend_order = lob.amend_order
+    for message in generator.prefill(depth):
+        add_order(*message[1:])
+    flow = generator.generate(n_messages)
+
+    latencies = {ADD: [], AGGRESSIVE: [], CANCEL: [], AMEND: []}
+    clock = time.perf_counter_ns
+    for kind, message in flow:
+        if kind == CANCEL:
+            start = clock()
+            cancel_order(message[1])
+            latencies[kind].append(clock() - start)
+        elif kind == AMEND:
+            start = clock()
+            amend_order(message[1], message[3], message[2])
+            latencies[kind].append(clock() - start)
+        else:
+            start = clock()
+            add_order(message[1], message[2], message[3], message[4])
+            latencies[kind].append(clock() - start)
+    return [
+        summarize(depth, op, values)
+        for op, values in latencies.items() if values
+    ]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description='LimitOrderBook benchmarks')
+    parser.add_argument(
+        '--depths', default=','.join(map(str, DEFAULT_DEPTHS))
+    )
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--add', type=float, default=0.6)
+    parser.add_argument('--cancel', type=float, default=0.3)
+    parser.add_argument('--aggressive', type=float, default=0.1)
+    parser.add_argument('--amend', type=float, default=0.0)
+    parser.add_argument('--distribution', default='normal')
+    parser.add_argument('--price-scale', type=float, default=20)
+    parser.add_argument('--backend', default='sorted')
+    args = parser.parse_args(argv)
+
+    generator_kwargs = {
+        'seed': args.seed,
+        'add_ratio': args.add,
+        'cancel_ratio': args.cancel,
+        'aggressive_ratio': args.aggressive,
+        'amend_ratio': args.amend,
+        'price_distribution': args.distribution,
+        'price_scale': args.price_scale,
+    }
+    book_kwargs = {'log_events': False, 'backend': args.backend}
+    if args.backend == 'ladder':
+        book_kwargs.update(min_price=0, max_price=20_000)
+
+    results = []
+    for depth in (int(value) for value in args.depths.split(',')):
+        for summary in run_depth(
+                depth, args.messages, generator_kwargs, book_kwargs):
+            results.append(summary)
+            print(
+                f"depth {summary['depth']:>9} {summary['op']:<10} "
+                f"{summary['ops_per_sec']:>10,} ops/s  "
+                f"p50 {summary['p50_ns']:>7}ns  p99 {summary['p99_ns']:>7}ns  "
+                f"p999 {summary['p999_ns']:>8}ns"
+            )
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'messages': args.messages,
+            'backend': args.backend,
+            'generator': generator_kwargs,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares two bench_suite JSON files and reports regressions.
+
+Usage (from the limit_order_book directory):
+    python -m benchmarks.compare base.json new.json [--tolerance 0.1]
+
+Exit code is 1 when throughput of any (depth, op) dropped or its p99
+latency grew by more than the tolerance.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        report = json.load(file)
+    return {(row['depth'], row['op']): row for row in report['results']}
+
+
+def compare(base: dict, new: dict, tolerance: float) -> list:
+    """
+    Args:
+        base: results of the baseline run keyed by (depth, op)
+        new: results of the new run keyed by (depth, op)
+        tolerance: allowed relative change, e.g. 0.1 for 10%
+
+    Returns:
+        list of (depth, op, metric, base value, new value) regressions
+
+    """
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        old_row, new_row = base[key], new[key]
+        if new_row['ops_per_sec'] < old_row['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                key + ('ops_per_sec', old_row['ops_per_sec'],
+                       new_row['ops_per_sec'])
+            )
+        if new_row['p99_ns'] > old_row['p99_ns'] * (1 + tolerance):
+            regressions.append(
+                key + ('p99_ns', old_row['p99_ns'], new_row['p99_ns'])
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='compare benchmark runs')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+    regressions = compare(load(args.base), load(args.new), args.tolerance)
+    for depth, op, metric, old_value, new_value in regressions:
+        print(f'REGRESSION depth {depth} {op} {metric}: '
+              f'{old_value} -> {new_value}')
+    if not regressions:
+        print('no regressions')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
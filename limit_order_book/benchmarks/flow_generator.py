@@ -0,0 +1,244 @@
+"""
+Seeded synthetic order flow for tests and benchmarks, with helpers to
+replay it.
+
+Messages use the replay format: ('add', order_id, side, price, quantity),
+('cancel', order_id) and ('amend', order_id, price, quantity).
+"""
+import random
+import time
+
+from src.algorithms.limit_order_book import (
+    LimitOrderBook, ACTION_ADD, ACTION_CANCEL
+)
+from src.data_structures.order_pool import SIDE_CODES
+
+ADD = 'add'
+AGGRESSIVE = 'aggressive'
+CANCEL = 'cancel'
+AMEND = 'amend'
+
+
+def generate_flow(n_messages: int, seed: int = 7) -> list:
+    """
+    Generating seeded mix of adds (around mid price 10000) and cancels
+    Args:
+        n_messages: number of messages
+        seed: random seed
+
+    Returns:
+        list of ('add', id, side, price, qty) and ('cancel', id) tuples
+
+    """
+    rng = random.Random(seed)
+    flow = []
+    live = []
+    for i in range(n_messages):
+        if live and rng.random() < 0.3:
+            order_id = live.pop(rng.randrange(len(live)))
+            flow.append(('cancel', order_id))
+            continue
+        side = 'buy' if rng.random() < 0.5 else 'sell'
+        offset = int(rng.gauss(0, 20))
+        price = 10_000 - offset if side == 'buy' else 10_000 + offset
+        order_id = f'O{i}'
+        flow.append(('add', order_id, side, price, rng.randint(1, 100)))
+        live.append(order_id)
+    return flow
+
+
+def run(lob: LimitOrderBook, flow: list) -> tuple:
+    """
+    Replaying flow into lob
+    Returns:
+        (elapsed seconds, list of all fills)
+
+    """
+    trades = []
+    add_order, cancel_order = lob.add_order, lob.cancel_order
+    start = time.perf_counter()
+    for message in flow:
+        if message[0] == 'add':
+            fills = add_order(*message[1:])
+            if fills.count:
+                trades.extend(fills)
+        else:
+            cancel_order(message[1])
+    return time.perf_counter() - start, trades
+
+
+def batch_columns(flow: list) -> tuple:
+    """
+    Converting flow of generate_flow into batch columns
+    Returns:
+        (order_ids, sides, prices, quantities, actions)
+
+    """
+    order_ids, sides, prices, quantities, actions = [], [], [], [], []
+    for message in flow:
+        order_ids.append(message[1])
+        if message[0] == 'add':
+            sides.append(SIDE_CODES[message[2]])
+            prices.append(message[3])
+            quantities.append(message[4])
+            actions.append(ACTION_ADD)
+        else:
+            sides.append(0)
+            prices.append(0)
+            quantities.append(0)
+            actions.append(ACTION_CANCEL)
+    return order_ids, sides, prices, quantities, actions
+
+
+class FlowGenerator:
+    """
+    FlowGenerator produces reproducible order flow with a configurable
+    mix of passive adds, aggressive (crossing) adds, cancels and amends.
+    Main idea:
+    - passive orders rest `offset` ticks away from the mid price; the
+    offset is drawn from price_distribution ('normal', 'uniform' or
+    'exponential') with scale `price_scale`
+    - aggressive orders cross the mid by `cross_ticks` and take
+    liquidity from the opposite side
+    - cancels target a random order this generator added earlier (it may
+    have been filled already, like in real flow)
+    - amends (quote updates) of a random earlier passive order either
+    change its size or move it to a new passive price
+    """
+    def __init__(
+            self,
+            seed: int = 7,
+            add_ratio: float = 0.6,
+            cancel_ratio: float = 0.3,
+            aggressive_ratio: float = 0.1,
+            amend_ratio: float = 0.0,
+            price_distribution: str = 'normal',
+            price_scale: float = 20,
+            mid_price: int = 10_000,
+            cross_ticks: int = 2,
+            max_quantity: int = 100
+    ):
+        total = add_ratio + cancel_ratio + aggressive_ratio + amend_ratio
+        if total <= 0:
+            raise ValueError('at least one ratio has to be positive')
+        if price_distribution not in ('normal', 'uniform', 'exponential'):
+            raise ValueError(
+                f'unknown price distribution {price_distribution!r}'
+            )
+        self.rng = random.Random(seed)
+        self.add_ratio = add_ratio / total
+        self.cancel_ratio = cancel_ratio / total
+        self.amend_ratio = amend_ratio / total
+        self.price_distribution = price_distribution
+        self.price_scale = price_scale
+        self.mid_price = mid_price
+        self.cross_ticks = cross_ticks
+        self.max_quantity = max_quantity
+        self._live = []
+        self._next_id = 0
+
+    def _offset(self) -> int:
+        rng, scale = self.rng, self.price_scale
+        if self.price_distribution == 'normal':
+            return 1 + int(abs(rng.gauss(0, scale)))
+        if self.price_distribution == 'uniform':
+            return rng.randint(1, max(int(scale), 1))
+        return 1 + int(rng.expovariate(1 / scale))
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return f'G{self._next_id}'
+
+    def passive(self) -> tuple:
+        """
+        Returns:
+            non-crossing ('add', ...) message
+
+        """
+        order_id = self._new_id()
+        side = 'buy' if self.rng.random() < 0.5 else 'sell'
+        offset = self._offset()
+        price = self.mid_price - offset if side == 'buy' else (
+            self.mid_price + offset)
+        self._live.append((order_id, side))
+        return (ADD, order_id, side, price,
+                self.rng.randint(1, self.max_quantity))
+
+    def aggressive(self) -> tuple:
+        """
+        Returns:
+            ('add', ...) message crossing the mid price
+
+        """
+        order_id = self._new_id()
+        side = 'buy' if self.rng.random() < 0.5 else 'sell'
+        price = self.mid_price + self.cross_ticks if side == 'buy' else (
+            self.mid_price - self.cross_ticks)
+        return (ADD, order_id, side, price,
+                self.rng.randint(1, self.max_quantity))
+
+    def cancel(self) -> tuple:
+        """
+        Returns:
+            ('cancel', order_id) of a random earlier passive order
+
+        """
+        live = self._live
+        index = self.rng.randrange(len(live))
+        live[index], live[-1] = live[-1], live[index]
+        return (CANCEL, live.pop()[0])
+
+    def amend(self) -> tuple:
+        """
+        Returns:
+            ('amend', order_id, price, quantity) of a random earlier
+            passive order - new size or new passive price, the other
+            field is None
+
+        """
+        order_id, side = self._live[self.rng.randrange(len(self._live))]
+        if self.rng.random() < 0.5:
+            return (AMEND, order_id, None,
+                    self.rng.randint(1, self.max_quantity))
+        offset = self._offset()
+        price = self.mid_price - offset if side == 'buy' else (
+            self.mid_price + offset)
+        return (AMEND, order_id, price, None)
+
+    def prefill(self, depth: int) -> list:
+        """
+        Args:
+            depth: number of passive orders
+
+        Returns:
+            list of passive add messages building a book of given depth
+
+        """
+        return [self.passive() for _ in range(depth)]
+
+    def generate(self, n_messages: int) -> list:
+        """
+        Args:
+            n_messages: number of messages
+
+        Returns:
+            list of (kind, message) - kind is 'add', 'aggressive',
+            'cancel' or 'amend'
+
+        """
+        flow = []
+        rng = self.rng
+        add_ratio = self.add_ratio
+        cancel_limit = add_ratio + self.cancel_ratio
+        amend_limit = cancel_limit + self.amend_ratio
+        for _ in range(n_messages):
+            draw = rng.random()
+            if draw < add_ratio:
+                flow.append((ADD, self.passive()))
+            elif draw < cancel_limit and self._live:
+                flow.append((CANCEL, self.cancel()))
+            elif cancel_limit <= draw < amend_limit and self._live:
+                flow.append((AMEND, self.amend()))
+            else:
+                flow.append((AGGRESSIVE, self.aggressive()))
+        return flow
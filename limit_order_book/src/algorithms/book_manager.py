@@ -0,0 +1,490 @@
+import multiprocessing
+import struct
+import zlib
+from typing import NamedTuple
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.data_structures.order import (
+    LIMIT, ORDER_TYPE_CODES, ORDER_TYPE_NAMES
+)
+from src.data_structures.order_pool import SIDE_CODES, SIDE_NAMES
+from src.data_structures.shm_ring import SharedRingBuffer, wait
+from src.persistence.journal import (
+    encode_id, decode_id, decode_amend, split_side, AMEND_PRICE,
+    AMEND_QUANTITY, ORDER_TYPE_SHIFT
+)
+
+MAX_ID_BYTES = 32
+
+COMMAND_ADD = 0
+COMMAND_CANCEL = 1
+COMMAND_SYNC = 2
+COMMAND_STOP = 3
+COMMAND_AMEND = 4
+COMMAND_SET_EXPIRY = 5
+COMMAND_EXPIRE = 6
+
+REPORT_TRADE = 'trade'
+REPORT_CANCELLED = 'cancelled'
+REPORT_CANCEL_REJECTED = 'cancel_rejected'
+REPORT_AMENDED = 'amended'
+REPORT_AMEND_REJECTED = 'amend_rejected'
+REPORT_KILLED = 'killed'
+REPORT_EXPIRED = 'expired'
+REPORT_REJECTED = 'rejected'
+_REPORT_SYNC = 'sync'
+_REPORT_KINDS = (
+    REPORT_TRADE, REPORT_CANCELLED, REPORT_CANCEL_REJECTED, REPORT_AMENDED,
+    REPORT_AMEND_REJECTED, REPORT_KILLED, REPORT_EXPIRED, REPORT_REJECTED,
+    _REPORT_SYNC
+)
+_REPORT_CODES = {kind: code for code, kind in enumerate(_REPORT_KINDS)}
+
+# command, side (with the order type for adds, amend flags for amends),
+# symbol, price, quantity, id kind, id
+COMMAND_RECORD = struct.Struct(f'<BBIqqB{MAX_ID_BYTES + 1}p')
+# report, symbol, quantity, price, order id kind, order id,
+# resting id kind, resting id
+REPORT_RECORD = struct.Struct(
+    f'<BIqqB{MAX_ID_BYTES + 1}pB{MAX_ID_BYTES + 1}p'
+)
+
+
+class ExecutionReport(NamedTuple):
+    """
+    Result of a routed command. For trades order_id is the aggressor;
+    for amends quantity and price are the requested values (0 if kept);
+    for killed IOC/FOK/market orders quantity is the unfilled rest;
+    rejected means the book raised on the command (e.g. a price outside
+    of the ladder) and nothing was applied;
+    resting_id, quantity and price are None/0 when not applicable
+    """
+    kind: str
+    symbol: str
+    order_id: object
+    resting_id: object
+    quantity: int
+    price: int
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """Stable (not salted per process) symbol to shard mapping"""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def _wire_id(order_id) -> tuple:
+    kind, data = encode_id(order_id)
+    if len(data) > MAX_ID_BYTES:
+        raise ValueError(
+            f'order id {order_id!r} longer than {MAX_ID_BYTES} bytes'
+        )
+    return kind, data
+
+
+def _execute(lob, symbol, command, order_id, side, price, quantity, emit):
+    """Applying single command to the book and emitting its reports"""
+    if command == COMMAND_ADD:
+        side, order_type = split_side(side)
+        fills = lob.add_order(
+            order_id, SIDE_NAMES[side], price, quantity,
+            ORDER_TYPE_NAMES[order_type]
+        )
+        if order_type != LIMIT:
+            unfilled = quantity - sum(fills.quantities[:fills.count])
+            _emit_trades(symbol, order_id, fills, emit)
+            if unfilled:
+                emit(REPORT_KILLED, symbol, order_id, None, unfilled, 0)
+            return
+    elif command == COMMAND_AMEND:
+        price, quantity = decode_amend(side, price, quantity)
+        if not lob.amend_order(order_id, quantity, price):
+            emit(REPORT_AMEND_REJECTED, symbol, order_id, None, 0, 0)
+            return
+        emit(REPORT_AMENDED, symbol, order_id, None, quantity or 0, price or 0)
+        fills = lob.fills
+    elif command == COMMAND_SET_EXPIRY:
+        # the deadline travels in the price field
+        lob.set_expiry(order_id, price)
+        return
+    elif lob.cancel_order(order_id):
+        emit(REPORT_CANCELLED, symbol, order_id, None, 0, 0)
+        return
+    else:
+        emit(REPORT_CANCEL_REJECTED, symbol, order_id, None, 0, 0)
+        return
+    _emit_trades(symbol, order_id, fills, emit)
+
+
+def _run(lob, symbol, command, order_id, side, price, quantity, emit):
+    """_execute which reports a failing command instead of raising"""
+    try:
+        _execute(lob, symbol, command, order_id, side, price, quantity, emit)
+    except Exception:
+        # one bad command must not stop the other books of the process
+        emit(REPORT_REJECTED, symbol, order_id, None, 0, 0)
+
+
+def _expire(books, now, emit):
+    """Expiring good-till-time orders of all books of a process"""
+    for symbol, lob in books.items():
+        for order_id in lob.expire(now):
+            emit(REPORT_EXPIRED, symbol, order_id, None, 0, 0)
+
+
+def _emit_trades(symbol, order_id, fills, emit):
+    for index in range(fills.count):
+        emit(
+            REPORT_TRADE, symbol, order_id, fills.resting_ids[index],
+            fills.quantities[index], fills.prices[index]
+        )
+
+
+def _worker(symbols, command_name, report_name, slots, book_kwargs):
+    """Shard process: owns the books of its symbols, runs commands FIFO"""
+    commands = SharedRingBuffer(COMMAND_RECORD, slots, command_name, False)
+    reports = SharedRingBuffer(REPORT_RECORD, slots, report_name, False)
+    books = {}
+
+    def emit(kind, symbol, order_id, resting_id, quantity, price):
+        order_kind, order_data = encode_id(order_id)
+        resting_kind, resting_data = (
+            (0, b'') if resting_id is None else encode_id(resting_id)
+        )
+        attempt = 0
+        while not reports.put(
+                _REPORT_CODES[kind], symbol, quantity, price, order_kind,
+                order_data, resting_kind, resting_data):
+            attempt += 1
+            wait(attempt)
+
+    try:
+        attempt = 0
+        while True:
+            batch = commands.drain(4096)
+            if not batch:
+                attempt += 1
+                wait(attempt)
+                continue
+            attempt = 0
+            for (command, side, symbol, price, quantity, id_kind,
+                 id_data) in batch:
+                if command == COMMAND_STOP:
+                    return
+                if command == COMMAND_SYNC:
+                    # the sync token travels in the price field
+                    emit(_REPORT_SYNC, 0, 0, None, price, 0)
+                    continue
+                if command == COMMAND_EXPIRE:
+                    _expire(books, price, emit)
+                    continue
+                lob = books.get(symbol)
+                if lob is None:
+                    lob = books[symbol] = LimitOrderBook(**book_kwargs)
+                _run(
+                    lob, symbol, command, decode_id(id_kind, id_data), side,
+                    price, quantity, emit
+                )
+    finally:
+        commands.close()
+        reports.close()
+
+
+class BookManager:
+    """
+    BookManager owns one LimitOrderBook per symbol and routes commands
+    by symbol.
+    Main idea:
+    - workers=0: books live in this process and commands run inline
+    - workers=N: symbols are sharded (crc32(symbol) % N) across N worker
+    processes; every shard gets a command ring and an execution report
+    ring in shared memory (SharedRingBuffer)
+    - a symbol always goes to the same shard and every ring is FIFO, so
+    per-symbol ordering is deterministic regardless of worker count
+    - add_order/cancel_order/amend_order/expire only enqueue; execution
+    reports are
+    collected with reports() and flush() waits for all submitted
+    commands to be processed
+    - the symbol, side and order type are checked before a command is
+    routed (ValueError); a command the book raises on is answered by a
+    'rejected' report, so a bad order never stops a worker
+    """
+    def __init__(
+            self,
+            symbols=(),
+            workers: int = 0,
+            ring_slots: int = 1 << 16,
+            **book_kwargs
+    ):
+        book_kwargs.setdefault('log_events', False)
+        self.book_kwargs = book_kwargs
+        self.workers = workers
+        self.symbols = list(symbols)
+        self._symbol_index = {
+            symbol: index for index, symbol in enumerate(self.symbols)
+        }
+        self._books = {}
+        self._pending = []
+        self._sync_token = 0
+        self._synced = 0
+        self._processes = []
+        self._commands = []
+        self._reports = []
+        if workers <= 0:
+            return
+        if not self.symbols:
+            raise ValueError('symbols have to be registered for workers > 0')
+        context = multiprocessing.get_context()
+        shard_symbols = [[] for _ in range(workers)]
+        for symbol in self.symbols:
+            shard_symbols[shard_of(symbol, workers)].append(symbol)
+        for shard in range(workers):
+            commands = SharedRingBuffer(COMMAND_RECORD, ring_slots)
+            reports = SharedRingBuffer(REPORT_RECORD, ring_slots)
+            process = context.Process(
+                target=_worker,
+                args=(
+                    shard_symbols[shard], commands.name, reports.name,
+                    ring_slots, book_kwargs
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._commands.append(commands)
+            self._reports.append(reports)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def book(self, symbol: str) -> LimitOrderBook:
+        """
+        To access the book of a symbol (only with workers=0)
+        Args:
+            symbol: instrument symbol
+
+        Returns:
+            LimitOrderBook of the symbol
+
+        """
+        if self.workers > 0:
+            raise RuntimeError('books live in worker processes')
+        lob = self._books.get(symbol)
+        if lob is None:
+            lob = self._books[symbol] = LimitOrderBook(**self.book_kwargs)
+        return lob
+
+    def add_order(
+            self,
+            symbol: str,
+            order_id,
+            side: str,
+            price: int,
+            quantity: int,
+            order_type: str = 'limit',
+            expire_at: int = None
+    ) -> None:
+        """
+        To route new order to the book of the symbol
+        Args:
+            symbol: instrument symbol
+            order_id: order id (str or int, up to 32 bytes)
+            side: 'buy' or 'sell'
+            price: the price of the order, ignored for market orders
+            quantity: quantity of the order
+            order_type: 'limit', 'ioc', 'fok' or 'market', see
+                LimitOrderBook.add_order
+            expire_at: good-till-time deadline of a limit order, see
+                expire()
+
+        Returns:
+            None - trades are delivered through reports()
+
+        """
+        side_code = SIDE_CODES.get(side)
+        if side_code is None:
+            raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
+        type_code = ORDER_TYPE_CODES.get(order_type)
+        if type_code is None:
+            raise ValueError(
+                f"order_type must be one of {ORDER_TYPE_NAMES}, "
+                f"got {order_type!r}"
+            )
+        self._submit(
+            COMMAND_ADD, symbol, order_id,
+            side_code | type_code << ORDER_TYPE_SHIFT, price or 0, quantity
+        )
+        if expire_at is not None:
+            self._submit(
+                COMMAND_SET_EXPIRY, symbol, order_id, 0, expire_at, 0
+            )
+
+    def expire(self, now: int) -> None:
+        """
+        To expire good-till-time orders of all books, see
+        LimitOrderBook.expire
+        Args:
+            now: current time, in the units of expire_at
+
+        Returns:
+            None - expired orders are delivered through reports()
+
+        """
+        if self.workers <= 0:
+            _expire(self._books, now, self._emit)
+            return
+        self._broadcast(COMMAND_EXPIRE, now)
+
+    def cancel_order(self, symbol: str, order_id) -> None:
+        """
+        To route cancel to the book of the symbol
+        Args:
+            symbol: instrument symbol
+            order_id: order id
+
+        Returns:
+            None - the result is delivered through reports()
+
+        """
+        self._submit(COMMAND_CANCEL, symbol, order_id, 0, 0, 0)
+
+    def amend_order(
+            self,
+            symbol: str,
+            order_id,
+            quantity: int = None,
+            price: int = None
+    ) -> None:
+        """
+        To route amend to the book of the symbol, see
+        LimitOrderBook.amend_order
+        Args:
+            symbol: instrument symbol
+            order_id: order id
+            quantity: new quantity, None to keep it
+            price: new price, None to keep it
+
+        Returns:
+            None - the result (and trades of a replaced order) is
+            delivered through reports()
+
+        """
+        flags = (AMEND_PRICE if price is not None else 0) | (
+            AMEND_QUANTITY if quantity is not None else 0)
+        self._submit(
+            COMMAND_AMEND, symbol, order_id, flags, price or 0, quantity or 0
+        )
+
+    def _emit(self, kind, symbol, order_id, resting_id, quantity, price):
+        self._pending.append(ExecutionReport(
+            kind, symbol, order_id, resting_id, quantity, price
+        ))
+
+    def _submit(self, command, symbol, order_id, side, price, quantity):
+        if self.workers <= 0:
+            _run(
+                self.book(symbol), symbol, command, order_id, side, price,
+                quantity, self._emit
+            )
+            return
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            raise ValueError(
+                f'unknown symbol {symbol!r}, workers only serve the '
+                f'symbols given to BookManager'
+            )
+        id_kind, id_data = _wire_id(order_id)
+        ring = self._commands[shard_of(symbol, self.workers)]
+        attempt = 0
+        while not ring.put(
+                command, side, index, price, quantity, id_kind, id_data):
+            # the worker may be waiting for us to drain its reports
+            self._collect()
+            attempt += 1
+            wait(attempt)
+
+    def _collect(self) -> int:
+        """Moving reports from the rings to the pending list"""
+        collected = 0
+        symbols = self.symbols
+        for ring in self._reports:
+            for (kind, symbol, quantity, price, order_kind, order_data,
+                 resting_kind, resting_data) in ring.drain():
+                kind = _REPORT_KINDS[kind]
+                collected += 1
+                if kind == _REPORT_SYNC:
+                    if quantity == self._sync_token:
+                        self._synced += 1
+                    continue
+                self._pending.append(ExecutionReport(
+                    kind, symbols[symbol], decode_id(order_kind, order_data),
+                    decode_id(resting_kind, resting_data) if (
+                        kind == REPORT_TRADE) else None,
+                    quantity, price
+                ))
+        return collected
+
+    def reports(self) -> list:
+        """
+        To take execution reports produced so far, in per-symbol order
+        Returns:
+            list of ExecutionReport
+
+        """
+        self._collect()
+        pending, self._pending = self._pending, []
+        return pending
+
+    def flush(self) -> None:
+        """
+        To wait until all submitted commands were processed by workers
+        Returns:
+            None
+
+        """
+        if self.workers <= 0:
+            return
+        self._sync_token += 1
+        self._synced = 0
+        self._broadcast(COMMAND_SYNC, self._sync_token)
+        attempt = 0
+        while self._synced < self.workers:
+            if not self._collect():
+                attempt += 1
+                wait(attempt)
+                for process in self._processes:
+                    if not process.is_alive():
+                        raise RuntimeError('book worker process died')
+
+    def _broadcast(self, command, price) -> None:
+        """Sending command without symbol to every worker"""
+        for ring in self._commands:
+            attempt = 0
+            while not ring.put(command, 0, 0, price, 0, 0, b''):
+                self._collect()
+                attempt += 1
+                wait(attempt)
+
+    def close(self) -> None:
+        """
+        To stop worker processes and release shared memory
+        Returns:
+            None
+
+        """
+        for ring, process in zip(self._commands, self._processes):
+            attempt = 0
+            while process.is_alive() and not ring.put(
+                    COMMAND_STOP, 0, 0, 0, 0, 0, b''):
+                self._collect()
+                attempt += 1
+                wait(attempt)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for ring in self._commands + self._reports:
+            ring.close()
+        self._processes, self._commands, self._reports = [], [], []
@@ -0,0 +1,149 @@
+from time import perf_counter_ns
+
+from src.data_structures.log_histogram import LogHistogram
+from src.data_structures.order_pool import BUY
+
+
+class BookInstrumentation:
+    """
+    BookInstrumentation measures a LimitOrderBook from the outside.
+    Main idea:
+    - it replaces add_order, cancel_order, amend_order, expire,
+    match_orders and process_batch of one book instance with timed
+    wrappers, so a book created without
+    instrumentation runs the original methods with no extra checks
+    - process_batch adds bypass add_order (the batch loop calls the
+    internal _add_order), so they are not in add_order_ns; every batch
+    records its latency and number of messages instead, while its
+    matching, cancels and amends are recorded as usual
+    - per call latency goes to LogHistogram (ns); every order which
+    traded records the number of price levels it touched and resting
+    orders it consumed; every successful cancel records the depth of
+    its level (what a linear scan of the level would have cost); every
+    expire call records the number of orders it removed
+    """
+    def __init__(self, lob):
+        self.lob = lob
+        self.add_order_ns = LogHistogram()
+        self.cancel_order_ns = LogHistogram()
+        self.amend_order_ns = LogHistogram()
+        self.expire_ns = LogHistogram()
+        self.expired_per_call = LogHistogram()
+        self.match_orders_ns = LogHistogram()
+        self.levels_touched = LogHistogram()
+        self.orders_consumed = LogHistogram()
+        self.cancel_level_depth = LogHistogram()
+        self.process_batch_ns = LogHistogram()
+        self.batch_messages = LogHistogram()
+        self._install()
+
+    def _install(self) -> None:
+        lob = self.lob
+        add_order = lob.add_order
+        cancel_order = lob.cancel_order
+        amend_order = lob.amend_order
+        expire = lob.expire
+        match_orders = lob.match_orders
+        process_batch = lob.process_batch
+        fills = lob.fills
+        record_add = self.add_order_ns.record
+        record_cancel = self.cancel_order_ns.record
+        record_amend = self.amend_order_ns.record
+        record_expire = self.expire_ns.record
+        record_expired = self.expired_per_call.record
+        record_match = self.match_orders_ns.record
+        record_levels = self.levels_touched.record
+        record_consumed = self.orders_consumed.record
+        record_depth = self.cancel_level_depth.record
+        record_batch = self.process_batch_ns.record
+        record_messages = self.batch_messages.record
+
+        def timed_add_order(*args, **kwargs):
+            start = perf_counter_ns()
+            result = add_order(*args, **kwargs)
+            record_add(perf_counter_ns() - start)
+            return result
+
+        def timed_match_orders(order):
+            start = perf_counter_ns()
+            result = match_orders(order)
+            record_match(perf_counter_ns() - start)
+            count = fills.count
+            if count:
+                prices = fills.prices
+                levels = 1
+                for index in range(1, count):
+                    if prices[index] != prices[index - 1]:
+                        levels += 1
+                record_levels(levels)
+                record_consumed(count)
+            return result
+
+        def timed_cancel_order(order_id):
+            handle = lob.order_map.get(lob.key(order_id))
+            if handle is not None:
+                pool = lob.pool
+                book = lob.buy_orders if pool.sides[handle] == BUY else (
+                    lob.sell_orders)
+                record_depth(len(book[pool.prices[handle]]))
+            start = perf_counter_ns()
+            result = cancel_order(order_id)
+            record_cancel(perf_counter_ns() - start)
+            return result
+
+        def timed_amend_order(*args, **kwargs):
+            start = perf_counter_ns()
+            result = amend_order(*args, **kwargs)
+            record_amend(perf_counter_ns() - start)
+            return result
+
+        def timed_expire(now):
+            start = perf_counter_ns()
+            result = expire(now)
+            record_expire(perf_counter_ns() - start)
+            record_expired(len(result))
+            return result
+
+        def timed_process_batch(order_ids, *args, **kwargs):
+            start = perf_counter_ns()
+            result = process_batch(order_ids, *args, **kwargs)
+            record_batch(perf_counter_ns() - start)
+            record_messages(len(order_ids))
+            return result
+
+        lob.add_order = timed_add_order
+        lob.cancel_order = timed_cancel_order
+        lob.amend_order = timed_amend_order
+        lob.expire = timed_expire
+        lob.match_orders = timed_match_orders
+        lob.process_batch = timed_process_batch
+
+    def snapshot(self) -> dict:
+        """
+        To export all histograms for monitoring
+        Returns:
+            dict of histogram name to its LogHistogram.snapshot()
+
+        """
+        return {
+            'add_order_ns': self.add_order_ns.snapshot(),
+            'cancel_order_ns': self.cancel_order_ns.snapshot(),
+            'amend_order_ns': self.amend_order_ns.snapshot(),
+            'expire_ns': self.expire_ns.snapshot(),
+            'expired_per_call': self.expired_per_call.snapshot(),
+            'match_orders_ns': self.match_orders_ns.snapshot(),
+            'levels_touched': self.levels_touched.snapshot(),
+            'orders_consumed': self.orders_consumed.snapshot(),
+            'cancel_level_depth': self.cancel_level_depth.snapshot(),
+            'process_batch_ns': self.process_batch_ns.snapshot(),
+            'batch_messages': self.batch_messages.snapshot(),
+        }
+
+    def reset(self) -> None:
+        for histogram in (
+                self.add_order_ns, self.cancel_order_ns, self.amend_order_ns,
+                self.expire_ns, self.expired_per_call, self.match_orders_ns,
+                self.levels_touched, self.orders_consumed,
+                self.cancel_level_depth, self.process_batch_ns,
+                self.batch_messages):
+            histogram.reset()
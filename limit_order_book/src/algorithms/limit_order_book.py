@@ -1,9 +1,44 @@
+from itertools import islice, repeat
+from operator import neg
 from sortedcontainers import SortedDict
-from src.data_structures.order import Order
-from collections import deque
-import logging
+from src.data_structures.order import (
+    Order, LIMIT, FOK, MARKET, ORDER_TYPE_CODES, ORDER_TYPE_NAMES
+)
+from src.data_structures.order_pool import (
+    OrderPool, BUY, SELL, NIL, SIDE_CODES, SIDE_NAMES
+)
+from src.data_structures.price_level import PriceLevel, LevelSummary
+from src.data_structures.fills import Fills, BatchFills
+from src.data_structures.price_ladder import PriceLadder
+from src.data_structures.timer_wheel import TimerWheel
+from src.data_structures.events import (
+    AckEvent, TradeEvent, CancelEvent, CancelRejectEvent, AmendEvent,
+    AmendRejectEvent, KillEvent, ExpiryEvent, ExpiredEvent, ClockEvent,
+    LoggingListener, LevelUpdate, OrderUpdate, REJECT_UNKNOWN, REJECT_FILLED, REJECT_CANCELLED,
+    REJECT_EXPIRED, L3_ADD, L3_MODIFY, L3_DELETE
+)
+from src.algorithms.instrumentation import BookInstrumentation
+from src.data_structures.order_status import (
+    OrderStatusStore, ACTIVE, PARTIAL, FILLED, CANCELLED, EXPIRED
+)
 
-logging.getLogger().setLevel(logging.INFO)
+ACTION_ADD = 0
+ACTION_CANCEL = 1
+ACTION_AMEND = 2
+
+
+def _column(values) -> list:
+    """NumPy arrays are converted once to lists of Python scalars"""
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
+def _drop_levels(book, prices) -> None:
+    """Emptied levels are deleted together, a whole side by one clear()"""
+    if len(prices) == len(book):
+        book.clear()
+    else:
+        for price in prices:
+            del book[price]
 
 
 class LimitOrderBook:
@@ -12,46 +47,384 @@ class LimitOrderBook:
     placed by traders.
     Main idea:
     - adding orders to two SortedDicts depending on the order side
-    (buy -sorted descending or sell -sorted descending)
+    (buy -sorted descending or sell -sorted descending), or to two
+    PriceLadders (backend='ladder') for a bounded integer tick grid
     - canceling orders if there is a need for that
+    - every price level is a PriceLevel (intrusive FIFO), so both
+    cancels and fills unlink an order in O(1)
+    - external order ids are translated once, at the API boundary, to
+    keys - small ints interned by order_status; order_map (key to pool
+    handle), the pool, expiries and the owner index work on keys and
+    the matching loop works on keys and 0/1 side codes, so its hashing
+    and comparisons are int operations. Fills, events and returned ids
+    carry the external ids again
+    - acks, trades and cancels are reported as typed events to the
+    registered listeners; nothing is built when there are no listeners
+    - add_order returns executions in a reusable Fills instance
+    - market data is a separate stream: an attached sink gets LevelUpdate
+    (L2) whenever level aggregates change - once per level touched by
+    matching, not per fill - and optionally OrderUpdate (L3) for every
+    resting order change; fan-out happens in the sink (MarketDataFeed),
+    outside of matching
+    - IOC, FOK and market orders never rest - the unfilled rest is
+    dropped (KillEvent); FOK feasibility is decided from the level
+    totals before anything is matched
+    - good-till-time orders (expire_at / ttl) are kept in a lazily
+    created TimerWheel and in expiries (key to deadline);
+    expire(now) moves the book time `now` and removes only the orders
+    which are due, reporting them as 'expired'
+    - orders can carry an owner (session, participant) tag; owners maps
+    owner to its resting order ids, so mass_cancel by owner visits only
+    that owner's orders and mass_cancel without owner visits only the
+    price levels in range, dropping whole levels at once
+    - amend_order reduces quantity in place (the order keeps its queue
+    priority); a price change or a size increase is an atomic
+    cancel/replace which re-matches and loses priority
+    - process_batch / add_orders_batch take whole columns of messages
+    (lists or NumPy arrays) and return BatchFills
+    - instrument=True wraps the instance methods with latency and
+    matching histograms (BookInstrumentation); otherwise nothing is
+    measured and nothing is checked on the hot path
+    - every level keeps its total quantity and order count, so top of
+    book and depth snapshots do not walk the orders
+    - order_status is an OrderStatusStore - one byte per interned order
+    id, with optional retention of finished (filled/cancelled) orders;
+    a key is reused only after the status of its order was evicted
     """
-    def __init__(self):
-        self.buy_orders = SortedDict(lambda x: -x)
-        self.sell_orders = SortedDict()
+    def __init__(
+            self,
+            capacity: int = 1024,
+            log_events: bool = True,
+            backend: str = 'sorted',
+            min_price: int = None,
+            max_price: int = None,
+            tick: int = 1,
+            status_max_terminal: int = None,
+            status_max_age: float = None,
+            instrument: bool = False
+    ):
+        if backend == 'sorted':
+            self.buy_orders = SortedDict(neg)
+            self.sell_orders = SortedDict()
+            self._check_price = None
+        elif backend == 'ladder':
+            if min_price is None or max_price is None:
+                raise ValueError(
+                    "backend 'ladder' requires min_price and max_price"
+                )
+            self.buy_orders = PriceLadder(
+                min_price, max_price, tick, descending=True
+            )
+            self.sell_orders = PriceLadder(min_price, max_price, tick)
+            self._check_price = self.buy_orders.check_price
+        else:
+            raise ValueError(
+                f"backend must be 'sorted' or 'ladder', got {backend!r}"
+            )
+        self.backend = backend
+        self.pool = OrderPool(capacity)
         self.order_map = {}
-        self.order_status = {}
+        self.order_status = OrderStatusStore(
+            status_max_terminal, status_max_age
+        )
+        self.fills = Fills()
+        self.timers = None
+        self.expiries = {}
+        self.now = 0
+        self.order_owner = {}
+        self.owners = {}
+        self.market_data = None
+        self._l3 = False
+        self._listeners = []
+        self.log_listener = None
+        if log_events:
+            self.log_listener = LoggingListener()
+            self.add_listener(self.log_listener)
+        self.instrumentation = BookInstrumentation(self) if instrument else (
+            None)
+
+    def key(self, order_id):
+        """
+        To translate external order id to the key used by order_map,
+        the pool, expiries and the owner index
+        Args:
+            order_id: order id
+
+        Returns:
+            int key, None if the id was never seen (or its status was
+            evicted)
+
+        """
+        return self.order_status.slot(order_id)
+
+    def resting_ids(self) -> list:
+        """
+        To list external ids of the resting orders
+        Returns:
+            list of order ids in order_map order
+
+        """
+        ids = self.order_status.ids
+        return [ids[key] for key in self.order_map]
+
+    def metrics_snapshot(self) -> dict:
+        """
+        To export latency and matching histograms (instrument=True)
+        Returns:
+            dict of histogram name to summary, empty if the book is not
+            instrumented
+
+        """
+        if self.instrumentation is None:
+            return {}
+        return self.instrumentation.snapshot()
+
+    def add_listener(self, listener) -> None:
+        """
+        To register callable which receives every book event
+        (AckEvent, TradeEvent, CancelEvent, CancelRejectEvent,
+        KillEvent, AmendEvent, AmendRejectEvent, ExpiryEvent,
+        ExpiredEvent, ClockEvent)
+        Args:
+            listener: callable taking single event, e.g. EventRingBuffer
+
+        Returns:
+            None
+
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        """
+        To unregister listener added by add_listener
+        Args:
+            listener: previously registered listener
+
+        Returns:
+            None
+
+        """
+        self._listeners.remove(listener)
+        if listener is self.log_listener:
+            self.log_listener = None
+
+    def _emit(self, event) -> None:
+        for listener in self._listeners:
+            listener(event)
+
+    def set_market_data(self, sink, l3: bool = False) -> None:
+        """
+        To attach market data sink which receives LevelUpdate (L2) for
+        every change of level aggregates and, with l3=True, OrderUpdate
+        (L3) for every change of a resting order. No update is built
+        when there is no sink
+        Args:
+            sink: callable taking single update, e.g. MarketDataFeed;
+                None to detach
+            l3: send per-order updates as well
+
+        Returns:
+            None
+
+        """
+        self.market_data = sink
+        self._l3 = l3 and sink is not None
+
+    def _publish(self, action, order_id, side_code, price, quantity,
+                 level) -> None:
+        """L3 update (if enabled) and L2 update of the level it changed"""
+        side = SIDE_NAMES[side_code]
+        sink = self.market_data
+        if self._l3:
+            sink(OrderUpdate(action, order_id, side, price, quantity))
+        if level:
+            sink(LevelUpdate(side, price, level.quantity, level.count))
+        else:
+            sink(LevelUpdate(side, price, 0, 0))
 
     def add_order(
             self,
             order_id: str,
             side: str,
             price: int,
-            quantity: int
-    ) -> None:
+            quantity: int,
+            order_type: str = 'limit',
+            expire_at: int = None,
+            ttl: int = None,
+            owner=None
+    ) -> Fills:
         """
         To add new order to order and match limit prices with orders
         from opposite side
         Args:
             order_id: order id
             side: 'buy' or 'sell'
-            price: the price of the order
+            price: the price of the order, ignored for market orders
             quantity: quantity of the order
+            order_type: 'limit' (the rest goes on the book), 'ioc'
+                (immediate-or-cancel - the rest is dropped), 'fok'
+                (fill-or-kill - all or nothing) or 'market' (ioc
+                without price limit)
+            expire_at: good-till-time deadline of a limit order, in the
+                units of the times passed to expire()
+            ttl: time to live instead of expire_at - the deadline is
+                the book time (self.now, the last expire() time) + ttl
+            owner: optional hashable tag (participant, session) of the
+                order for mass_cancel
 
         Returns:
-            None
+            Fills with executions of this order - the same instance
+            is reused (overwritten) by the next add_order call
 
         """
-        logging.info("Adding order")
-        order = Order(order_id, side, price, quantity)
-        self.order_status[order_id] = 'active'
-        logging.info(f"{order} - OK")
+        side_code = SIDE_CODES.get(side)
+        if side_code is None:
+            side = side.lower()
+            if side not in SIDE_CODES:
+                raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
+            side_code = SIDE_CODES[side]
+        type_code = ORDER_TYPE_CODES.get(order_type)
+        if type_code is None:
+            raise ValueError(
+                f"order_type must be one of {ORDER_TYPE_NAMES}, "
+                f"got {order_type!r}"
+            )
+        if ttl is not None:
+            expire_at = self.now + ttl
+        if expire_at is None and owner is None:
+            return self._add_order(
+                order_id, side_code, price, quantity, type_code
+            )
+        if expire_at is not None and type_code != LIMIT:
+            raise ValueError('only limit orders can have expire_at or ttl')
+        fills = self._add_order(
+            order_id, side_code, price, quantity, type_code, owner
+        )
+        if owner is not None:
+            key = self.order_status.slot(order_id)
+            if key in self.order_map:
+                self._set_owner(key, owner)
+        if expire_at is not None:
+            self.set_expiry(order_id, expire_at)
+        return fills
+
+    def _add_order(
+            self,
+            order_id: str,
+            side_code: int,
+            price: int,
+            quantity: int,
+            order_type: int = LIMIT,
+            owner=None
+    ) -> Fills:
+        if order_type != LIMIT:
+            return self._add_immediate(
+                order_id, side_code, price, quantity, order_type, owner
+            )
+        if self._check_price is not None:
+            self._check_price(price)
+        order_status = self.order_status
+        key = order_status.intern(order_id)
+        if self.expiries and key in self.expiries:
+            # deadline of an earlier order with the same id
+            del self.expiries[key]
+        order = Order(order_id, side_code, price, quantity, key)
+        order_status.set_slot_state(key, ACTIVE)
+        if self._listeners:
+            self._emit(AckEvent(
+                order_id, SIDE_NAMES[side_code], price, quantity, 'limit',
+                owner
+            ))
         self.match_orders(order)
         if order.quantity > 0:
-            order_book = self.buy_orders if side == 'buy' else self.sell_orders
-            if price not in order_book:
-                order_book[price] = deque()
-            order_book[price].append(order)
-            self.order_map[order_id] = order
+            self._rest(key, order_id, side_code, price, order.quantity)
+        return self.fills
+
+    def _add_immediate(
+            self,
+            order_id: str,
+            side_code: int,
+            price: int,
+            quantity: int,
+            order_type: int,
+            owner=None
+    ) -> Fills:
+        """IOC, FOK and market orders - matched and never rested"""
+        side = SIDE_NAMES[side_code]
+        if order_type == MARKET:
+            price = None
+        elif self._check_price is not None:
+            self._check_price(price)
+        key = self.order_status.intern(order_id)
+        set_state = self.order_status.set_slot_state
+        set_state(key, ACTIVE)
+        listeners = self._listeners
+        if listeners:
+            self._emit(AckEvent(
+                order_id, side, price, quantity, ORDER_TYPE_NAMES[order_type],
+                owner
+            ))
+        if order_type == FOK and not self.can_fill(side, price, quantity):
+            self.fills.reset(order_id)
+            set_state(key, CANCELLED)
+            if listeners:
+                self._emit(KillEvent(order_id, side, price, quantity))
+            return self.fills
+        if price is None:
+            limit = float('inf') if side_code == BUY else float('-inf')
+        else:
+            limit = price
+        order = Order(order_id, side_code, limit, quantity, key)
+        self.match_orders(order)
+        if order.quantity > 0:
+            set_state(key, CANCELLED)
+            if listeners:
+                self._emit(KillEvent(order_id, side, price, order.quantity))
+        return self.fills
+
+    def can_fill(self, side: str, price, quantity: int) -> bool:
+        """
+        To check if an order could be filled completely right now. Only
+        the level totals are read - no order is walked and the book is
+        not changed, so the cost is the number of levels needed
+        Args:
+            side: 'buy' or 'sell' - side of the incoming order
+            price: limit price, None for no limit
+            quantity: quantity of the order
+
+        Returns:
+            True if the opposite side holds at least quantity at prices
+            not worse than price
+
+        """
+        is_buy = side == 'buy'
+        book = self.sell_orders if is_buy else self.buy_orders
+        for level_price, level in book.items():
+            if price is not None and (
+                    (level_price > price) if is_buy else level_price < price):
+                return False
+            quantity -= level.quantity
+            if quantity <= 0:
+                return True
+        return False
+
+    def _rest(
+            self,
+            key: int,
+            order_id: str,
+            side_code: int,
+            price: int,
+            quantity: int
+    ) -> None:
+        order_book = self.buy_orders if side_code == BUY else self.sell_orders
+        level = order_book.get(price)
+        if level is None:
+            level = order_book[price] = PriceLevel(self.pool)
+        handle = self.pool.allocate(key, side_code, price, quantity)
+        level.append(handle)
+        self.order_map[key] = handle
+        if self.market_data is not None:
+            self._publish(L3_ADD, order_id, side_code, price, quantity, level)
 
     def cancel_order(self, order_id: str) -> bool:
         """
@@ -63,32 +436,505 @@ class LimitOrderBook:
             True if order was cancelled, False otherwise
 
         """
-        logging.info('Cancelling order')
-        if order_id not in self.order_map:
-            if order_id not in self.order_status:
-                logging.info(
-                    f'Order {order_id} cancel failed - no such active order'
-                )
-                return False
+        key = self.order_status.slot(order_id)
+        handle = self.order_map.pop(key, None)
+        if handle is None:
+            if self._listeners:
+                self._emit(CancelRejectEvent(
+                    order_id, self._reject_reason(order_id)
+                ))
+            return False
+        pool = self.pool
+        price = pool.prices[handle]
+        order_book = (
+            self.buy_orders) if pool.sides[handle] == BUY else self.sell_orders
+
+        level = order_book[price]
+        level.remove(handle)
+        if not level:
+            del order_book[price]
+        if self.market_data is not None:
+            self._publish(
+                L3_DELETE, order_id, pool.sides[handle], price, 0, level
+            )
+        if self._listeners:
+            self._emit(CancelEvent(
+                order_id, SIDE_NAMES[pool.sides[handle]], price,
+                pool.quantities[handle]
+            ))
+        pool.release(handle)
+        self.order_status.set_slot_state(key, CANCELLED)
+        if self.expiries:
+            self.expiries.pop(key, None)
+        if self.order_owner:
+            self._drop_owner(key)
+        return True
+
+    def _set_owner(self, key: int, owner) -> None:
+        self.order_owner[key] = owner
+        orders = self.owners.get(owner)
+        if orders is None:
+            orders = self.owners[owner] = {}
+        orders[key] = None
+
+    def _drop_owner(self, key: int) -> None:
+        owner = self.order_owner.pop(key, None)
+        if owner is not None:
+            orders = self.owners[owner]
+            del orders[key]
+            if not orders:
+                del self.owners[owner]
+
+    def mass_cancel(
+            self,
+            owner=None,
+            side: str = None,
+            price_range: tuple = None
+    ) -> list:
+        """
+        To cancel every resting order matching all given filters. With
+        owner only the orders of that owner are visited, without owner
+        only the price levels in price_range, which are dropped whole -
+        the orders are not unlinked one by one and a side which becomes
+        empty is cleared in one call. Every order is reported by
+        CancelEvent as if it was cancelled by cancel_order
+        Args:
+            owner: owner tag given to add_order, None for any owner
+            side: 'buy' or 'sell', None for both sides
+            price_range: (low, high) inclusive, None bound is open;
+                None for all prices
+
+        Returns:
+            list of cancelled order ids
+
+        """
+        if side is None:
+            side_codes = (BUY, SELL)
+        else:
+            side_code = SIDE_CODES.get(side)
+            if side_code is None:
+                raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
+            side_codes = (side_code,)
+        low, high = (None, None) if price_range is None else price_range
+        if owner is not None:
+            return self._mass_cancel_owner(owner, side_codes, low, high)
+
+        cancelled = []
+        for side_code in side_codes:
+            if side_code == BUY:
+                book = self.buy_orders
+                prices = list(book.irange(high, low))
             else:
-                logging.info(
-                    f'Order {order_id} cancel failed - already fully filled'
+                book = self.sell_orders
+                prices = list(book.irange(low, high))
+            for price in prices:
+                self._cancel_level(book[price], side_code, price, cancelled)
+            _drop_levels(book, prices)
+        return cancelled
+
+    def _mass_cancel_owner(self, owner, side_codes, low, high) -> list:
+        orders = self.owners.get(owner)
+        if not orders:
+            return []
+        cancelled = []
+        pool, order_map = self.pool, self.order_map
+        prices, sides = pool.prices, pool.sides
+        ids = self.order_status.ids
+        emptied = {BUY: [], SELL: []}
+        for key in list(orders):
+            handle = order_map[key]
+            side_code = sides[handle]
+            price = prices[handle]
+            if side_code not in side_codes or (
+                    low is not None and price < low) or (
+                    high is not None and price > high):
+                continue
+            book = self.buy_orders if side_code == BUY else self.sell_orders
+            level = book[price]
+            level.remove(handle)
+            if not level:
+                emptied[side_code].append(price)
+            order_id = ids[key]
+            if self.market_data is not None:
+                self._publish(L3_DELETE, order_id, side_code, price, 0, level)
+            del order_map[key]
+            self._cancelled(key, order_id, handle, side_code, price)
+            cancelled.append(order_id)
+        _drop_levels(self.buy_orders, emptied[BUY])
+        _drop_levels(self.sell_orders, emptied[SELL])
+        return cancelled
+
+    def _cancel_level(self, level, side_code, price, cancelled) -> None:
+        """Cancelling all orders of a level which is dropped afterwards"""
+        next_links = self.pool.next
+        keys, ids = self.pool.order_ids, self.order_status.ids
+        sink = self.market_data
+        side = SIDE_NAMES[side_code]
+        handle = level.head
+        while handle != NIL:
+            next_handle = next_links[handle]
+            key = keys[handle]
+            order_id = ids[key]
+            del self.order_map[key]
+            if self._l3:
+                sink(OrderUpdate(L3_DELETE, order_id, side, price, 0))
+            self._cancelled(key, order_id, handle, side_code, price)
+            cancelled.append(order_id)
+            handle = next_handle
+        if sink is not None:
+            sink(LevelUpdate(side, price, 0, 0))
+
+    def _cancelled(self, key, order_id, handle, side_code, price) -> None:
+        """Bookkeeping of an order already taken off its level"""
+        if self._listeners:
+            self._emit(CancelEvent(
+                order_id, SIDE_NAMES[side_code], price,
+                self.pool.quantities[handle]
+            ))
+        self.pool.release(handle)
+        self.order_status.set_slot_state(key, CANCELLED)
+        if self.expiries:
+            self.expiries.pop(key, None)
+        if self.order_owner:
+            self._drop_owner(key)
+
+    def _reject_reason(self, order_id) -> str:
+        status = self.order_status.get(order_id)
+        if status is None:
+            return REJECT_UNKNOWN
+        if status == 'cancelled':
+            return REJECT_CANCELLED
+        if status == 'expired':
+            return REJECT_EXPIRED
+        return REJECT_FILLED
+
+    def set_expiry(self, order_id: str, expire_at: int) -> bool:
+        """
+        To set (or move) good-till-time deadline of a resting order
+        Args:
+            order_id: order id
+            expire_at: time at which expire() removes the order
+
+        Returns:
+            True if the order is on the book, False otherwise
+
+        """
+        key = self.order_status.slot(order_id)
+        if key not in self.order_map:
+            return False
+        if self.timers is None:
+            self.timers = TimerWheel(self.now)
+        self.expiries[key] = expire_at
+        self.timers.schedule(expire_at, key)
+        if self._listeners:
+            self._emit(ExpiryEvent(order_id, expire_at))
+        return True
+
+    def expire(self, now: int) -> list:
+        """
+        To advance the book time and remove resting orders whose
+        deadline is not after now. Only the due timers are visited, so
+        the cost is proportional to the number of expired orders. A move
+        of the book time is reported by ClockEvent, even when nothing
+        expires
+        Args:
+            now: current time, in the units of expire_at
+
+        Returns:
+            list of expired order ids
+
+        """
+        if now > self.now:
+            self.now = now
+            if self._listeners:
+                self._emit(ClockEvent(now))
+        if self.timers is None:
+            return []
+        expired = []
+        expiries, order_map, pool = self.expiries, self.order_map, self.pool
+        listeners = self._listeners
+        set_state = self.order_status.set_slot_state
+        ids = self.order_status.ids
+        for deadline, key in self.timers.advance(now):
+            if expiries.get(key) != deadline:
+                # cancelled, filled or moved to another deadline
+                continue
+            del expiries[key]
+            handle = order_map.pop(key, None)
+            if handle is None:
+                continue
+            order_id = ids[key]
+            price = pool.prices[handle]
+            side_code = pool.sides[handle]
+            order_book = self.buy_orders if side_code == BUY else (
+                self.sell_orders)
+            level = order_book[price]
+            level.remove(handle)
+            if not level:
+                del order_book[price]
+            if self.market_data is not None:
+                self._publish(L3_DELETE, order_id, side_code, price, 0, level)
+            if listeners:
+                self._emit(ExpiredEvent(
+                    order_id, SIDE_NAMES[side_code], price,
+                    pool.quantities[handle], now
+                ))
+            pool.release(handle)
+            set_state(key, EXPIRED)
+            if self.order_owner:
+                self._drop_owner(key)
+            expired.append(order_id)
+        return expired
+
+    def amend_order(
+            self,
+            order_id: str,
+            quantity: int = None,
+            price: int = None
+    ) -> bool:
+        """
+        To change resting order without cancel and add. Reducing the
+        quantity at the same price is done in place and keeps the queue
+        priority. A new price or a bigger quantity is an atomic
+        cancel/replace - the order is matched again at the new price
+        and the rest goes to the back of the level; executions are in
+        self.fills. Quantity 0 cancels the order
+        Args:
+            order_id: order id
+            quantity: new remaining quantity, None to keep it
+            price: new price, None to keep it
+
+        Returns:
+            True if order was amended, False if it is not on the book
+
+        """
+        key = self.order_status.slot(order_id)
+        handle = self.order_map.get(key)
+        if handle is None:
+            self.fills.reset(order_id)
+            if self._listeners:
+                self._emit(AmendRejectEvent(
+                    order_id, self._reject_reason(order_id)
+                ))
+            return False
+        if quantity is not None and quantity <= 0:
+            if quantity < 0:
+                raise ValueError(f'quantity must be >= 0, got {quantity!r}')
+            self.fills.reset(order_id)
+            return self.cancel_order(order_id)
+        pool = self.pool
+        side_code = pool.sides[handle]
+        old_price = pool.prices[handle]
+        old_quantity = pool.quantities[handle]
+        if price is None:
+            price = old_price
+        elif self._check_price is not None:
+            self._check_price(price)
+        if quantity is None:
+            quantity = old_quantity
+        order_book = self.buy_orders if side_code == BUY else self.sell_orders
+        side = SIDE_NAMES[side_code]
+
+        if price == old_price and quantity <= old_quantity:
+            self.fills.reset(order_id)
+            if self._listeners:
+                self._emit(AmendEvent(order_id, side, price, quantity))
+            pool.quantities[handle] = quantity
+            level = order_book[price]
+            level.quantity -= old_quantity - quantity
+            if self.market_data is not None:
+                self._publish(
+                    L3_MODIFY, order_id, side_code, price, quantity, level
                 )
-                return False
-        order = self.order_map.pop(order_id)
-        order_book = (
-            self.buy_orders) if order.side == 'buy' else self.sell_orders
+            return True
 
-        order_book[order.price].remove(order)
-        if not order_book[order.price]:
-            del order_book[order.price]
-        self.order_status[order_id] = 'cancelled'
-        logging.info(f'{order_id} Cancel, OK')
+        level = order_book[old_price]
+        level.remove(handle)
+        if not level:
+            del order_book[old_price]
+        if self.market_data is not None:
+            self._publish(L3_DELETE, order_id, side_code, old_price, 0, level)
+        del self.order_map[key]
+        pool.release(handle)
+        if self._listeners:
+            self._emit(AmendEvent(order_id, side, price, quantity))
+        state = self.order_status.slot_state(key)
+        order = Order(order_id, side_code, price, quantity, key)
+        self.match_orders(order)
+        if order.quantity > 0:
+            if not self.fills.count:
+                self.order_status.set_slot_state(key, state)
+            self._rest(key, order_id, side_code, price, order.quantity)
+        elif self.order_owner:
+            self._drop_owner(key)
         return True
 
+    def process_batch(
+            self,
+            order_ids,
+            sides,
+            prices,
+            quantities,
+            actions=None,
+            order_types=None
+    ) -> BatchFills:
+        """
+        To process whole batch of messages in a single loop. Columns can
+        be lists or NumPy arrays of the same length. Messages are
+        processed in order, so an invalid message raises ValueError
+        after all messages before it were applied. With instrument=True
+        the batch is timed as a whole - its adds are not recorded in
+        add_order_ns
+        Args:
+            order_ids: order ids
+            sides: side codes - 0 (BUY) or 1 (SELL), ignored for cancels
+                and amends
+            prices: prices, ignored for cancels; new price (or None)
+                for amends
+            quantities: quantities, ignored for cancels; new quantity
+                (or None) for amends
+            actions: optional action codes - 0 (ACTION_ADD),
+                1 (ACTION_CANCEL) or 2 (ACTION_AMEND); all messages
+                are adds if not given
+            order_types: optional order type codes of adds - LIMIT,
+                IOC, FOK or MARKET; all adds are limit orders if not
+                given
+
+        Returns:
+            BatchFills with executions of the whole batch
+
+        """
+        order_ids = _column(order_ids)
+        sides = _column(sides)
+        prices = _column(prices)
+        quantities = _column(quantities)
+        n = len(order_ids)
+        if actions is None:
+            actions = [ACTION_ADD] * n
+        else:
+            actions = _column(actions)
+        if not n == len(sides) == len(prices) == len(quantities) == len(
+                actions):
+            raise ValueError('batch columns must have the same length')
+        if order_types is None:
+            order_types = repeat(LIMIT, n)
+        else:
+            order_types = _column(order_types)
+            if len(order_types) != n:
+                raise ValueError('batch columns must have the same length')
+
+        result = BatchFills()
+        fills = self.fills
+        add_order = self._add_order
+        cancel_order = self.cancel_order
+        amend_order = self.amend_order
+        for index, (order_id, side, price, quantity, action,
+                    order_type) in enumerate(zip(
+                        order_ids, sides, prices, quantities, actions,
+                        order_types)):
+            if action == ACTION_ADD:
+                if side != BUY and side != SELL:
+                    raise ValueError(f'invalid side code {side!r} at {index}')
+                if not LIMIT <= order_type <= MARKET:
+                    raise ValueError(
+                        f'invalid order type code {order_type!r} at {index}'
+                    )
+                add_order(order_id, side, price, quantity, order_type)
+                if fills.count:
+                    result.extend(index, fills)
+            elif action == ACTION_CANCEL:
+                cancel_order(order_id)
+            elif action == ACTION_AMEND:
+                amend_order(order_id, quantity, price)
+                if fills.count:
+                    result.extend(index, fills)
+            else:
+                raise ValueError(f'invalid action code {action!r} at {index}')
+        return result
+
+    def add_orders_batch(
+            self,
+            order_ids,
+            sides,
+            prices,
+            quantities
+    ) -> BatchFills:
+        """
+        To add whole batch of orders, see process_batch
+        Args:
+            order_ids: order ids
+            sides: side codes - 0 (BUY) or 1 (SELL)
+            prices: prices
+            quantities: quantities
+
+        Returns:
+            BatchFills with executions of the whole batch
+
+        """
+        return self.process_batch(order_ids, sides, prices, quantities)
+
+    def best_bid(self):
+        """
+        To read the best (highest) buy level in O(1)
+        Returns:
+            LevelSummary(price, quantity, count) or None if there are
+            no buy orders
+
+        """
+        if not self.buy_orders:
+            return None
+        price, level = self.buy_orders.peekitem(0)
+        return LevelSummary(price, level.quantity, level.count)
+
+    def best_ask(self):
+        """
+        To read the best (lowest) sell level in O(1)
+        Returns:
+            LevelSummary(price, quantity, count) or None if there are
+            no sell orders
+
+        """
+        if not self.sell_orders:
+            return None
+        price, level = self.sell_orders.peekitem(0)
+        return LevelSummary(price, level.quantity, level.count)
+
+    def spread(self):
+        """
+        To read difference between best ask and best bid
+        Returns:
+            best ask price - best bid price, None if one side is empty
+
+        """
+        if not self.buy_orders or not self.sell_orders:
+            return None
+        return self.sell_orders.peekitem(0)[0] - self.buy_orders.peekitem(0)[0]
+
+    def depth(self, n: int = 10) -> tuple:
+        """
+        To take L2 snapshot of the n best levels of each side in O(n)
+        Args:
+            n: number of levels per side
+
+        Returns:
+            (bids, asks) - lists of LevelSummary, best level first
+
+        """
+        return (
+            [
+                LevelSummary(price, level.quantity, level.count)
+                for price, level in islice(self.buy_orders.items(), n)
+            ],
+            [
+                LevelSummary(price, level.quantity, level.count)
+                for price, level in islice(self.sell_orders.items(), n)
+            ],
+        )
+
     def match_orders(self, order: Order) -> None:
         """
-            Method that matches limit prices for orders from opposite side
+            Method that matches limit prices for orders from opposite side.
+            Executions are written to self.fills
 
             Args:
                 order: instance of class Order
@@ -97,68 +943,82 @@ class LimitOrderBook:
                 None
 
             """
-        matches = []
+        fills = self.fills
+        fills.reset(order.order_id)
+        pool = self.pool
+        quantities = pool.quantities
+        keys = pool.order_ids
+        order_map = self.order_map
+        order_status = self.order_status
+        ids = order_status.ids
+        set_status = order_status.set_slot_state
+        listeners = self._listeners
+        order_owner = self.order_owner
+        sink = self.market_data
+        l3 = self._l3
 
-        if order.side == 'buy':
-            book = self.sell_orders
-            price_condition = lambda p: p <= order.price
-        else:
-            book = self.buy_orders
-            price_condition = lambda p: p >= order.price
+        side = order.side
+        if side.__class__ is str:
+            side = SIDE_CODES[side]
+        key = order.key
+        if key is None:
+            key = order_status.intern(order.order_id)
+        is_buy = side == BUY
+        book = self.sell_orders if is_buy else self.buy_orders
+        resting_side = 'sell' if is_buy else 'buy'
+        limit_price = order.price
 
         while order.quantity > 0 and book:
-            best_price = next(iter(book))
+            best_price, resting_queue = book.peekitem(0)
 
-            if not price_condition(best_price):
+            if (best_price > limit_price) if is_buy else (
+                    best_price < limit_price):
                 break
 
-            resting_queue = book[best_price]
-
             while order.quantity > 0 and resting_queue:
-                resting_order = resting_queue[0]
-                executed_qty = min(order.quantity, resting_order.quantity)
-                matches.append(
-                    (
-                        resting_order.order_id,
-                        executed_qty,
-                        best_price
-                    )
-                )
+                handle = resting_queue.head
+                resting_key = keys[handle]
+                resting_id = ids[resting_key]
+                resting_qty = quantities[handle]
+                executed_qty = min(order.quantity, resting_qty)
+                fills.append(resting_id, executed_qty, best_price)
 
                 order.quantity -= executed_qty
-                resting_order.quantity -= executed_qty
-                msg1 = (
-                    f"""
-{order} Fully matched with {
-                    resting_order.order_id} ({executed_qty} @ {best_price})
-"""
-                )
-                msg2 = (
-                    f"""
-{order} Partially matched with {
-                    resting_order.order_id} ({executed_qty} @ {best_price})
-                """
-                )
-                if order.quantity == 0:
-
-                    logging.info(msg1)
-                else:
-                    logging.info(msg2)
+                resting_qty -= executed_qty
+                quantities[handle] = resting_qty
+                resting_queue.quantity -= executed_qty
+                if listeners:
+                    self._emit(TradeEvent(
+                        order.order_id, resting_id, SIDE_NAMES[side],
+                        executed_qty, best_price, order.quantity
+                    ))
+                if l3:
+                    sink(OrderUpdate(
+                        L3_MODIFY if resting_qty else L3_DELETE, resting_id,
+                        resting_side, best_price, resting_qty
+                    ))
 
-                if resting_order.quantity == 0:
-                    self.order_status[resting_order.order_id] = 'filled'
-                    resting_queue.popleft()
-                    if resting_order.order_id in self.order_map:
-                        del self.order_map[resting_order.order_id]
+                if resting_qty == 0:
+                    set_status(resting_key, FILLED)
+                    resting_queue.remove(handle)
+                    pool.release(handle)
+                    order_map.pop(resting_key, None)
+                    if order_owner:
+                        self._drop_owner(resting_key)
                 else:
-                    self.order_status[resting_order.order_id] = 'partial'
+                    set_status(resting_key, PARTIAL)
 
+            if sink is not None:
+                sink(LevelUpdate(
+                    resting_side, best_price, resting_queue.quantity,
+                    resting_queue.count
+                ))
             if not resting_queue:
                 del book[best_price]
 
         if order.quantity == 0:
-            self.order_status[order.order_id] = 'filled'
-        elif matches:
-            self.order_status[order.order_id] = 'partial'
+            set_status(key, FILLED)
+        elif fills.count:
+            set_status(key, PARTIAL)
         else:
-            self.order_status[order.order_id] = 'active'
+            set_status(key, ACTIVE)
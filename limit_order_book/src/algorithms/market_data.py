@@ -0,0 +1,143 @@
+import time
+
+from src.data_structures.events import LevelUpdate
+
+
+class MarketDataFeed:
+    """
+    MarketDataFeed is the market data sink of a book which fans updates
+    out to subscribers.
+    Main idea:
+    - the book only appends its updates to a pending list
+    (lob.set_market_data(feed)), so the matching cost does not depend
+    on the number or the speed of subscribers
+    - publish(), called by the owner of the book between book calls,
+    hands the pending batch to every subscriber in one call each
+    - seq counts published updates, so a subscriber can check that it
+    saw every batch
+    - a slow subscriber should be wrapped in ConflatingPublisher
+    """
+    def __init__(self):
+        self._pending = []
+        self._subscribers = []
+        self.seq = 0
+
+    def __call__(self, update) -> None:
+        self._pending.append(update)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def subscribe(self, subscriber) -> None:
+        """
+        To register subscriber
+        Args:
+            subscriber: callable taking list of updates (LevelUpdate,
+                OrderUpdate) in the order the book made them
+
+        Returns:
+            None
+
+        """
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber) -> None:
+        self._subscribers.remove(subscriber)
+
+    def publish(self) -> int:
+        """
+        To send pending updates to all subscribers
+        Returns:
+            number of published updates
+
+        """
+        batch = self._pending
+        if not batch:
+            return 0
+        self._pending = []
+        self.seq += len(batch)
+        for subscriber in self._subscribers:
+            subscriber(batch)
+        return len(batch)
+
+
+class ConflatingPublisher:
+    """
+    ConflatingPublisher is a feed subscriber which merges updates for a
+    slow consumer.
+    Main idea:
+    - LevelUpdates are kept per (side, price) and only the latest one
+    is delivered, so a level changed many times in a window costs the
+    consumer a single update
+    - OrderUpdates (L3) cannot be merged without losing queue position,
+    so they are delivered unchanged and in order
+    - the window is closed (merged updates delivered) when max_updates
+    updates arrived or interval seconds passed since the window was
+    opened; the interval is checked when updates arrive and by poll()
+    """
+    def __init__(
+            self,
+            subscriber,
+            max_updates: int = None,
+            interval: float = None,
+            clock=time.monotonic
+    ):
+        self.subscriber = subscriber
+        self.max_updates = max_updates
+        self.interval = interval
+        self.clock = clock
+        self.received = 0
+        self.delivered = 0
+        self._levels = {}
+        self._orders = []
+        self._count = 0
+        self._opened = None
+
+    def __call__(self, updates) -> None:
+        if self._opened is None:
+            self._opened = self.clock()
+        levels, orders = self._levels, self._orders
+        for update in updates:
+            if type(update) is LevelUpdate:
+                levels[update.side, update.price] = update
+            else:
+                orders.append(update)
+        self._count += len(updates)
+        self.received += len(updates)
+        if self.max_updates is not None and self._count >= self.max_updates:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self) -> int:
+        """
+        To close the window if the interval passed
+        Returns:
+            number of delivered updates
+
+        """
+        if self._opened is None or self.interval is None or (
+                self.clock() - self._opened < self.interval):
+            return 0
+        return self.flush()
+
+    def flush(self) -> int:
+        """
+        To deliver merged updates now - L3 updates first, then the
+        latest state of every changed level
+        Returns:
+            number of delivered updates
+
+        """
+        if self._opened is None:
+            return 0
+        updates = self._orders
+        updates.extend(self._levels.values())
+        self._levels = {}
+        self._orders = []
+        self._count = 0
+        self._opened = None
+        self.delivered += len(updates)
+        if updates:
+            self.subscriber(updates)
+        return len(updates)
@@ -0,0 +1,242 @@
+import logging
+from typing import NamedTuple
+
+REJECT_UNKNOWN = 'unknown'
+REJECT_FILLED = 'filled'
+REJECT_CANCELLED = 'cancelled'
+REJECT_EXPIRED = 'expired'
+
+L3_ADD = 'add'
+L3_MODIFY = 'modify'
+L3_DELETE = 'delete'
+
+
+class AckEvent(NamedTuple):
+    """
+    Order accepted by the book (emitted before matching). order_type is
+    'limit', 'ioc', 'fok' or 'market' (price is None for market orders);
+    owner is the owner tag given to add_order
+    """
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+    order_type: str = 'limit'
+    owner: object = None
+
+
+class TradeEvent(NamedTuple):
+    """
+    Single fill between incoming (aggressor) and resting order.
+    remaining is the aggressor quantity left after this fill.
+    """
+    aggressor_id: str
+    resting_id: str
+    side: str
+    quantity: int
+    price: int
+    remaining: int
+
+
+class CancelEvent(NamedTuple):
+    """Resting order removed from the book, quantity is the cancelled rest"""
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+
+
+class CancelRejectEvent(NamedTuple):
+    """
+    Cancel of an order which is not on the book, reason is one of
+    'unknown', 'filled', 'cancelled' or 'expired'
+    """
+    order_id: str
+    reason: str
+
+
+class KillEvent(NamedTuple):
+    """
+    Unfilled rest of an IOC, FOK or market order, dropped instead of
+    resting on the book; for a killed FOK it is the whole quantity
+    """
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+
+
+class AmendEvent(NamedTuple):
+    """
+    Resting order changed, price and quantity are the new values
+    (quantity is the new remaining quantity). Emitted before a replaced
+    order is matched again
+    """
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+
+
+class AmendRejectEvent(NamedTuple):
+    """
+    Amend of an order which is not on the book, reason is one of
+    'unknown', 'filled', 'cancelled' or 'expired'
+    """
+    order_id: str
+    reason: str
+
+
+class ExpiryEvent(NamedTuple):
+    """Good-till-time deadline set on a resting order"""
+    order_id: str
+    expire_at: int
+
+
+class ClockEvent(NamedTuple):
+    """Book time moved forward by LimitOrderBook.expire"""
+    now: int
+
+
+class ExpiredEvent(NamedTuple):
+    """
+    Resting order removed by its deadline, quantity is the expired rest
+    and now is the time passed to LimitOrderBook.expire
+    """
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+    now: int
+
+
+class LevelUpdate(NamedTuple):
+    """
+    L2 market data - new aggregates of a price level after a change;
+    count 0 (and quantity 0) means the level left the book
+    """
+    side: str
+    price: int
+    quantity: int
+    count: int
+
+
+class OrderUpdate(NamedTuple):
+    """
+    L3 market data - change of a single resting order. action is 'add'
+    (order rests on the book), 'modify' (new remaining quantity after a
+    fill or amend, queue position kept) or 'delete' (order left the
+    book, quantity is 0)
+    """
+    action: str
+    order_id: str
+    side: str
+    price: int
+    quantity: int
+
+
+class EventRingBuffer:
+    """
+    EventRingBuffer is a fixed size listener which keeps the last
+    `size` events.
+    Main idea:
+    - slots are preallocated and overwritten in place, so storing an
+    event never allocates
+    - when a consumer is too slow the oldest events are overwritten
+    and counted in `dropped`
+    """
+    def __init__(self, size: int = 65536):
+        self.size = size
+        self._slots = [None] * size
+        self._write = 0
+        self._read = 0
+        self.dropped = 0
+
+    def __call__(self, event) -> None:
+        write = self._write
+        self._slots[write % self.size] = event
+        write += 1
+        self._write = write
+        if write - self._read > self.size:
+            self._read += 1
+            self.dropped += 1
+
+    def __len__(self) -> int:
+        return self._write - self._read
+
+    def drain(self) -> list:
+        """
+        To read and remove all buffered events, oldest first
+        Returns:
+            list of events
+
+        """
+        slots, size = self._slots, self.size
+        events = [slots[i % size] for i in range(self._read, self._write)]
+        self._read = self._write
+        return events
+
+
+class LoggingListener:
+    """
+    LoggingListener turns book events into the INFO log lines the book
+    used to write itself. Formatting only happens when INFO is enabled
+    for the logger.
+    """
+    def __init__(self, logger: logging.Logger = None):
+        self.logger = logger or logging.getLogger('limit_order_book')
+        self._order = None
+
+    def __call__(self, event) -> None:
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        log = self.logger.info
+        if type(event) is TradeEvent:
+            kind = 'Fully' if event.remaining == 0 else 'Partially'
+            log(
+                f"\n{self._order} {kind} matched with "
+                f"{event.resting_id} ({event.quantity} @ {event.price})\n"
+            )
+        elif type(event) is AckEvent:
+            self._order = (
+                f"{event.order_id} {event.side} {event.quantity} @ {event.price}"
+            )
+            if event.order_type != 'limit':
+                self._order += f" {event.order_type.upper()}"
+            log("Adding order")
+            log(f"{self._order} - OK")
+        elif type(event) is CancelEvent:
+            log('Cancelling order')
+            log(f'{event.order_id} Cancel, OK')
+        elif type(event) is CancelRejectEvent:
+            log('Cancelling order')
+            if event.reason == REJECT_FILLED:
+                log(f'Order {event.order_id} cancel failed - already fully filled')
+            elif event.reason == REJECT_CANCELLED:
+                log(f'Order {event.order_id} cancel failed - already cancelled')
+            elif event.reason == REJECT_EXPIRED:
+                log(f'Order {event.order_id} cancel failed - already expired')
+            else:
+                log(f'Order {event.order_id} cancel failed - no such active order')
+        elif type(event) is KillEvent:
+            log(f'{event.order_id} {event.quantity} unfilled - cancelled')
+        elif type(event) is ExpiredEvent:
+            log(f'{event.order_id} expired, {event.quantity} unfilled')
+        elif type(event) is ExpiryEvent:
+            log(f'{event.order_id} expires at {event.expire_at}')
+        elif type(event) is AmendEvent:
+            self._order = (
+                f"{event.order_id} {event.side} {event.quantity} @ {event.price}"
+            )
+            log('Amending order')
+            log(f'{self._order} - OK')
+        elif type(event) is AmendRejectEvent:
+            log('Amending order')
+            if event.reason == REJECT_FILLED:
+                log(f'Order {event.order_id} amend failed - already fully filled')
+            elif event.reason == REJECT_CANCELLED:
+                log(f'Order {event.order_id} amend failed - already cancelled')
+            elif event.reason == REJECT_EXPIRED:
+                log(f'Order {event.order_id} amend failed - already expired')
+            else:
+                log(f'Order {event.order_id} amend failed - no such active order')
@@ -0,0 +1,155 @@
+from array import array
+from typing import NamedTuple
+
+
+class Fill(NamedTuple):
+    """Single execution of the aggressor against a resting order"""
+    resting_id: str
+    aggressor_id: str
+    quantity: int
+    price: int
+
+
+class Fills:
+    """
+    Fills is a reusable, preallocated result of a single add_order call.
+    Main idea:
+    - executions are written into columns (resting ids, quantities,
+    prices) which are reset, not reallocated, on every call
+    - the columns only grow (doubling) when an order executes against
+    more resting orders than ever before
+    - the same instance is returned on every call, so copy it
+    (e.g. list(fills)) if it has to outlive the next add_order
+    """
+    __slots__ = (
+        'aggressor_id', 'resting_ids', 'quantities', 'prices', 'count',
+        'capacity'
+    )
+
+    def __init__(self, capacity: int = 64):
+        capacity = max(int(capacity), 1)
+        self.aggressor_id = None
+        self.resting_ids = [None] * capacity
+        self.quantities = array('q', bytes(8 * capacity))
+        self.prices = array('q', bytes(8 * capacity))
+        self.count = 0
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Fill:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('fill index out of range')
+        return Fill(
+            self.resting_ids[index], self.aggressor_id,
+            self.quantities[index], self.prices[index]
+        )
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield Fill(
+                self.resting_ids[index], self.aggressor_id,
+                self.quantities[index], self.prices[index]
+            )
+
+    def reset(self, aggressor_id: str) -> None:
+        """
+        To start collecting executions of the new aggressor
+        Args:
+            aggressor_id: order id of the incoming order
+
+        Returns:
+            None
+
+        """
+        self.aggressor_id = aggressor_id
+        self.count = 0
+
+    def append(self, resting_id: str, quantity: int, price: int) -> None:
+        """
+        To record execution against resting order
+        Args:
+            resting_id: order id of the resting order
+            quantity: executed quantity
+            price: execution price
+
+        Returns:
+            None
+
+        """
+        index = self.count
+        if index == self.capacity:
+            self._grow()
+        self.resting_ids[index] = resting_id
+        self.quantities[index] = quantity
+        self.prices[index] = price
+        self.count = index + 1
+
+    @property
+    def total_quantity(self) -> int:
+        return sum(self.quantities[:self.count])
+
+    def _grow(self) -> None:
+        extra = self.capacity
+        self.resting_ids.extend([None] * extra)
+        self.quantities.extend(array('q', bytes(8 * extra)))
+        self.prices.extend(array('q', bytes(8 * extra)))
+        self.capacity += extra
+
+
+class BatchFills:
+    """
+    BatchFills holds executions of a whole batch in columnar form.
+    Row i of every column describes one execution; order_index is the
+    position of the aggressor message in the batch.
+    """
+    __slots__ = (
+        'order_index', 'aggressor_ids', 'resting_ids', 'quantities', 'prices'
+    )
+
+    def __init__(self):
+        self.order_index = array('q')
+        self.aggressor_ids = []
+        self.resting_ids = []
+        self.quantities = array('q')
+        self.prices = array('q')
+
+    def __len__(self) -> int:
+        return len(self.order_index)
+
+    def extend(self, index: int, fills: Fills) -> None:
+        """
+        To copy executions of a single order into the batch columns
+        Args:
+            index: position of the aggressor message in the batch
+            fills: executions of that message
+
+        Returns:
+            None
+
+        """
+        count = fills.count
+        self.order_index.extend([index] * count)
+        self.aggressor_ids.extend([fills.aggressor_id] * count)
+        self.resting_ids.extend(fills.resting_ids[:count])
+        self.quantities.extend(fills.quantities[:count])
+        self.prices.extend(fills.prices[:count])
+
+    def to_numpy(self) -> dict:
+        """
+        To convert columns to NumPy arrays (requires numpy)
+        Returns:
+            dict of column name to numpy.ndarray
+
+        """
+        import numpy as np
+        return {
+            'order_index': np.frombuffer(self.order_index, dtype=np.int64),
+            'aggressor_ids': np.array(self.aggressor_ids),
+            'resting_ids': np.array(self.resting_ids),
+            'quantities': np.frombuffer(self.quantities, dtype=np.int64),
+            'prices': np.frombuffer(self.prices, dtype=np.int64),
+        }
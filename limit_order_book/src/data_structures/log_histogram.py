@@ -0,0 +1,118 @@
+from array import array
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+
+
+class LogHistogram:
+    """
+    LogHistogram is an HDR-style histogram of non-negative integers
+    (latencies in ns, counts).
+    Main idea:
+    - values below 32 have exact buckets
+    - above that every power of two is split into 16 linear sub-buckets,
+    so any recorded value is known within ~6% while the whole range up to
+    2**max_bits fits into a few hundred counters in a flat array
+    - recording is a bit_length, a shift and an array increment
+    """
+    def __init__(self, max_bits: int = 40):
+        self.max_bits = max_bits
+        size = SUB_BUCKETS + (max_bits - SUB_BUCKET_BITS + 1) * HALF_SUB_BUCKETS
+        self.counts = array('Q', bytes(8 * size))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (
+            (value >> shift) - HALF_SUB_BUCKETS)
+
+    @staticmethod
+    def upper_bound(index: int) -> int:
+        if index < SUB_BUCKETS:
+            return index
+        shift, sub_bucket = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+        shift += 1
+        return ((sub_bucket + HALF_SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        """
+        To add one value (clamped to the histogram range)
+        Args:
+            value: non-negative integer
+
+        Returns:
+            None
+
+        """
+        if value < SUB_BUCKETS:
+            index = value if value > 0 else 0
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS
+            index = SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (
+                (value >> shift) - HALF_SUB_BUCKETS)
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, fraction: float) -> int:
+        """
+        To read value at the given quantile
+        Args:
+            fraction: quantile in [0, 1], e.g. 0.99
+
+        Returns:
+            upper bound of the bucket holding the quantile (never more
+            than the maximum recorded value), 0 if empty
+
+        """
+        if not self.count:
+            return 0
+        rank = max(int(fraction * self.count + 0.5), 1)
+        seen = 0
+        last = len(self.counts) - 1
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index == last:
+                    # values above the range are clamped into this bucket
+                    return self.max
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def reset(self) -> None:
+        self.counts = array('Q', bytes(8 * len(self.counts)))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def snapshot(self) -> dict:
+        """
+        To export summary for monitoring
+        Returns:
+            dict with count, min, max, mean and p50/p90/p99/p999
+
+        """
+        return {
+            'count': self.count,
+            'min': self.min or 0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'p999': self.percentile(0.999),
+        }
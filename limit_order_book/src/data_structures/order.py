@@ -1,19 +1,34 @@
-from dataclasses import dataclass
+from src.data_structures.order_pool import SIDE_NAMES
+
+LIMIT = 0
+IOC = 1
+FOK = 2
+MARKET = 3
+ORDER_TYPE_CODES = {'limit': LIMIT, 'ioc': IOC, 'fok': FOK, 'market': MARKET}
+ORDER_TYPE_NAMES = ('limit', 'ioc', 'fok', 'market')
 
 
-@dataclass
 class Order:
-    def __init__(self, order_id, side, price, quantity):
+    """
+    Order is an incoming (aggressive) order. Resting orders are kept
+    in OrderPool, so Order only lives for the duration of add_order and
+    uses __slots__ instead of a per-instance __dict__. The book creates
+    it with the side code (BUY / SELL) and the interned id in key;
+    side may also be given as 'buy' / 'sell'.
+    """
+    __slots__ = (
+        'order_id', 'side', 'price', 'quantity', 'original_quantity', 'key'
+    )
+
+    def __init__(self, order_id, side, price, quantity, key=None):
         self.order_id = order_id
-        self.side = side.lower()
+        self.side = side
         self.price = price
         self.quantity = quantity
         self.original_quantity = quantity
+        self.key = key
 
     def __repr__(self):
-        dsc = (
-            f"""
-{self.order_id} {self.side} {self.original_quantity} @ {self.price}
-"""
-        )
-        return dsc
+        side = self.side if isinstance(self.side, str) else (
+            SIDE_NAMES[self.side])
+        return f"{self.order_id} {side} {self.original_quantity} @ {self.price}"
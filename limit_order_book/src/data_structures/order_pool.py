@@ -0,0 +1,126 @@
+from array import array
+
+NIL = -1
+BUY = 0
+SELL = 1
+SIDE_CODES = {'buy': BUY, 'sell': SELL}
+SIDE_NAMES = ('buy', 'sell')
+
+
+class OrderPool:
+    """
+    OrderPool is a preallocated struct-of-arrays storage for resting
+    orders.
+    Main idea:
+    - every resting order is an integer handle - an index into flat
+    arrays of ids, sides, prices, quantities and prev/next links, so no
+    per-order Python object (and no __dict__) is allocated
+    - released handles are chained through the `next` array and reused
+    before the pool grows
+    - capacity doubles when the pool is full
+    """
+    def __init__(self, capacity: int = 1024):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.order_ids = [None] * capacity
+        self.sides = bytearray(capacity)
+        self.prices = array('q', bytes(8 * capacity))
+        self.quantities = array('q', bytes(8 * capacity))
+        self.prev = array('i', [NIL]) * capacity
+        self.next = array('i', [NIL]) * capacity
+        self._size = 0
+        self._free_head = NIL
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def allocate(
+            self,
+            order_id: str,
+            side: int,
+            price: int,
+            quantity: int
+    ) -> int:
+        """
+        To store new resting order in the pool
+        Args:
+            order_id: order id (LimitOrderBook stores the interned key)
+            side: BUY or SELL code
+            price: the price of the order
+            quantity: remaining quantity of the order
+
+        Returns:
+            handle of the stored order
+
+        """
+        handle = self._free_head
+        if handle != NIL:
+            self._free_head = self.next[handle]
+        else:
+            if self._size == self.capacity:
+                self._grow()
+            handle = self._size
+            self._size += 1
+        self.order_ids[handle] = order_id
+        self.sides[handle] = side
+        self.prices[handle] = price
+        self.quantities[handle] = quantity
+        self.prev[handle] = NIL
+        self.next[handle] = NIL
+        self._live += 1
+        return handle
+
+    def release(self, handle: int) -> None:
+        """
+        To return handle of the order which left the book to the pool
+        Args:
+            handle: handle of the order
+
+        Returns:
+            None
+
+        """
+        self.order_ids[handle] = None
+        self.quantities[handle] = 0
+        self.prev[handle] = NIL
+        self.next[handle] = self._free_head
+        self._free_head = handle
+        self._live -= 1
+
+    def load(self, order_ids: list, sides, prices, quantities) -> None:
+        """
+        To bulk load orders into an empty pool as handles 0..n-1
+        (used by snapshot restore). Links are left unset - they are
+        built by PriceLevel.from_range
+        Args:
+            order_ids: list of order ids
+            sides: bytes-like of side codes
+            prices: array('q') of prices
+            quantities: array('q') of quantities
+
+        Returns:
+            None
+
+        """
+        if self._live or self._size:
+            raise ValueError('pool has to be empty to load orders')
+        n = len(order_ids)
+        while self.capacity < n:
+            self._grow()
+        self.order_ids[:n] = order_ids
+        self.sides[:n] = sides
+        self.prices[:n] = prices
+        self.quantities[:n] = quantities
+        self._size = n
+        self._live = n
+
+    def _grow(self) -> None:
+        extra = self.capacity
+        self.order_ids.extend([None] * extra)
+        self.sides.extend(bytes(extra))
+        self.prices.extend(array('q', bytes(8 * extra)))
+        self.quantities.extend(array('q', bytes(8 * extra)))
+        self.prev.extend(array('i', [NIL]) * extra)
+        self.next.extend(array('i', [NIL]) * extra)
+        self.capacity += extra
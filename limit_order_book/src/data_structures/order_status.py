@@ -0,0 +1,232 @@
+import time
+from collections import deque
+from collections.abc import Mapping
+from enum import IntEnum
+
+
+class OrderState(IntEnum):
+    UNKNOWN = 0
+    ACTIVE = 1
+    PARTIAL = 2
+    FILLED = 3
+    CANCELLED = 4
+    EXPIRED = 5
+
+
+UNKNOWN = OrderState.UNKNOWN
+ACTIVE = OrderState.ACTIVE
+PARTIAL = OrderState.PARTIAL
+FILLED = OrderState.FILLED
+CANCELLED = OrderState.CANCELLED
+EXPIRED = OrderState.EXPIRED
+FIRST_TERMINAL = FILLED
+STATE_NAMES = (None, 'active', 'partial', 'filled', 'cancelled', 'expired')
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES) if name}
+
+
+class OrderStatusStore(Mapping):
+    """
+    OrderStatusStore keeps the status of every order seen by the book.
+    Main idea:
+    - order ids are interned to small integer slots and the status is
+    one byte (OrderState) per slot in a bytearray; the slot is the id
+    LimitOrderBook works with internally and `ids` translates it back
+    - orders in a terminal state (filled, cancelled, expired) are
+    retired in the order they finished and evicted once there are more
+    than max_terminal of them or they are older than max_age seconds;
+    evicted slots are reused for new ids
+    - order ids are expected to be unique; an id reused after its
+    order finished is retired by its first terminal state
+    - reading it as a Mapping returns the legacy status names
+    ('active', 'partial', 'filled', 'cancelled', 'expired')
+    """
+    def __init__(
+            self,
+            max_terminal: int = None,
+            max_age: float = None,
+            clock=time.monotonic
+    ):
+        self.max_terminal = max_terminal
+        self.max_age = max_age
+        self.clock = clock
+        self._slots = {}
+        self.ids = []
+        self._states = bytearray()
+        self._free = []
+        self._retired = deque()
+        self._retired_at = deque()
+        self._track = max_terminal is not None or max_age is not None
+
+    def __getitem__(self, order_id) -> str:
+        return STATE_NAMES[self._states[self._slots[order_id]]]
+
+    def __contains__(self, order_id) -> bool:
+        return order_id in self._slots
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __setitem__(self, order_id, state) -> None:
+        if isinstance(state, str):
+            state = STATE_CODES[state]
+        self.set_state(order_id, state)
+
+    def intern(self, order_id) -> int:
+        """
+        To get slot of the order id, allocating one if needed
+        Args:
+            order_id: order id
+
+        Returns:
+            integer slot of the order id
+
+        """
+        slot = self._slots.get(order_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self.ids[slot] = order_id
+            else:
+                slot = len(self.ids)
+                self.ids.append(order_id)
+                self._states.append(UNKNOWN)
+            self._slots[order_id] = slot
+        return slot
+
+    def slot(self, order_id):
+        """
+        To find slot of the order id without allocating one
+        Args:
+            order_id: order id
+
+        Returns:
+            integer slot, None if the id is not stored
+
+        """
+        return self._slots.get(order_id)
+
+    def state(self, order_id) -> int:
+        """
+        To read status code of the order
+        Args:
+            order_id: order id
+
+        Returns:
+            OrderState code, UNKNOWN if the order was never seen or its
+            status was already evicted
+
+        """
+        slot = self._slots.get(order_id)
+        return UNKNOWN if slot is None else self._states[slot]
+
+    def set_state(self, order_id, state: int) -> None:
+        """
+        To store status code of the order
+        Args:
+            order_id: order id
+            state: OrderState code
+
+        Returns:
+            None
+
+        """
+        slot = self._slots.get(order_id)
+        if slot is None:
+            slot = self.intern(order_id)
+        self.set_slot_state(slot, state)
+
+    def slot_state(self, slot: int) -> int:
+        return self._states[slot]
+
+    def set_slot_state(self, slot: int, state: int) -> None:
+        """
+        To store status code of an interned order (see intern)
+        Args:
+            slot: slot of the order id
+            state: OrderState code
+
+        Returns:
+            None
+
+        """
+        self._states[slot] = state
+        if state >= FIRST_TERMINAL and self._track:
+            self._retired.append(slot)
+            if self.max_age is not None:
+                self._retired_at.append(self.clock())
+            self.evict()
+
+    def columns(self) -> tuple:
+        """
+        To read all stored statuses at once (used by snapshots)
+        Returns:
+            (list of order ids, bytes of OrderState codes)
+
+        """
+        return (
+            list(self._slots),
+            bytes(map(self._states.__getitem__, self._slots.values()))
+        )
+
+    def slots(self):
+        """Slots in the order of columns()"""
+        return self._slots.values()
+
+    def load(self, order_ids: list, states) -> None:
+        """
+        To bulk load statuses into an empty store (used by snapshot
+        restore) - the i-th id gets slot i. Terminal statuses are
+        retired in the given order
+        Args:
+            order_ids: list of unique order ids
+            states: bytes-like of OrderState codes
+
+        Returns:
+            None
+
+        """
+        if self._slots:
+            raise ValueError('store has to be empty to load statuses')
+        self.ids = list(order_ids)
+        self._slots = dict(zip(self.ids, range(len(self.ids))))
+        self._states = bytearray(states)
+        if self._track:
+            now = self.clock()
+            for slot, state in enumerate(self._states):
+                if state >= FIRST_TERMINAL:
+                    self._retired.append(slot)
+                    if self.max_age is not None:
+                        self._retired_at.append(now)
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        To drop terminal statuses outside of the retention window
+        Returns:
+            number of evicted statuses
+
+        """
+        retired, retired_at = self._retired, self._retired_at
+        max_terminal, max_age = self.max_terminal, self.max_age
+        deadline = None if max_age is None else self.clock() - max_age
+        evicted = 0
+        while retired and (
+                (max_terminal is not None and len(retired) > max_terminal)
+                or (deadline is not None and retired_at[0] <= deadline)
+        ):
+            slot = retired.popleft()
+            if max_age is not None:
+                retired_at.popleft()
+            if self._states[slot] >= FIRST_TERMINAL:
+                self._release(slot)
+                evicted += 1
+        return evicted
+
+    def _release(self, slot: int) -> None:
+        del self._slots[self.ids[slot]]
+        self.ids[slot] = None
+        self._states[slot] = UNKNOWN
+        self._free.append(slot)
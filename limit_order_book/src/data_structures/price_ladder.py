@@ -0,0 +1,242 @@
+from array import array
+
+
+class PriceLadder:
+    """
+    PriceLadder is an array-backed alternative to SortedDict for one side
+    of the book, for instruments with a bounded integer tick grid.
+    Main idea:
+    - levels are kept in a flat list indexed by (price - min_price) / tick
+    - a bitmap of non-empty levels (64 levels per word) lets the ladder
+    skip empty levels when looking for the next best price
+    - index of the best level is cached, so reading top of book is O(1)
+    - it implements the part of the SortedDict interface used by
+    LimitOrderBook, so both backends are interchangeable
+    """
+    def __init__(
+            self,
+            min_price: int,
+            max_price: int,
+            tick: int = 1,
+            descending: bool = False
+    ):
+        if tick <= 0 or max_price < min_price:
+            raise ValueError('invalid ladder bounds')
+        if (max_price - min_price) % tick:
+            raise ValueError('max_price has to lie on the tick grid')
+        self.min_price = min_price
+        self.max_price = max_price
+        self.tick = tick
+        self.descending = descending
+        self.size = (max_price - min_price) // tick + 1
+        self.levels = [None] * self.size
+        self.words = array('Q', bytes(8 * ((self.size + 63) >> 6)))
+        self.best = -1
+        self._len = 0
+
+    def index(self, price: int) -> int:
+        """
+        To translate price to the ladder index
+        Args:
+            price: the price on the tick grid
+
+        Returns:
+            index of the level, -1 if price is outside the grid
+
+        """
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            return -1
+        return offset // self.tick
+
+    def check_price(self, price: int) -> None:
+        # called for every add, so the grid check is inlined
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            raise ValueError(
+                f'price {price} is not on the ladder grid '
+                f'[{self.min_price}, {self.max_price}] step {self.tick}'
+            )
+
+    def price(self, index: int) -> int:
+        return self.min_price + index * self.tick
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __contains__(self, price) -> bool:
+        index = self.index(price)
+        return index >= 0 and self.levels[index] is not None
+
+    def __getitem__(self, price):
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            raise KeyError(price)
+        level = self.levels[offset // self.tick]
+        if level is None:
+            raise KeyError(price)
+        return level
+
+    def get(self, price, default=None):
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            return default
+        level = self.levels[offset // self.tick]
+        return default if level is None else level
+
+    def __setitem__(self, price, level) -> None:
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            self.check_price(price)
+        index = offset // self.tick
+        levels = self.levels
+        if levels[index] is None:
+            self._len += 1
+            self.words[index >> 6] |= 1 << (index & 63)
+            best = self.best
+            if best < 0 or (
+                    index > best if self.descending else index < best):
+                self.best = index
+        levels[index] = level
+
+    def __delitem__(self, price) -> None:
+        offset = price - self.min_price
+        if offset < 0 or price > self.max_price or offset % self.tick:
+            raise KeyError(price)
+        index = offset // self.tick
+        levels = self.levels
+        if levels[index] is None:
+            raise KeyError(price)
+        levels[index] = None
+        self.words[index >> 6] &= ~(1 << (index & 63)) & 0xFFFFFFFFFFFFFFFF
+        self._len -= 1
+        if index == self.best:
+            self.best = self._next_index(index)
+
+    def _next_index(self, index: int) -> int:
+        """
+        To find the next non-empty level after index in priority order
+        (towards worse prices) using the bitmap
+        Args:
+            index: index to start after
+
+        Returns:
+            index of the next non-empty level, -1 if there is none
+
+        """
+        words = self.words
+        if self.descending:
+            index -= 1
+            if index < 0:
+                return -1
+            word_index = index >> 6
+            word = words[word_index] & ((2 << (index & 63)) - 1)
+            while True:
+                if word:
+                    return (word_index << 6) + word.bit_length() - 1
+                word_index -= 1
+                if word_index < 0:
+                    return -1
+                word = words[word_index]
+        index += 1
+        if index >= self.size:
+            return -1
+        word_index = index >> 6
+        word = words[word_index] >> (index & 63) << (index & 63)
+        last_word = len(words) - 1
+        while True:
+            if word:
+                return (word_index << 6) + (word & -word).bit_length() - 1
+            word_index += 1
+            if word_index > last_word:
+                return -1
+            word = words[word_index]
+
+    def peekitem(self, index: int = 0):
+        """
+        To read the best level (SortedDict.peekitem compatible,
+        only index 0 is supported)
+        Args:
+            index: has to be 0
+
+        Returns:
+            (price, level) of the best level
+
+        """
+        if index != 0:
+            raise IndexError('PriceLadder.peekitem supports only index 0')
+        best = self.best
+        if best < 0:
+            raise IndexError('peekitem from empty ladder')
+        return self.min_price + best * self.tick, self.levels[best]
+
+    def _indices(self):
+        index = self.best
+        while index >= 0:
+            yield index
+            index = self._next_index(index)
+
+    def __iter__(self):
+        min_price, tick = self.min_price, self.tick
+        for index in self._indices():
+            yield min_price + index * tick
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        levels = self.levels
+        for index in self._indices():
+            yield levels[index]
+
+    def irange(self, minimum=None, maximum=None):
+        """
+        To iterate prices of the non-empty levels between two bounds
+        (inclusive), SortedDict.irange compatible - the bounds are in
+        iteration order, so minimum is the higher price of a descending
+        ladder
+        Args:
+            minimum: first price, None to start at the best level
+            maximum: last price, None to go to the end
+
+        Yields:
+            prices in priority order
+
+        """
+        descending, tick = self.descending, self.tick
+        if minimum is None:
+            index = self.best
+        else:
+            offset = minimum - self.min_price
+            if descending:
+                start = min(offset // tick, self.size - 1)
+                if start < 0:
+                    return
+                index = self._next_index(start + 1)
+            else:
+                start = max(-(-offset // tick), 0)
+                if start >= self.size:
+                    return
+                index = self._next_index(start - 1)
+        min_price = self.min_price
+        while index >= 0:
+            price = min_price + index * tick
+            if maximum is not None and (
+                    price < maximum if descending else price > maximum):
+                return
+            yield price
+            index = self._next_index(index)
+
+    def clear(self) -> None:
+        self.levels = [None] * self.size
+        self.words = array('Q', bytes(8 * len(self.words)))
+        self.best = -1
+        self._len = 0
+
+    def items(self):
+        min_price, tick, levels = self.min_price, self.tick, self.levels
+        for index in self._indices():
+            yield min_price + index * tick, levels[index]
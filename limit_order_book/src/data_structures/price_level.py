@@ -0,0 +1,118 @@
+from array import array
+from typing import NamedTuple
+
+from src.data_structures.order_pool import NIL
+
+
+class LevelSummary(NamedTuple):
+    """Aggregated view of a single price level"""
+    price: int
+    quantity: int
+    count: int
+
+
+class PriceLevel:
+    """
+    PriceLevel is a FIFO queue of resting orders at a single price.
+    Main idea:
+    - orders are OrderPool handles linked through the pool prev/next
+    arrays (intrusive doubly-linked list), so an order found via
+    order_map can be unlinked in O(1) without scanning the level
+    - head is always the oldest order, which keeps price-time priority
+    - total resting quantity and order count are kept up to date, so
+    level aggregates are O(1); whoever changes a quantity of an order
+    on the level (fill) has to adjust `quantity` as well
+    """
+    __slots__ = ('pool', 'head', 'tail', 'count', 'quantity')
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.head = NIL
+        self.tail = NIL
+        self.count = 0
+        self.quantity = 0
+
+    @classmethod
+    def from_range(cls, pool, start: int, count: int, quantity: int):
+        """
+        To build level from `count` consecutive pool handles starting
+        at `start`, oldest first (used by snapshot restore)
+        Args:
+            pool: OrderPool holding the orders
+            start: first handle
+            count: number of orders
+            quantity: total quantity of the orders
+
+        Returns:
+            PriceLevel
+
+        """
+        level = cls(pool)
+        end = start + count
+        pool.next[start:end] = array('i', range(start + 1, end + 1))
+        pool.prev[start:end] = array('i', range(start - 1, end - 1))
+        pool.next[end - 1] = NIL
+        pool.prev[start] = NIL
+        level.head = start
+        level.tail = end - 1
+        level.count = count
+        level.quantity = quantity
+        return level
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        next_links = self.pool.next
+        handle = self.head
+        while handle != NIL:
+            yield handle
+            handle = next_links[handle]
+
+    def append(self, handle: int) -> None:
+        """
+        Appending order at the back of the queue
+        Args:
+            handle: OrderPool handle of the order
+
+        Returns:
+            None
+
+        """
+        pool = self.pool
+        tail = self.tail
+        pool.prev[handle] = tail
+        pool.next[handle] = NIL
+        if tail == NIL:
+            self.head = handle
+        else:
+            pool.next[tail] = handle
+        self.tail = handle
+        self.count += 1
+        self.quantity += pool.quantities[handle]
+
+    def remove(self, handle: int) -> None:
+        """
+        Unlinking order from any position of the queue in O(1)
+        Args:
+            handle: OrderPool handle of the order resting on this level
+
+        Returns:
+            None
+
+        """
+        pool = self.pool
+        prev_handle = pool.prev[handle]
+        next_handle = pool.next[handle]
+        if prev_handle == NIL:
+            self.head = next_handle
+        else:
+            pool.next[prev_handle] = next_handle
+        if next_handle == NIL:
+            self.tail = prev_handle
+        else:
+            pool.prev[next_handle] = prev_handle
+        pool.prev[handle] = NIL
+        pool.next[handle] = NIL
+        self.count -= 1
+        self.quantity -= pool.quantities[handle]
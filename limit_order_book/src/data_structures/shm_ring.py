@@ -0,0 +1,133 @@
+import time
+from multiprocessing import shared_memory
+
+_COUNTERS = 128
+_HEAD = 0
+_TAIL = 8
+
+
+class SharedRingBuffer:
+    """
+    SharedRingBuffer is a single-producer single-consumer queue of fixed
+    size records in shared memory, used between processes.
+    Main idea:
+    - read (head) and write (tail) counters are 8-byte integers on
+    separate cache lines at the start of the segment; the producer only
+    writes tail, the consumer only writes head
+    - records are packed/unpacked in place with struct.Struct, so no
+    pickling and no per-message allocation on the producer side
+    - put/get never block; callers decide how to wait (see wait)
+    """
+    def __init__(
+            self,
+            record,
+            slots: int,
+            name: str = None,
+            create: bool = True
+    ):
+        self.record = record
+        self.slots = slots
+        self.slot_size = record.size
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=create, size=_COUNTERS + slots * record.size
+        )
+        self.buf = self.shm.buf
+        self._counters = self.buf[:_COUNTERS].cast('q')
+        self._owner = create
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return self._counters[_TAIL] - self._counters[_HEAD]
+
+    def put(self, *values) -> bool:
+        """
+        To append one record (producer side)
+        Args:
+            *values: record fields
+
+        Returns:
+            False if the buffer is full
+
+        """
+        counters = self._counters
+        tail = counters[_TAIL]
+        if tail - counters[_HEAD] >= self.slots:
+            return False
+        self.record.pack_into(
+            self.buf, _COUNTERS + (tail % self.slots) * self.slot_size,
+            *values
+        )
+        counters[_TAIL] = tail + 1
+        return True
+
+    def get(self):
+        """
+        To take the oldest record (consumer side)
+        Returns:
+            tuple of record fields, None if the buffer is empty
+
+        """
+        counters = self._counters
+        head = counters[_HEAD]
+        if head == counters[_TAIL]:
+            return None
+        values = self.record.unpack_from(
+            self.buf, _COUNTERS + (head % self.slots) * self.slot_size
+        )
+        counters[_HEAD] = head + 1
+        return values
+
+    def drain(self, limit: int = None) -> list:
+        """
+        To take all (or up to limit) available records at once
+        Returns:
+            list of tuples of record fields
+
+        """
+        counters = self._counters
+        head = counters[_HEAD]
+        available = counters[_TAIL] - head
+        if limit is not None and available > limit:
+            available = limit
+        unpack_from, buf = self.record.unpack_from, self.buf
+        slots, slot_size = self.slots, self.slot_size
+        records = [
+            unpack_from(buf, _COUNTERS + (index % slots) * slot_size)
+            for index in range(head, head + available)
+        ]
+        counters[_HEAD] = head + available
+        return records
+
+    def close(self) -> None:
+        """
+        To detach from the segment; the creating side also unlinks it
+        Returns:
+            None
+
+        """
+        if self._counters is None:
+            return
+        self._counters.release()
+        self._counters = None
+        self.buf = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def wait(attempt: int) -> None:
+    """
+    Backoff for a full/empty ring: spin first, then yield, then sleep
+    Args:
+        attempt: number of unsuccessful attempts so far
+
+    Returns:
+        None
+
+    """
+    if attempt < 64:
+        return
+    time.sleep(0 if attempt < 1024 else 0.0005)
@@ -0,0 +1,126 @@
+class TimerWheel:
+    """
+    TimerWheel is a hierarchical timing wheel for integer deadlines
+    (e.g. milliseconds).
+    Main idea:
+    - `levels` wheels of 2 ** slot_bits slots each; a timer goes to the
+    lowest wheel whose range covers the bits in which its deadline
+    differs from the current time, into the slot given by those bits
+    - advancing the clock empties the level 0 slots it passes; entering
+    a new slot of a higher wheel moves (cascades) its timers down, so a
+    timer is moved at most `levels` times before it fires
+    - stretches of time with no timers on the lower wheels are skipped,
+    so advance() costs O(fired + cascaded timers), not O(elapsed ticks)
+    - deadlines beyond the top wheel wait in an overflow list which is
+    placed again whenever the top wheel wraps
+    - timers cannot be removed; the owner drops stale ones when they
+    fire (lazy cancellation)
+    """
+    def __init__(self, now: int = 0, slot_bits: int = 8, levels: int = 4):
+        self.now = now
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self._mask = (1 << slot_bits) - 1
+        self._wheels = [
+            [[] for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._counts = [0] * levels
+        self._overflow = []
+        self._due = []
+        self._scheduled = 0
+
+    def __len__(self) -> int:
+        return self._scheduled + len(self._due)
+
+    def schedule(self, deadline: int, item) -> None:
+        """
+        To add timer
+        Args:
+            deadline: time at which the timer fires; a deadline which is
+                not in the future fires on the next advance()
+            item: any object returned when the timer fires
+
+        Returns:
+            None
+
+        """
+        if deadline <= self.now:
+            self._due.append((deadline, item))
+            return
+        self._place(deadline, item)
+        self._scheduled += 1
+
+    def _place(self, deadline: int, item) -> None:
+        bits = self.slot_bits
+        level = ((deadline ^ self.now).bit_length() - 1) // bits
+        if level < 0:
+            level = 0
+        if level >= self.levels:
+            self._overflow.append((deadline, item))
+            return
+        self._wheels[level][(deadline >> (bits * level)) & self._mask].append(
+            (deadline, item)
+        )
+        self._counts[level] += 1
+
+    def advance(self, now: int) -> list:
+        """
+        To move the clock forward and collect fired timers
+        Args:
+            now: new current time, a time in the past is ignored
+
+        Returns:
+            list of (deadline, item) with deadline <= now, in deadline
+            order (timers scheduled in the past come first)
+
+        """
+        fired, self._due = self._due, []
+        bits, mask, levels = self.slot_bits, self._mask, self.levels
+        counts, level_zero = self._counts, self._wheels[0]
+        while self.now < now:
+            if not self._scheduled:
+                self.now = now
+                break
+            level = 0
+            while level < levels and not counts[level]:
+                level += 1
+            if level:
+                shift = bits * level
+                tick = ((self.now >> shift) + 1) << shift
+                if tick > now:
+                    self.now = now
+                    break
+            else:
+                tick = self.now + 1
+            self.now = tick
+            index = tick & mask
+            if not index:
+                self._cascade(tick)
+            slot = level_zero[index]
+            if slot:
+                level_zero[index] = []
+                counts[0] -= len(slot)
+                self._scheduled -= len(slot)
+                fired.extend(slot)
+        return fired
+
+    def _cascade(self, tick: int) -> None:
+        """Moving timers of the higher wheel slots entered at tick down"""
+        bits, mask = self.slot_bits, self._mask
+        top = 1
+        while top < self.levels and not (tick >> (bits * top)) & mask:
+            top += 1
+        if top == self.levels:
+            overflow, self._overflow = self._overflow, []
+            for deadline, item in overflow:
+                self._place(deadline, item)
+            top -= 1
+        for level in range(top, 0, -1):
+            wheel = self._wheels[level]
+            index = (tick >> (bits * level)) & mask
+            slot = wheel[index]
+            if slot:
+                wheel[index] = []
+                self._counts[level] -= len(slot)
+                for deadline, item in slot:
+                    self._place(deadline, item)
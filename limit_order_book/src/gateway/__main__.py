@@ -0,0 +1,47 @@
+"""
+Runs the order-entry gateway in front of a new LimitOrderBook.
+
+Usage (from the limit_order_book directory):
+    python -m src.gateway [--host 127.0.0.1] [--port 9100]
+"""
+import argparse
+import asyncio
+
+from src.gateway.server import Gateway
+
+
+async def serve(host: str, port: int, max_batch: int, ready=None) -> None:
+    """
+    To run the gateway until cancelled
+    Args:
+        host: address to bind
+        port: port to bind, 0 for any free port
+        max_batch: maximal number of messages per matching batch
+        ready: optional callable taking the bound port
+
+    Returns:
+        None
+
+    """
+    gateway = Gateway(max_batch=max_batch)
+    port = await gateway.start(host, port)
+    if ready is None:
+        print(f'gateway listening on {host}:{port}', flush=True)
+    else:
+        ready(port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='order-entry gateway')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--max-batch', type=int, default=1024)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch))
+    except KeyboardInterrupt:
+        pass
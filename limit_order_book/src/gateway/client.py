@@ -0,0 +1,103 @@
+import asyncio
+
+from src.data_structures.order import LIMIT
+from src.gateway.protocol import (
+    decode_report, encode_add, encode_cancel, split_frames
+)
+
+
+class GatewayClient:
+    """
+    GatewayClient is a minimal asyncio client of the gateway protocol,
+    used by the load generator and the tests.
+    Main idea:
+    - add() and cancel() only append frames to the stream buffer;
+    drain() sends them and waits while the gateway pushes back
+    - a reader task decodes the execution reports; each report
+    (kind, order_id, side, quantity, price) goes to on_report when it
+    is given, otherwise it is kept for reports()
+    """
+    def __init__(self, on_report=None):
+        self.on_report = on_report
+        self.received = []
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self._arrived = asyncio.Event()
+
+    async def connect(self, host: str, port: int) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            host, port
+        )
+        self._task = asyncio.create_task(self._read())
+
+    def add(
+            self,
+            order_id: bytes,
+            side: int,
+            price: int,
+            quantity: int,
+            order_type: int = LIMIT
+    ) -> None:
+        self._writer.write(
+            encode_add(order_id, side, price, quantity, order_type)
+        )
+
+    def cancel(self, order_id: bytes) -> None:
+        self._writer.write(encode_cancel(order_id))
+
+    async def drain(self) -> None:
+        await self._writer.drain()
+
+    async def reports(self, count: int, timeout: float = 5.0) -> list:
+        """
+        To wait for received reports
+        Args:
+            count: number of reports to wait for
+            timeout: seconds to wait before asyncio.TimeoutError
+
+        Returns:
+            list of the first count reports, which are removed
+
+        """
+        async def wait():
+            while len(self.received) < count:
+                self._arrived.clear()
+                await self._arrived.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+        reports = self.received[:count]
+        del self.received[:count]
+        return reports
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._task
+
+    async def _read(self) -> None:
+        buffer = bytearray()
+        on_report = self.on_report
+        try:
+            while True:
+                data = await self._reader.read(1 << 16)
+                if not data:
+                    return
+                buffer += data
+                payloads, consumed = split_frames(buffer)
+                if not consumed:
+                    continue
+                del buffer[:consumed]
+                if on_report is None:
+                    self.received.extend(map(decode_report, payloads))
+                    self._arrived.set()
+                else:
+                    for payload in payloads:
+                        on_report(decode_report(payload))
+        except ConnectionError:
+            return
@@ -0,0 +1,163 @@
+import struct
+
+from src.data_structures.order import LIMIT, MARKET
+from src.persistence.journal import ORDER_TYPE_SHIFT
+
+MAX_ID_BYTES = 32
+
+# frame header - length of the payload which follows
+FRAME = struct.Struct('<I')
+
+MSG_ADD = 1
+MSG_CANCEL = 2
+
+REPORT_ACCEPTED = 1
+REPORT_FILL = 2
+REPORT_CANCELLED = 3
+REPORT_CANCEL_REJECTED = 4
+REPORT_KILLED = 5
+REPORT_REJECTED = 6
+REPORT_NAMES = (
+    None, 'accepted', 'fill', 'cancelled', 'cancel_rejected', 'killed',
+    'rejected'
+)
+
+# message type, side code | order type << ORDER_TYPE_SHIFT, price,
+# quantity; followed by the client order id
+ADD = struct.Struct('<BBqq')
+# message type; followed by the client order id
+CANCEL = struct.Struct('<B')
+# report kind, side code, quantity, price; followed by the client order
+# id. quantity is the executed quantity of a fill, the unfilled rest of
+# a killed order and the order quantity otherwise
+REPORT = struct.Struct('<BBqq')
+# the longest valid payload - longer length headers are rejected before
+# any of the payload is buffered
+MAX_PAYLOAD = max(ADD.size, REPORT.size) + MAX_ID_BYTES
+
+
+def _frame(header: struct.Struct, order_id: bytes, *fields) -> bytes:
+    if len(order_id) > MAX_ID_BYTES:
+        raise ValueError(
+            f'order id {order_id!r} longer than {MAX_ID_BYTES} bytes'
+        )
+    return FRAME.pack(header.size + len(order_id)) + header.pack(
+        *fields) + order_id
+
+
+def encode_add(
+        order_id: bytes,
+        side: int,
+        price: int,
+        quantity: int,
+        order_type: int = LIMIT
+) -> bytes:
+    """
+    To build framed add message
+    Args:
+        order_id: client order id, unique among the live orders of the
+            connection
+        side: BUY or SELL code
+        price: the price of the order, ignored for market orders
+        quantity: quantity of the order
+        order_type: LIMIT, IOC, FOK or MARKET code
+
+    Returns:
+        frame bytes
+
+    """
+    return _frame(
+        ADD, order_id, MSG_ADD, side | order_type << ORDER_TYPE_SHIFT,
+        price or 0, quantity
+    )
+
+
+def encode_cancel(order_id: bytes) -> bytes:
+    return _frame(CANCEL, order_id, MSG_CANCEL)
+
+
+def encode_report(
+        kind: int,
+        order_id: bytes,
+        side: int = 0,
+        quantity: int = 0,
+        price: int = 0
+) -> bytes:
+    return _frame(REPORT, order_id, kind, side, quantity, price or 0)
+
+
+def split_frames(buffer: bytearray) -> tuple:
+    """
+    To cut complete frames off the front of a receive buffer
+    Args:
+        buffer: received bytes, a partial frame at the end is left for
+            the next call
+
+    Returns:
+        (list of payloads as bytes, number of consumed bytes)
+
+    Raises:
+        ValueError: on a length header above MAX_PAYLOAD
+
+    """
+    payloads = []
+    offset = 0
+    size = len(buffer)
+    header = FRAME.size
+    unpack_from = FRAME.unpack_from
+    while offset + header <= size:
+        (length,) = unpack_from(buffer, offset)
+        if length > MAX_PAYLOAD:
+            raise ValueError(f'frame length {length} above {MAX_PAYLOAD}')
+        end = offset + header + length
+        if end > size:
+            break
+        payloads.append(bytes(buffer[offset + header:end]))
+        offset = end
+    return payloads, offset
+
+
+def decode_message(payload: bytes) -> tuple:
+    """
+    To decode client message payload
+    Args:
+        payload: frame payload
+
+    Returns:
+        (MSG_ADD, order_id, side, price, quantity, order_type) with
+        price None for market orders, or (MSG_CANCEL, order_id)
+
+    Raises:
+        ValueError: on unknown message type or malformed payload
+
+    """
+    if not payload:
+        raise ValueError('empty message')
+    kind = payload[0]
+    if kind == MSG_ADD:
+        if len(payload) < ADD.size:
+            raise ValueError('truncated add message')
+        if len(payload) - ADD.size > MAX_ID_BYTES:
+            raise ValueError(f'order id longer than {MAX_ID_BYTES} bytes')
+        _, side, price, quantity = ADD.unpack_from(payload)
+        order_type = side >> ORDER_TYPE_SHIFT
+        return (
+            MSG_ADD, payload[ADD.size:], side & 1,
+            None if order_type == MARKET else price, quantity, order_type
+        )
+    if kind == MSG_CANCEL:
+        if len(payload) - CANCEL.size > MAX_ID_BYTES:
+            raise ValueError(f'order id longer than {MAX_ID_BYTES} bytes')
+        return MSG_CANCEL, payload[CANCEL.size:]
+    raise ValueError(f'unknown message type {kind}')
+
+
+def decode_report(payload: bytes) -> tuple:
+    """
+    To decode execution report payload
+    Returns:
+        (report kind, order_id, side, quantity, price)
+
+    """
+    kind, side, quantity, price = REPORT.unpack_from(payload)
+    return kind, payload[REPORT.size:], side, quantity, price
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import suppress
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.data_structures.order import LIMIT, MARKET, ORDER_TYPE_NAMES
+from src.data_structures.order_pool import SIDE_NAMES
+from src.gateway.protocol import (
+    MSG_ADD, REPORT_ACCEPTED, REPORT_FILL, REPORT_CANCELLED,
+    REPORT_CANCEL_REJECTED, REPORT_KILLED, REPORT_REJECTED, decode_message,
+    encode_report, split_frames
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    """State of one client connection"""
+    __slots__ = ('number', 'writer', 'orders', 'out', 'closed')
+
+    def __init__(self, number: int, writer):
+        self.number = number
+        self.writer = writer
+        # client order id -> book order id of the live orders
+        self.orders = {}
+        self.out = bytearray()
+        self.closed = False
+
+
+class Gateway:
+    """
+    Gateway is an asyncio TCP order-entry front end of a single
+    LimitOrderBook.
+    Main idea:
+    - clients send length-prefixed binary add and cancel messages
+    (src.gateway.protocol); connection tasks only cut frames, decode
+    them and append them to one shared inbox
+    - a single matching task owns the book: it takes the inbox in
+    micro-batches of up to max_batch messages and applies them one by
+    one, so the book needs no lock; it yields to the event loop between
+    batches
+    - execution reports are collected per connection during a batch and
+    sent with one write per connection per batch
+    - backpressure: a connection is not read while the inbox holds
+    max_pending messages or while its unsent reports are above the
+    transport high-water mark, so a flood or a slow reader is pushed
+    back through TCP instead of growing memory
+    - every order gets a gateway-wide int id in the book and the
+    connection as owner; orders of a closed connection are cancelled
+    with one mass_cancel (cancel_on_disconnect)
+    """
+    def __init__(
+            self,
+            lob: LimitOrderBook = None,
+            max_batch: int = 1024,
+            max_pending: int = 65536,
+            read_size: int = 1 << 16,
+            cancel_on_disconnect: bool = True,
+            **book_kwargs
+    ):
+        if lob is None:
+            book_kwargs.setdefault('log_events', False)
+            lob = LimitOrderBook(**book_kwargs)
+        self.lob = lob
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.read_size = read_size
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.sessions = {}
+        # processed inbox entries - client messages and disconnects
+        self.messages = 0
+        self.batches = 0
+        # book order id -> [session, client order id, side, leaves]
+        self._orders = {}
+        self._next_id = 1
+        self._next_session = 1
+        self._inbox = deque()
+        self._dirty = []
+        self._ready = None
+        self._room = None
+        self._server = None
+        self._task = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """
+        To start listening and the matching task
+        Args:
+            host: address to bind
+            port: port to bind, 0 for any free port
+
+        Returns:
+            bound port
+
+        """
+        self._ready = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._server = await asyncio.start_server(self._serve, host, port)
+        self._task = asyncio.create_task(self._match_loop())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """
+        To stop accepting connections and stop the matching task
+        Returns:
+            None
+
+        """
+        if self._server is not None:
+            self._server.close()
+            for session in list(self.sessions.values()):
+                session.writer.close()
+            await self._server.wait_closed()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _serve(self, reader, writer) -> None:
+        """Connection task - reading and decoding client messages"""
+        session = _Session(self._next_session, writer)
+        self._next_session += 1
+        self.sessions[session.number] = session
+        inbox = self._inbox
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(self.read_size)
+                if not data:
+                    break
+                buffer += data
+                payloads, consumed = split_frames(buffer)
+                if not consumed:
+                    continue
+                del buffer[:consumed]
+                for payload in payloads:
+                    inbox.append((session, decode_message(payload)))
+                self._ready.set()
+                if len(inbox) >= self.max_pending:
+                    self._room.clear()
+                    await self._room.wait()
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # connection lost or protocol violation - drop the client
+            pass
+        finally:
+            session.closed = True
+            inbox.append((session, None))
+            self._ready.set()
+            writer.close()
+
+    async def _match_loop(self) -> None:
+        """The only task which touches the book"""
+        inbox = self._inbox
+        while True:
+            if not inbox:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            count = min(len(inbox), self.max_batch)
+            for _ in range(count):
+                session, message = inbox.popleft()
+                try:
+                    if message is None:
+                        self._disconnect(session)
+                    elif message[0] == MSG_ADD:
+                        self._add(session, *message[1:])
+                    else:
+                        self._cancel(session, message[1])
+                except Exception:
+                    # one bad message must not stop matching for everyone
+                    logger.exception(
+                        'gateway message %r of session %d failed', message,
+                        session.number
+                    )
+            self.messages += count
+            self.batches += 1
+            self._send_reports()
+            if len(inbox) < self.max_pending:
+                self._room.set()
+            await asyncio.sleep(0)
+
+    def _report(self, session, kind, order_id, side, quantity, price):
+        if not session.out:
+            self._dirty.append(session)
+        session.out += encode_report(kind, order_id, side, quantity, price)
+
+    def _send_reports(self) -> None:
+        for session in self._dirty:
+            if not session.closed:
+                session.writer.write(bytes(session.out))
+            session.out.clear()
+        self._dirty.clear()
+
+    def _add(self, session, order_id, side, price, quantity, order_type):
+        report = self._report
+        if order_id in session.orders or quantity <= 0 or (
+                order_type > MARKET):
+            report(session, REPORT_REJECTED, order_id, side, quantity, price)
+            return
+        book_id = self._next_id
+        self._next_id += 1
+        try:
+            fills = self.lob.add_order(
+                book_id, SIDE_NAMES[side], price, quantity,
+                ORDER_TYPE_NAMES[order_type], owner=session.number
+            )
+        except ValueError:
+            report(session, REPORT_REJECTED, order_id, side, quantity, price)
+            return
+        report(session, REPORT_ACCEPTED, order_id, side, quantity, price)
+        orders = self._orders
+        leaves = quantity
+        for index in range(fills.count):
+            executed = fills.quantities[index]
+            fill_price = fills.prices[index]
+            leaves -= executed
+            report(session, REPORT_FILL, order_id, side, executed, fill_price)
+            resting_id = fills.resting_ids[index]
+            resting = orders[resting_id]
+            report(
+                resting[0], REPORT_FILL, resting[1], resting[2], executed,
+                fill_price
+            )
+            resting[3] -= executed
+            if not resting[3]:
+                del orders[resting_id]
+                del resting[0].orders[resting[1]]
+        if not leaves:
+            return
+        if order_type == LIMIT:
+            orders[book_id] = [session, order_id, side, leaves]
+            session.orders[order_id] = book_id
+        else:
+            report(session, REPORT_KILLED, order_id, side, leaves, price)
+
+    def _cancel(self, session, order_id) -> None:
+        book_id = session.orders.get(order_id)
+        if book_id is None or not self.lob.cancel_order(book_id):
+            self._report(session, REPORT_CANCEL_REJECTED, order_id, 0, 0, 0)
+            return
+        del session.orders[order_id]
+        _, _, side, leaves = self._orders.pop(book_id)
+        self._report(session, REPORT_CANCELLED, order_id, side, leaves, 0)
+
+    def _disconnect(self, session) -> None:
+        del self.sessions[session.number]
+        if not session.orders:
+            return
+        if self.cancel_on_disconnect:
+            for book_id in self.lob.mass_cancel(owner=session.number):
+                del self._orders[book_id]
+            session.orders.clear()
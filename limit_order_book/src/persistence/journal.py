@@ -0,0 +1,338 @@
+import mmap
+import os
+import struct
+
+from src.data_structures.events import (
+    AckEvent, CancelEvent, AmendEvent, ExpiryEvent, ExpiredEvent, ClockEvent
+)
+from src.data_structures.order import LIMIT, ORDER_TYPE_CODES
+from src.data_structures.order_pool import SIDE_CODES
+
+RECORD_ADD = 1
+RECORD_CANCEL = 2
+RECORD_AMEND = 3
+# the time (deadline, expire() time) is stored in the price field
+RECORD_SET_EXPIRY = 4
+# expire records with an empty id only move the book time
+RECORD_EXPIRE = 5
+# the side byte of add records holds the side code in bit 0 and the
+# order type code (LIMIT, IOC, FOK, MARKET) above it
+ORDER_TYPE_SHIFT = 1
+# flags in the side byte of amend records - which fields are set
+AMEND_PRICE = 1
+AMEND_QUANTITY = 2
+ID_STR = 0
+ID_INT = 1
+# id kind byte of add records of owned orders: HAS_OWNER is set, the
+# owner kind (ID_STR / ID_INT) is above OWNER_SHIFT and the id bytes are
+# preceded by the owner length and the owner bytes
+HAS_OWNER = 2
+OWNER_SHIFT = 2
+OWNER_LENGTH = struct.Struct('<H')
+
+# kind, side, id kind, seq, price, quantity, id length; followed by the id
+RECORD_HEADER = struct.Struct('<BBBqqqH')
+
+
+def encode_id(order_id, name: str = 'order id') -> tuple:
+    """
+    To encode order id (or owner) for binary records
+    Args:
+        order_id: str or int order id
+        name: what is encoded, for the error message
+
+    Returns:
+        (id kind, id bytes)
+
+    """
+    if isinstance(order_id, str):
+        return ID_STR, order_id.encode()
+    if isinstance(order_id, int):
+        return ID_INT, str(order_id).encode()
+    raise TypeError(f'{name} has to be str or int, got {order_id!r}')
+
+
+def decode_id(kind: int, data: bytes):
+    return int(data) if kind == ID_INT else data.decode()
+
+
+def decode_payload(id_kind: int, data: bytes) -> tuple:
+    """
+    To read the id bytes of a record
+    Returns:
+        (order id, owner) - owner is None for records without owner
+
+    """
+    owner = None
+    if id_kind & HAS_OWNER:
+        start = OWNER_LENGTH.size
+        end = start + OWNER_LENGTH.unpack_from(data)[0]
+        owner = decode_id(id_kind >> OWNER_SHIFT & 1, data[start:end])
+        data = data[end:]
+    return decode_id(id_kind & 1, data), owner
+
+
+def split_side(side: int) -> tuple:
+    """
+    To read the side byte of add record
+    Returns:
+        (side code, order type code)
+
+    """
+    return side & 1, side >> ORDER_TYPE_SHIFT
+
+
+def decode_amend(flags: int, price: int, quantity: int) -> tuple:
+    """
+    To read the fields of amend record
+    Returns:
+        (price, quantity) - None for fields which are not changed
+
+    """
+    return (
+        price if flags & AMEND_PRICE else None,
+        quantity if flags & AMEND_QUANTITY else None,
+    )
+
+
+def iter_records(data):
+    """
+    Generator over raw records of mapped journal data, stops at a torn
+    record at the end of the file (crash in the middle of a write)
+    Yields:
+        (end offset, kind, seq, side, price, quantity, id kind, id bytes)
+
+    """
+    size = len(data)
+    offset = 0
+    header_size = RECORD_HEADER.size
+    unpack_from = RECORD_HEADER.unpack_from
+    while offset + header_size <= size:
+        kind, side, id_kind, seq, price, quantity, id_len = unpack_from(
+            data, offset
+        )
+        end = offset + header_size + id_len
+        if end > size:
+            return
+        yield (
+            end, kind, seq, side, price, quantity, id_kind,
+            data[offset + header_size:end]
+        )
+        offset = end
+
+
+def _mapped(path: str):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb') as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_journal(path: str, after_seq: int = 0):
+    """
+    Generator reading journal records. A torn record at the end of the
+    file is ignored
+    Args:
+        path: journal file path
+        after_seq: only records with greater sequence number are read
+
+    Yields:
+        (kind, seq, order_id, side, price, quantity, owner) - side,
+        price and quantity are 0 for cancels; side holds the order type
+        too for adds (see split_side) and AMEND_PRICE / AMEND_QUANTITY
+        flags for amends; price is the time for expiry records; owner is
+        the owner of added orders, None otherwise
+
+    """
+    data = _mapped(path)
+    if data is None:
+        return
+    with data:
+        for (_, kind, seq, side, price, quantity, id_kind,
+             id_bytes) in iter_records(data):
+            if seq > after_seq:
+                order_id, owner = decode_payload(id_kind, id_bytes)
+                yield kind, seq, order_id, side, price, quantity, owner
+
+
+class Journal:
+    """
+    Journal is an append-only write-ahead log of commands accepted by
+    LimitOrderBook.
+    Main idea:
+    - it is a book listener: every AckEvent (accepted add, with its
+    owner), CancelEvent (successful cancel), AmendEvent (successful
+    amend), ExpiryEvent (deadline set), ClockEvent (book time moved by
+    expire(now)) and ExpiredEvent (order expired by expire(now)) is
+    appended as a compact binary record with a growing sequence number,
+    before the book finishes processing the command
+    - a torn record left by a crash is truncated when the journal is
+    opened again, new records continue the sequence
+    - records are buffered and the file is flushed and fsynced every
+    fsync_every records (0 - only on flush()/close())
+    - replaying the records through add_order, cancel_order,
+    amend_order, set_expiry and expire rebuilds
+    the book, see src.persistence.snapshot.restore
+    """
+    def __init__(self, path: str, fsync_every: int = 1000):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.seq = 0
+        valid_end = 0
+        data = _mapped(path)
+        if data is not None:
+            with data:
+                for record in iter_records(data):
+                    valid_end, self.seq = record[0], record[2]
+                size = len(data)
+            if size > valid_end:
+                os.truncate(path, valid_end)
+        self._file = open(path, 'ab')
+        self._pending = 0
+
+    def __call__(self, event) -> None:
+        if type(event) is AckEvent:
+            self.append_add(
+                event.order_id, SIDE_CODES[event.side], event.price,
+                event.quantity, ORDER_TYPE_CODES[event.order_type],
+                event.owner
+            )
+        elif type(event) is CancelEvent:
+            self.append_cancel(event.order_id)
+        elif type(event) is AmendEvent:
+            self.append_amend(event.order_id, event.quantity, event.price)
+        elif type(event) is ExpiryEvent:
+            self.append_set_expiry(event.order_id, event.expire_at)
+        elif type(event) is ExpiredEvent:
+            self.append_expire(event.order_id, event.now)
+        elif type(event) is ClockEvent:
+            self.append_expire('', event.now)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def append_add(
+            self,
+            order_id,
+            side: int,
+            price: int,
+            quantity: int,
+            order_type: int = LIMIT,
+            owner=None
+    ) -> int:
+        """
+        To append accepted order
+        Args:
+            order_id: order id
+            side: BUY or SELL code
+            price: the price of the order, None for market orders
+            quantity: quantity of the order
+            order_type: LIMIT, IOC, FOK or MARKET code
+            owner: str or int owner tag of the order, None for none
+
+        Returns:
+            sequence number of the record
+
+        """
+        return self._append(
+            RECORD_ADD, order_id, side | order_type << ORDER_TYPE_SHIFT,
+            price or 0, quantity, owner
+        )
+
+    def append_cancel(self, order_id) -> int:
+        """
+        To append successful cancel
+        Args:
+            order_id: order id
+
+        Returns:
+            sequence number of the record
+
+        """
+        return self._append(RECORD_CANCEL, order_id, 0, 0, 0)
+
+    def append_amend(
+            self,
+            order_id,
+            quantity: int = None,
+            price: int = None
+    ) -> int:
+        """
+        To append successful amend
+        Args:
+            order_id: order id
+            quantity: new quantity, None if not changed
+            price: new price, None if not changed
+
+        Returns:
+            sequence number of the record
+
+        """
+        flags = (AMEND_PRICE if price is not None else 0) | (
+            AMEND_QUANTITY if quantity is not None else 0)
+        return self._append(
+            RECORD_AMEND, order_id, flags, price or 0, quantity or 0
+        )
+
+    def append_set_expiry(self, order_id, expire_at: int) -> int:
+        """
+        To append good-till-time deadline set on a resting order
+        Args:
+            order_id: order id
+            expire_at: deadline
+
+        Returns:
+            sequence number of the record
+
+        """
+        return self._append(RECORD_SET_EXPIRY, order_id, 0, expire_at, 0)
+
+    def append_expire(self, order_id, now: int) -> int:
+        """
+        To append order expired by LimitOrderBook.expire(now)
+        Args:
+            order_id: order id, '' for a move of the book time only
+            now: time passed to expire
+
+        Returns:
+            sequence number of the record
+
+        """
+        return self._append(RECORD_EXPIRE, order_id, 0, now, 0)
+
+    def _append(self, kind, order_id, side, price, quantity,
+                owner=None) -> int:
+        id_kind, id_bytes = encode_id(order_id)
+        if owner is not None:
+            owner_kind, owner_bytes = encode_id(owner, 'owner')
+            id_kind |= HAS_OWNER | owner_kind << OWNER_SHIFT
+            id_bytes = OWNER_LENGTH.pack(len(owner_bytes)) + owner_bytes + (
+                id_bytes)
+        self.seq += 1
+        self._file.write(RECORD_HEADER.pack(
+            kind, side, id_kind, self.seq, price, quantity, len(id_bytes)
+        ))
+        self._file.write(id_bytes)
+        self._pending += 1
+        if self.fsync_every and self._pending >= self.fsync_every:
+            self.flush()
+        return self.seq
+
+    def flush(self) -> None:
+        """
+        To write buffered records and fsync the file
+        Returns:
+            None
+
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
@@ -0,0 +1,258 @@
+import mmap
+import os
+import struct
+from array import array
+
+from src.data_structures.order import ORDER_TYPE_NAMES
+from src.data_structures.order_pool import BUY, SELL, SIDE_NAMES
+from src.data_structures.price_level import PriceLevel
+from src.persistence.journal import (
+    read_journal, decode_amend, split_side, RECORD_ADD, RECORD_CANCEL,
+    RECORD_AMEND, RECORD_SET_EXPIRY, RECORD_EXPIRE, ID_STR, ID_INT
+)
+
+MAGIC = b'LOBSNAP1'
+# magic, journal seq, id kind, orders, buy levels, sell levels, statuses,
+# status ids blob size
+_HEADER = struct.Struct('<8sqBQQQQQ')
+# book time, resting orders with a deadline; followed by the deadline
+# and status index columns (missing in snapshots without timers)
+_TIMERS = struct.Struct('<qQ')
+# owner id kind, owners, owners blob size, resting orders with an owner;
+# followed by the owners blob and the status index and owner index
+# columns (missing in snapshots without owners)
+_OWNERS = struct.Struct('<BQQQ')
+
+
+def _id_kind(order_ids: list, name: str = 'order ids') -> int:
+    if all(type(order_id) is str for order_id in order_ids):
+        return ID_STR
+    if all(type(order_id) is int for order_id in order_ids):
+        return ID_INT
+    raise TypeError(f'snapshot requires all {name} to be str or all int')
+
+
+def _encode_ids(order_ids: list, kind: int) -> bytes:
+    if kind == ID_INT:
+        return array('q', order_ids).tobytes()
+    blob = '\0'.join(order_ids)
+    if blob.count('\0') != max(len(order_ids) - 1, 0):
+        raise ValueError('ids must not contain NUL characters')
+    return blob.encode()
+
+
+def _decode_ids(data, count: int, kind: int) -> list:
+    if kind == ID_INT:
+        ids = array('q')
+        ids.frombytes(data)
+        return ids.tolist()
+    if not count:
+        return []
+    return bytes(data).decode().split('\0')
+
+
+def write_snapshot(lob, path: str, seq: int = 0) -> None:
+    """
+    To write binary snapshot of resting orders, levels, statuses,
+    good-till-time deadlines and owners.
+    The file is written next to path and atomically renamed
+    Args:
+        lob: LimitOrderBook
+        path: snapshot file path
+        seq: last journal sequence number included in the book state
+
+    Returns:
+        None
+
+    """
+    pool = lob.pool
+    level_prices, level_counts, level_quantities = (
+        array('q'), array('q'), array('q')
+    )
+    status_ids, states = lob.order_status.columns()
+    # book keys are status slots; columns() lists the slots in order
+    status_index = {key: index for index, key in enumerate(
+        lob.order_status.slots())}
+    order_index, quantities = array('q'), array('q')
+    pool_keys, pool_quantities = pool.order_ids, pool.quantities
+    for book in (lob.buy_orders, lob.sell_orders):
+        for price, level in book.items():
+            level_prices.append(price)
+            level_counts.append(level.count)
+            level_quantities.append(level.quantity)
+            for handle in level:
+                order_index.append(status_index[pool_keys[handle]])
+                quantities.append(pool_quantities[handle])
+    kind = _id_kind(status_ids)
+    status_blob = _encode_ids(status_ids, kind)
+    deadlines, deadline_index = array('q'), array('q')
+    order_map = lob.order_map
+    for key, deadline in lob.expiries.items():
+        if key in order_map:
+            deadlines.append(deadline)
+            deadline_index.append(status_index[key])
+    owners = list(lob.owners)
+    owner_index = {owner: index for index, owner in enumerate(owners)}
+    owned_index, owned_owner = array('q'), array('q')
+    for key, owner in lob.order_owner.items():
+        owned_index.append(status_index[key])
+        owned_owner.append(owner_index[owner])
+    owner_kind = _id_kind(owners, 'owners')
+    owner_blob = _encode_ids(owners, owner_kind)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(_HEADER.pack(
+            MAGIC, seq, kind, len(order_index), len(lob.buy_orders),
+            len(lob.sell_orders), len(status_ids), len(status_blob)
+        ))
+        for column in (level_prices, level_counts, level_quantities,
+                       quantities, order_index):
+            column.tofile(file)
+        file.write(states)
+        file.write(status_blob)
+        file.write(_TIMERS.pack(lob.now, len(deadlines)))
+        deadlines.tofile(file)
+        deadline_index.tofile(file)
+        file.write(_OWNERS.pack(
+            owner_kind, len(owners), len(owner_blob), len(owned_index)
+        ))
+        file.write(owner_blob)
+        owned_index.tofile(file)
+        owned_owner.tofile(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(lob, path: str) -> int:
+    """
+    To restore an empty LimitOrderBook from a snapshot. The file is
+    memory-mapped and columns are copied in bulk
+    Args:
+        lob: freshly created LimitOrderBook (same backend settings as
+            the one the snapshot was taken from)
+        path: snapshot file path
+
+    Returns:
+        journal sequence number stored in the snapshot
+
+    """
+    if lob.order_map or lob.order_status or lob.buy_orders or (
+            lob.sell_orders):
+        raise ValueError('snapshot can only be loaded into an empty book')
+    with open(path, 'rb') as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ) as data, memoryview(
+            data) as view:
+        (magic, seq, kind, n_orders, n_buy, n_sell, n_status,
+         status_blob) = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a LimitOrderBook snapshot')
+        offset = _HEADER.size
+        n_levels = n_buy + n_sell
+
+        def column(count):
+            nonlocal offset
+            values = array('q')
+            values.frombytes(view[offset:offset + 8 * count])
+            offset += 8 * count
+            return values
+
+        level_prices = column(n_levels)
+        level_counts = column(n_levels)
+        level_quantities = column(n_levels)
+        quantities = column(n_orders)
+        order_index = column(n_orders)
+        states = bytes(view[offset:offset + n_status])
+        offset += n_status
+        status_ids = _decode_ids(
+            view[offset:offset + status_blob], n_status, kind
+        )
+        offset += status_blob
+        book_time, n_timers = 0, 0
+        if offset < len(view):
+            book_time, n_timers = _TIMERS.unpack_from(view, offset)
+            offset += _TIMERS.size
+        deadlines = column(n_timers)
+        deadline_index = column(n_timers)
+        owners, n_owned = [], 0
+        if offset < len(view):
+            owner_kind, n_owners, owner_blob, n_owned = _OWNERS.unpack_from(
+                view, offset
+            )
+            offset += _OWNERS.size
+            owners = _decode_ids(
+                view[offset:offset + owner_blob], n_owners, owner_kind
+            )
+            offset += owner_blob
+        owned_index = column(n_owned)
+        owned_owner = column(n_owned)
+    # statuses are loaded into slots 0..n-1, so the index of an order in
+    # the status columns is its book key
+    order_keys = order_index.tolist()
+
+    n_buy_orders = sum(level_counts[:n_buy])
+    sides = bytes([BUY]) * n_buy_orders + bytes([SELL]) * (
+        n_orders - n_buy_orders)
+    prices = array('q')
+    for price, count in zip(level_prices, level_counts):
+        prices.extend(array('q', [price]) * count)
+
+    pool = lob.pool
+    pool.load(order_keys, sides, prices, quantities)
+    start = 0
+    for index, (price, count, quantity) in enumerate(
+            zip(level_prices, level_counts, level_quantities)):
+        book = lob.buy_orders if index < n_buy else lob.sell_orders
+        book[price] = PriceLevel.from_range(pool, start, count, quantity)
+        start += count
+    lob.order_map = dict(zip(order_keys, range(n_orders)))
+    lob.order_status.load(status_ids, states)
+    lob.now = book_time
+    for deadline, index in zip(deadlines, deadline_index):
+        lob.set_expiry(status_ids[index], deadline)
+    for index, owner in zip(owned_index, owned_owner):
+        lob._set_owner(index, owners[owner])
+    return seq
+
+
+def restore(lob, snapshot_path: str = None, journal_path: str = None) -> int:
+    """
+    To rebuild LimitOrderBook after restart - load the snapshot (if it
+    exists) and replay only the journal records written after it.
+    Attach the Journal to the book only after restore, otherwise the
+    replayed commands are journaled again
+    Args:
+        lob: freshly created LimitOrderBook
+        snapshot_path: snapshot file path
+        journal_path: journal file path
+
+    Returns:
+        sequence number of the last applied journal record
+
+    """
+    seq = 0
+    if snapshot_path and os.path.exists(snapshot_path):
+        seq = load_snapshot(lob, snapshot_path)
+    if journal_path:
+        for (kind, seq, order_id, side, price, quantity,
+             owner) in read_journal(journal_path, seq):
+            if kind == RECORD_ADD:
+                side, order_type = split_side(side)
+                lob.add_order(
+                    order_id, SIDE_NAMES[side], price, quantity,
+                    ORDER_TYPE_NAMES[order_type], owner=owner
+                )
+            elif kind == RECORD_CANCEL:
+                lob.cancel_order(order_id)
+            elif kind == RECORD_AMEND:
+                price, quantity = decode_amend(side, price, quantity)
+                lob.amend_order(order_id, quantity, price)
+            elif kind == RECORD_SET_EXPIRY:
+                lob.set_expiry(order_id, price)
+            elif kind == RECORD_EXPIRE:
+                # the book time record (empty id) of an expire() call
+                # comes first and expires all its orders; the records of
+                # the expired orders repeat the time
+                lob.expire(price)
+    return seq
@@ -0,0 +1,42 @@
+"""
+Replays an order flow file into a fresh LimitOrderBook.
+
+Usage (from the limit_order_book directory):
+    python -m src.replay flow.csv|flow.bin [--mmap] [--batch-size N]
+"""
+import argparse
+
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.replay.engine import replay
+from src.replay.readers import read_csv, read_binary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('path')
+    parser.add_argument('--mmap', action='store_true')
+    parser.add_argument('--batch-size', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.path.endswith('.csv'):
+        messages = read_csv(args.path)
+    else:
+        messages = read_binary(args.path, use_mmap=args.mmap)
+
+    def report(stats):
+        print(f'{stats.messages} messages, {stats.msgs_per_sec:,.0f} msgs/s')
+
+    stats = replay(
+        LimitOrderBook(log_events=False), messages,
+        batch_size=args.batch_size, progress=report
+    )
+    print(
+        f'done: {stats.messages} messages ({stats.adds} adds, '
+        f'{stats.cancels} cancels, {stats.amends} amends), '
+        f'{stats.trades} trades in '
+        f'{stats.seconds:.2f}s - {stats.msgs_per_sec:,.0f} msgs/s'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import time
+from itertools import islice
+from typing import NamedTuple
+
+from src.algorithms.limit_order_book import (
+    ACTION_ADD, ACTION_CANCEL, ACTION_AMEND
+)
+from src.data_structures.order import LIMIT, ORDER_TYPE_CODES
+from src.data_structures.order_pool import SIDE_CODES
+
+
+class ReplayStats(NamedTuple):
+    """Summary of a replay run"""
+    messages: int
+    adds: int
+    cancels: int
+    trades: int
+    seconds: float
+    amends: int = 0
+
+    @property
+    def msgs_per_sec(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+def replay(
+        lob,
+        messages,
+        batch_size: int = 0,
+        progress=None,
+        progress_every: int = 1_000_000
+) -> ReplayStats:
+    """
+    To drive streamed order flow messages into the book. Only the
+    current message (or batch) is held in memory
+    Args:
+        lob: LimitOrderBook
+        messages: iterable of ('add', order_id, side, price, quantity
+            [, order_type]),
+            ('cancel', order_id), ('amend', order_id, price, quantity),
+            ('expiry', order_id, expire_at) and ('expire', now) tuples,
+            e.g. from read_csv
+        batch_size: if > 0 messages are grouped into columns and fed
+            through process_batch
+        progress: optional callable receiving ReplayStats so far
+        progress_every: number of messages between progress calls
+
+    Returns:
+        ReplayStats of the whole run
+
+    """
+    messages = iter(messages)
+    count = adds = cancels = amends = trades = 0
+    next_progress = progress_every
+    start = time.perf_counter()
+    if batch_size > 0:
+        process_batch = lob.process_batch
+        while True:
+            chunk = list(islice(messages, batch_size))
+            if not chunk:
+                break
+            order_ids, sides, prices, quantities, actions = [], [], [], [], []
+            order_types = []
+            for message in chunk:
+                kind = message[0]
+                if kind == 'expiry' or kind == 'expire':
+                    # timers are applied between the batched messages
+                    if order_ids:
+                        trades += len(process_batch(
+                            order_ids, sides, prices, quantities, actions,
+                            order_types
+                        ))
+                        order_ids, sides, prices, quantities = [], [], [], []
+                        actions, order_types = [], []
+                    if kind == 'expiry':
+                        lob.set_expiry(message[1], message[2])
+                    else:
+                        lob.expire(message[1])
+                    continue
+                order_ids.append(message[1])
+                if kind == 'add':
+                    sides.append(SIDE_CODES[message[2]])
+                    prices.append(message[3])
+                    quantities.append(message[4])
+                    actions.append(ACTION_ADD)
+                    order_types.append(
+                        ORDER_TYPE_CODES[message[5]] if len(message) > 5 else (
+                            LIMIT)
+                    )
+                    adds += 1
+                elif kind == 'amend':
+                    sides.append(0)
+                    prices.append(message[2])
+                    quantities.append(message[3])
+                    actions.append(ACTION_AMEND)
+                    order_types.append(LIMIT)
+                    amends += 1
+                else:
+                    sides.append(0)
+                    prices.append(0)
+                    quantities.append(0)
+                    actions.append(ACTION_CANCEL)
+                    order_types.append(LIMIT)
+                    cancels += 1
+            if order_ids:
+                trades += len(process_batch(
+                    order_ids, sides, prices, quantities, actions, order_types
+                ))
+            count += len(chunk)
+            if progress is not None and count >= next_progress:
+                progress(ReplayStats(
+                    count, adds, cancels, trades, time.perf_counter() - start,
+                    amends
+                ))
+                next_progress = count + progress_every
+    else:
+        add_order, cancel_order = lob.add_order, lob.cancel_order
+        amend_order, fills = lob.amend_order, lob.fills
+        for message in messages:
+            kind = message[0]
+            if kind == 'add':
+                trades += add_order(*message[1:]).count
+                adds += 1
+            elif kind == 'cancel':
+                cancel_order(message[1])
+                cancels += 1
+            elif kind == 'amend':
+                amend_order(message[1], message[3], message[2])
+                trades += fills.count
+                amends += 1
+            elif kind == 'expiry':
+                lob.set_expiry(message[1], message[2])
+            else:
+                lob.expire(message[1])
+            count += 1
+            if count == next_progress and progress is not None:
+                progress(ReplayStats(
+                    count, adds, cancels, trades, time.perf_counter() - start,
+                    amends
+                ))
+                next_progress += progress_every
+    return ReplayStats(
+        count, adds, cancels, trades, time.perf_counter() - start, amends
+    )
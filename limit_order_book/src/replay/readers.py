@@ -0,0 +1,195 @@
+import csv
+import mmap
+
+from src.data_structures.order import (
+    LIMIT, MARKET, ORDER_TYPE_CODES, ORDER_TYPE_NAMES
+)
+from src.data_structures.order_pool import SIDE_CODES, SIDE_NAMES
+from src.persistence.journal import (
+    Journal, RECORD_ADD, RECORD_CANCEL, RECORD_AMEND, RECORD_SET_EXPIRY,
+    decode_amend, decode_payload, iter_records, split_side
+)
+
+CSV_FIELDS = ('action', 'order_id', 'side', 'price', 'quantity')
+# optional column - empty (or missing) for limit orders
+CSV_ORDER_TYPE = 'order_type'
+
+
+def read_csv(path: str, chunk_size: int = 1 << 20):
+    """
+    Generator streaming order flow from CSV with header
+    action,order_id,side,price,quantity (action is 'add', 'cancel' or
+    'amend'; side, price and quantity may be empty for cancels, side is
+    empty and an unchanged price or quantity is empty for amends) and
+    optional order_type column ('ioc', 'fok' or 'market'; empty for
+    limit orders, price may be empty for market orders). Action
+    'expiry' sets the deadline (in the price column) of order_id and
+    'expire' (time in the price column) calls LimitOrderBook.expire
+    Args:
+        path: csv file path
+        chunk_size: size of the read buffer in bytes
+
+    Yields:
+        ('add', order_id, side, price, quantity[, order_type]),
+        ('cancel', order_id), ('amend', order_id, price, quantity),
+        ('expiry', order_id, expire_at) or ('expire', now)
+
+    """
+    with open(path, newline='', buffering=chunk_size) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        if tuple(header[:5]) != CSV_FIELDS:
+            raise ValueError(f'{path}: expected header {",".join(CSV_FIELDS)}')
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            action = row[0]
+            if action == 'add':
+                if len(row) > 5 and row[5]:
+                    yield (
+                        'add', row[1], row[2],
+                        int(row[3]) if row[3] else None, int(row[4]), row[5]
+                    )
+                else:
+                    yield 'add', row[1], row[2], int(row[3]), int(row[4])
+            elif action == 'cancel':
+                yield 'cancel', row[1]
+            elif action == 'amend':
+                yield (
+                    'amend', row[1], int(row[3]) if row[3] else None,
+                    int(row[4]) if row[4] else None
+                )
+            elif action == 'expiry':
+                yield 'expiry', row[1], int(row[3])
+            elif action == 'expire':
+                yield 'expire', int(row[3])
+            else:
+                raise ValueError(f'{path}:{line}: unknown action {action!r}')
+
+
+def write_csv(messages, path: str) -> int:
+    """
+    To write order flow messages as CSV readable by read_csv
+    Args:
+        messages: iterable of order flow message tuples
+        path: csv file path
+
+    Returns:
+        number of written messages
+
+    """
+    count = 0
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS + (CSV_ORDER_TYPE,))
+        for message in messages:
+            if message[0] == 'amend':
+                message = ('amend', message[1], '') + tuple(message[2:])
+            elif message[0] == 'expiry':
+                message = ('expiry', message[1], '', message[2])
+            elif message[0] == 'expire':
+                message = ('expire', '', '', message[1])
+            writer.writerow(message)
+            count += 1
+    return count
+
+
+def _binary_messages(records):
+    for (_, kind, _, side, price, quantity, id_kind, id_bytes) in records:
+        order_id = decode_payload(id_kind, id_bytes)[0]
+        if kind == RECORD_ADD:
+            side, order_type = split_side(side)
+            if order_type == LIMIT:
+                yield 'add', order_id, SIDE_NAMES[side], price, quantity
+            else:
+                yield (
+                    'add', order_id, SIDE_NAMES[side],
+                    None if order_type == MARKET else price, quantity,
+                    ORDER_TYPE_NAMES[order_type]
+                )
+        elif kind == RECORD_CANCEL:
+            yield 'cancel', order_id
+        elif kind == RECORD_AMEND:
+            yield ('amend', order_id) + decode_amend(side, price, quantity)
+        elif kind == RECORD_SET_EXPIRY:
+            yield 'expiry', order_id, price
+        else:
+            yield 'expire', price
+
+
+def _chunked_records(file, chunk_size: int):
+    """
+    Generator over raw records of a file read in chunks; a record split
+    between two chunks is carried over to the next one
+    """
+    carry = b''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        data = carry + chunk if carry else chunk
+        end = 0
+        for record in iter_records(memoryview(data)):
+            end = record[0]
+            yield record[:-1] + (bytes(record[-1]),)
+        carry = data[end:]
+
+
+def read_binary(path: str, use_mmap: bool = False, chunk_size: int = 1 << 20):
+    """
+    Generator streaming order flow from the binary journal record format
+    (see src.persistence.journal). A torn record at the end is ignored
+    Args:
+        path: binary file path
+        use_mmap: map the whole file instead of reading chunks
+        chunk_size: size of a read in bytes when use_mmap is False
+
+    Yields:
+        ('add', order_id, side, price, quantity[, order_type]),
+        ('cancel', order_id), ('amend', order_id, price, quantity),
+        ('expiry', order_id, expire_at) or ('expire', now)
+
+    """
+    with open(path, 'rb') as file:
+        if use_mmap:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from _binary_messages(iter_records(data))
+        else:
+            yield from _binary_messages(_chunked_records(file, chunk_size))
+
+
+def write_binary(messages, path: str) -> int:
+    """
+    To convert order flow messages (e.g. from read_csv) into the binary
+    format readable by read_binary
+    Args:
+        messages: iterable of order flow message tuples
+        path: binary file path, appended to if it exists
+
+    Returns:
+        number of written messages
+
+    """
+    count = 0
+    with Journal(path, fsync_every=0) as journal:
+        for message in messages:
+            if message[0] == 'add':
+                journal.append_add(
+                    message[1], SIDE_CODES[message[2]], message[3],
+                    message[4],
+                    ORDER_TYPE_CODES[message[5]] if len(message) > 5 else (
+                        LIMIT)
+                )
+            elif message[0] == 'amend':
+                journal.append_amend(message[1], message[3], message[2])
+            elif message[0] == 'expiry':
+                journal.append_set_expiry(message[1], message[2])
+            elif message[0] == 'expire':
+                journal.append_expire('', message[1])
+            else:
+                journal.append_cancel(message[1])
+            count += 1
+    return count
+
@@ -0,0 +1,109 @@
+import pytest
+from src.algorithms.book_manager import (
+    BookManager, ExecutionReport, REPORT_TRADE, REPORT_CANCELLED,
+    REPORT_CANCEL_REJECTED, REPORT_AMENDED, REPORT_AMEND_REJECTED,
+    REPORT_KILLED, REPORT_EXPIRED, REPORT_REJECTED, shard_of
+)
+
+SYMBOLS = ['AAPL', 'MSFT', 'GOOG', 'TSLA', 'AMZN']
+
+
+def feed(manager):
+    for i in range(400):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        side = 'buy' if (i // len(SYMBOLS)) % 3 else 'sell'
+        manager.add_order(symbol, f'{symbol}{i}', side, 100 + i % 3, 5 + i % 4)
+        if i % 7 == 0:
+            manager.cancel_order(symbol, f'{symbol}{i - 14}')
+        if i % 5 == 0:
+            manager.amend_order(symbol, f'{symbol}{i - 10}', price=101)
+        if i % 11 == 0:
+            manager.add_order(symbol, f'I{i}', 'sell', 100, 12, 'ioc')
+        if i % 13 == 0:
+            manager.add_order(
+                symbol, f'G{i}', 'buy', 99, 3, expire_at=i + 40
+            )
+        if i % 50 == 0:
+            manager.expire(i)
+
+
+def per_symbol(reports):
+    result = {}
+    for report in reports:
+        result.setdefault(report.symbol, []).append(report)
+    return result
+
+
+def test_book_manager_in_process():
+    manager = BookManager()
+    manager.add_order('AAPL', 'A1', 'buy', 100, 10)
+    manager.add_order('MSFT', 'M1', 'sell', 100, 10)
+    manager.add_order('AAPL', 'A2', 'sell', 100, 4)
+    manager.cancel_order('AAPL', 'A1')
+    manager.cancel_order('MSFT', 'A1')
+    assert manager.reports() == [
+        ExecutionReport(REPORT_TRADE, 'AAPL', 'A2', 'A1', 4, 100),
+        ExecutionReport(REPORT_CANCELLED, 'AAPL', 'A1', None, 0, 0),
+        ExecutionReport(REPORT_CANCEL_REJECTED, 'MSFT', 'A1', None, 0, 0),
+    ]
+    assert manager.book('MSFT').best_ask().quantity == 10
+    assert manager.reports() == []
+    manager.add_order('MSFT', 'M2', 'buy', 99, 3)
+    manager.amend_order('MSFT', 'M2', quantity=5, price=100)
+    manager.amend_order('MSFT', 'M1', quantity=1)
+    manager.amend_order('AAPL', 'A1', quantity=1)
+    assert manager.reports() == [
+        ExecutionReport(REPORT_AMENDED, 'MSFT', 'M2', None, 5, 100),
+        ExecutionReport(REPORT_TRADE, 'MSFT', 'M2', 'M1', 5, 100),
+        ExecutionReport(REPORT_AMENDED, 'MSFT', 'M1', None, 1, 0),
+        ExecutionReport(REPORT_AMEND_REJECTED, 'AAPL', 'A1', None, 0, 0),
+    ]
+    assert manager.book('MSFT').best_ask().quantity == 1
+    manager.add_order('MSFT', 'M3', 'buy', None, 3, 'market')
+    manager.add_order('MSFT', 'M4', 'buy', 100, 3, 'fok')
+    assert manager.reports() == [
+        ExecutionReport(REPORT_TRADE, 'MSFT', 'M3', 'M1', 1, 100),
+        ExecutionReport(REPORT_KILLED, 'MSFT', 'M3', None, 2, 0),
+        ExecutionReport(REPORT_KILLED, 'MSFT', 'M4', None, 3, 0),
+    ]
+    manager.add_order('AAPL', 'A3', 'buy', 90, 3, expire_at=10)
+    manager.expire(10)
+    assert manager.reports() == [
+        ExecutionReport(REPORT_EXPIRED, 'AAPL', 'A3', None, 0, 0),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_book_manager_workers_match_in_process(workers):
+    expected = BookManager()
+    feed(expected)
+    with BookManager(SYMBOLS, workers=workers, ring_slots=32) as manager:
+        feed(manager)
+        manager.flush()
+        reports = manager.reports()
+    assert per_symbol(reports) == per_symbol(expected.reports())
+
+
+def test_book_manager_requires_symbols_for_workers():
+    with pytest.raises(ValueError):
+        BookManager(workers=2)
+    assert {shard_of(symbol, 4) for symbol in SYMBOLS} <= set(range(4))
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_book_manager_rejects_bad_commands(workers):
+    book_kwargs = {'backend': 'ladder', 'min_price': 90, 'max_price': 110}
+    with BookManager(['AAPL'], workers=workers, **book_kwargs) as manager:
+        manager.add_order('AAPL', 'A1', 'buy', 500, 10)
+        manager.add_order('AAPL', 'A2', 'buy', 100, 10)
+        manager.add_order('AAPL', 'A3', 'sell', 100, 4)
+        with pytest.raises(ValueError):
+            manager.add_order('AAPL', 'A4', 'bid', 100, 4)
+        if workers:
+            with pytest.raises(ValueError):
+                manager.add_order('MSFT', 'M1', 'buy', 100, 4)
+        manager.flush()
+        assert manager.reports() == [
+            ExecutionReport(REPORT_REJECTED, 'AAPL', 'A1', None, 0, 0),
+            ExecutionReport(REPORT_TRADE, 'AAPL', 'A3', 'A2', 4, 100),
+        ]
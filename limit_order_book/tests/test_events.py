@@ -0,0 +1,48 @@
+import logging
+from src.data_structures.events import (
+    AckEvent, TradeEvent, CancelRejectEvent, AmendEvent, AmendRejectEvent,
+    KillEvent, EventRingBuffer, LoggingListener, REJECT_FILLED
+)
+
+
+def test_event_ring_buffer_drain():
+    buffer = EventRingBuffer(4)
+    for i in range(3):
+        buffer(i)
+    assert len(buffer) == 3
+    assert buffer.drain() == [0, 1, 2]
+    assert len(buffer) == 0
+
+
+def test_event_ring_buffer_overwrites_oldest():
+    buffer = EventRingBuffer(2)
+    for i in range(5):
+        buffer(i)
+    assert buffer.dropped == 3
+    assert buffer.drain() == [3, 4]
+
+
+def test_logging_listener(caplog):
+    listener = LoggingListener()
+    with caplog.at_level(logging.INFO):
+        listener(AckEvent('SST', 'sell', 10, 5))
+        listener(TradeEvent('SST', 'AAA', 'sell', 5, 20, 0))
+        listener(CancelRejectEvent('AAA', REJECT_FILLED))
+        listener(AmendEvent('SST', 'sell', 12, 3))
+        listener(AmendRejectEvent('AAA', REJECT_FILLED))
+        listener(AckEvent('IOC', 'buy', 10, 5, 'ioc'))
+        listener(KillEvent('IOC', 'buy', 10, 5))
+    assert 'SST sell 5 @ 10 - OK\n' in caplog.text
+    assert 'SST sell 5 @ 10 Fully matched with AAA (5 @ 20)\n' in caplog.text
+    assert 'Order AAA cancel failed - already fully filled\n' in caplog.text
+    assert 'SST sell 3 @ 12 - OK\n' in caplog.text
+    assert 'Order AAA amend failed - already fully filled\n' in caplog.text
+    assert 'IOC buy 5 @ 10 IOC - OK\n' in caplog.text
+    assert 'IOC 5 unfilled - cancelled\n' in caplog.text
+
+
+def test_logging_listener_disabled(caplog):
+    listener = LoggingListener()
+    with caplog.at_level(logging.WARNING):
+        listener(AckEvent('SST', 'sell', 10, 5))
+    assert caplog.text == ''
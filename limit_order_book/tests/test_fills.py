@@ -0,0 +1,26 @@
+import pytest
+from src.data_structures.fills import Fill, Fills
+
+
+def test_fills_append_and_grow():
+    fills = Fills(capacity=1)
+    fills.reset('SST')
+    fills.append('AAA', 10, 20)
+    fills.append('AAB', 5, 20)
+    assert fills.capacity == 2
+    assert len(fills) == 2
+    assert fills.total_quantity == 15
+    assert list(fills) == [Fill('AAA', 'SST', 10, 20), Fill('AAB', 'SST', 5, 20)]
+    assert fills[-1] == Fill('AAB', 'SST', 5, 20)
+
+
+def test_fills_reset_reuses_columns():
+    fills = Fills(capacity=2)
+    fills.reset('SST')
+    fills.append('AAA', 10, 20)
+    quantities = fills.quantities
+    fills.reset('XYZ')
+    assert len(fills) == 0
+    assert fills.quantities is quantities
+    with pytest.raises(IndexError):
+        fills[0]
@@ -0,0 +1,44 @@
+import pytest
+from benchmarks.flow_generator import (
+    FlowGenerator, ADD, AGGRESSIVE, CANCEL, AMEND
+)
+
+
+def test_flow_generator_is_reproducible():
+    first = FlowGenerator(seed=1).generate(500)
+    assert first == FlowGenerator(seed=1).generate(500)
+    assert first != FlowGenerator(seed=2).generate(500)
+
+
+@pytest.mark.parametrize("distribution", ['normal', 'uniform', 'exponential'])
+def test_flow_generator_mix_and_prices(distribution):
+    generator = FlowGenerator(
+        seed=3, add_ratio=0.5, cancel_ratio=0.25, aggressive_ratio=0.25,
+        price_distribution=distribution, mid_price=100, cross_ticks=1
+    )
+    prefill = generator.prefill(100)
+    flow = generator.generate(4000)
+    kinds = [kind for kind, _ in flow]
+    for kind, share in ((ADD, 0.5), (CANCEL, 0.25), (AGGRESSIVE, 0.25)):
+        assert abs(kinds.count(kind) / len(flow) - share) < 0.05
+    for kind, message in [(ADD, message) for message in prefill] + flow:
+        if kind == ADD:
+            assert (message[3] < 100) if message[2] == 'buy' else (
+                message[3] > 100)
+        elif kind == AGGRESSIVE:
+            assert message[3] == (101 if message[2] == 'buy' else 99)
+
+
+def test_flow_generator_amends():
+    generator = FlowGenerator(
+        seed=5, add_ratio=0.2, cancel_ratio=0.0, aggressive_ratio=0.0,
+        amend_ratio=0.8, mid_price=100
+    )
+    flow = generator.generate(2000)
+    amends = [message for kind, message in flow if kind == AMEND]
+    assert abs(len(amends) / len(flow) - 0.8) < 0.05
+    added = {message[1]: message[2] for kind, message in flow if kind == ADD}
+    for _, order_id, price, quantity in amends:
+        assert (price is None) != (quantity is None)
+        if price is not None:
+            assert (price < 100) if added[order_id] == 'buy' else price > 100
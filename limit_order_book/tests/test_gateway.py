@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from src.data_structures.order import FOK, MARKET
+from src.data_structures.order_pool import BUY, SELL
+from src.gateway.client import GatewayClient
+from src.gateway.protocol import (
+    MSG_ADD, MSG_CANCEL, REPORT_ACCEPTED, REPORT_FILL, REPORT_CANCELLED,
+    REPORT_CANCEL_REJECTED, REPORT_KILLED, REPORT_REJECTED, FRAME, ADD,
+    decode_message, decode_report, encode_add, encode_cancel, encode_report,
+    split_frames
+)
+from src.gateway.server import Gateway
+
+
+def run(test) -> None:
+    async def main():
+        gateway = Gateway()
+        port = await gateway.start()
+        clients = []
+
+        async def connect():
+            client = GatewayClient()
+            await client.connect('127.0.0.1', port)
+            clients.append(client)
+            return client
+
+        try:
+            await test(gateway, connect)
+        finally:
+            for client in clients:
+                await client.close()
+            await gateway.close()
+
+    asyncio.run(main())
+
+
+def test_protocol_round_trip():
+    stream = bytearray(
+        encode_add(b'A1', SELL, 101, 7)
+        + encode_add(b'M', BUY, None, 3, MARKET)
+        + encode_cancel(b'A1')
+        + encode_report(REPORT_FILL, b'A1', SELL, 2, 101)
+    )
+    payloads, consumed = split_frames(stream[:-3])
+    assert len(payloads) == 3 and consumed < len(stream)
+    assert decode_message(payloads[0]) == (MSG_ADD, b'A1', SELL, 101, 7, 0)
+    assert decode_message(payloads[1]) == (MSG_ADD, b'M', BUY, None, 3, MARKET)
+    assert decode_message(payloads[2]) == (MSG_CANCEL, b'A1')
+    payloads, _ = split_frames(stream[consumed:])
+    assert decode_report(payloads[0]) == (REPORT_FILL, b'A1', SELL, 2, 101)
+    with pytest.raises(ValueError):
+        decode_message(b'\x09')
+    with pytest.raises(ValueError):
+        encode_cancel(b'X' * 33)
+    long_add = ADD.pack(MSG_ADD, BUY, 10, 1) + b'X' * 40
+    with pytest.raises(ValueError):
+        decode_message(long_add)
+    with pytest.raises(ValueError):
+        split_frames(bytearray(FRAME.pack(0xFFFFFFFF) + b'\x01'))
+
+
+def test_crossing_orders_of_two_clients():
+    async def test(gateway, connect):
+        maker, taker = await connect(), await connect()
+        maker.add(b'S1', SELL, 100, 5)
+        maker.add(b'S2', SELL, 101, 5)
+        await maker.drain()
+        assert [report[0] for report in await maker.reports(2)] == [
+            REPORT_ACCEPTED, REPORT_ACCEPTED
+        ]
+        taker.add(b'B1', BUY, 101, 7)
+        await taker.drain()
+        assert await taker.reports(3) == [
+            (REPORT_ACCEPTED, b'B1', BUY, 7, 101),
+            (REPORT_FILL, b'B1', BUY, 5, 100),
+            (REPORT_FILL, b'B1', BUY, 2, 101),
+        ]
+        assert await maker.reports(2) == [
+            (REPORT_FILL, b'S1', SELL, 5, 100),
+            (REPORT_FILL, b'S2', SELL, 2, 101),
+        ]
+        taker.add(b'B1', BUY, 99, 1)
+        taker.add(b'B1', BUY, 99, 1)
+        taker.add(b'B2', BUY, 101, 9, FOK)
+        taker.cancel(b'S2')
+        maker.cancel(b'S2')
+        maker.cancel(b'S1')
+        await taker.drain()
+        await maker.drain()
+        assert [report[0] for report in await taker.reports(5)] == [
+            REPORT_ACCEPTED, REPORT_REJECTED, REPORT_ACCEPTED,
+            REPORT_KILLED, REPORT_CANCEL_REJECTED
+        ]
+        assert await maker.reports(2) == [
+            (REPORT_CANCELLED, b'S2', SELL, 3, 0),
+            (REPORT_CANCEL_REJECTED, b'S1', 0, 0, 0),
+        ]
+        assert gateway.lob.resting_ids() == [gateway.sessions[2].orders[b'B1']]
+
+    run(test)
+
+
+def test_disconnect_cancels_resting_orders():
+    async def test(gateway, connect):
+        leaving, staying = await connect(), await connect()
+        for index in range(100):
+            leaving.add(b'L%d' % index, BUY, 90 + index % 5, 1)
+        staying.add(b'K', SELL, 200, 1)
+        await leaving.drain()
+        await staying.drain()
+        await leaving.reports(100)
+        await staying.reports(1)
+        await leaving.close()
+        for _ in range(100):
+            if len(gateway.lob.order_map) == 1:
+                break
+            await asyncio.sleep(0.01)
+        assert len(gateway.lob.order_map) == 1
+        assert list(gateway.sessions) == [2]
+        # 101 orders and the disconnect
+        assert gateway.messages == 102
+
+    run(test)
+
+
+def test_bad_clients_are_dropped_and_matching_goes_on():
+    async def test(gateway, connect):
+        long_id, hostile = await connect(), await connect()
+        good = await connect()
+        long_id._writer.write(
+            FRAME.pack(ADD.size + 40) + ADD.pack(MSG_ADD, BUY, 10, 1)
+            + b'X' * 40
+        )
+        hostile._writer.write(FRAME.pack(0xFFFFFFFF) + b'\x01' * 1024)
+        await long_id.drain()
+        await hostile.drain()
+        for _ in range(100):
+            if list(gateway.sessions) == [3]:
+                break
+            await asyncio.sleep(0.01)
+        assert list(gateway.sessions) == [3]
+        add_order = gateway.lob.add_order
+
+        def failing_add(*args, **kwargs):
+            gateway.lob.add_order = add_order
+            raise RuntimeError('book failure')
+
+        gateway.lob.add_order = failing_add
+        good.add(b'B0', BUY, 10, 1)
+        good.add(b'B1', BUY, 10, 1)
+        await good.drain()
+        assert await good.reports(1) == [(REPORT_ACCEPTED, b'B1', BUY, 1, 10)]
+        assert not gateway._task.done()
+        assert len(gateway.lob.order_map) == 1
+
+    run(test)
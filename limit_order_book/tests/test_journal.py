@@ -0,0 +1,76 @@
+import pytest
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.data_structures.order import LIMIT, IOC, FOK, MARKET
+from src.data_structures.order_pool import BUY, SELL
+from src.data_structures.price_level import LevelSummary
+from src.persistence.journal import (
+    Journal, read_journal, split_side, RECORD_ADD, RECORD_CANCEL
+)
+from src.persistence.snapshot import restore
+
+
+def test_journal_records_accepted_commands(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(path, fsync_every=2) as journal:
+        lob.add_listener(journal)
+        lob.add_order("AAA", "buy", 20, 10)
+        lob.add_order(7, "sell", 25, 5)
+        lob.cancel_order("AAA")
+        lob.cancel_order("AAA")
+    assert list(read_journal(path)) == [
+        (RECORD_ADD, 1, "AAA", BUY, 20, 10, None),
+        (RECORD_ADD, 2, 7, SELL, 25, 5, None),
+        (RECORD_CANCEL, 3, "AAA", 0, 0, 0, None),
+    ]
+    assert [record[1] for record in read_journal(path, after_seq=2)] == [3]
+
+
+def test_journal_continues_sequence_and_ignores_torn_tail(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    with Journal(path) as journal:
+        journal.append_add("AAA", BUY, 20, 10)
+    with open(path, 'ab') as file:
+        file.write(b'\x01\x00')
+    assert len(list(read_journal(path))) == 1
+    with Journal(path) as journal:
+        assert journal.append_cancel("AAA") == 2
+    assert [record[1] for record in read_journal(path)] == [1, 2]
+
+
+def test_journal_records_order_types(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(path) as journal:
+        lob.add_listener(journal)
+        lob.add_order("AAA", "buy", 20, 10)
+        lob.add_order("IOC", "sell", 20, 4, order_type='ioc')
+        lob.add_order("MKT", "sell", None, 3, order_type='market')
+        lob.add_order("FOK", "sell", 20, 9, order_type='fok')
+    records = list(read_journal(path))
+    assert [split_side(record[3]) for record in records] == [
+        (BUY, LIMIT), (SELL, IOC), (SELL, MARKET), (SELL, FOK)
+    ]
+    restored = LimitOrderBook(log_events=False)
+    restore(restored, journal_path=path)
+    assert restored.depth() == lob.depth() == ([LevelSummary(20, 3, 1)], [])
+    assert restored.order_status == lob.order_status
+
+
+def test_journal_records_owners(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(path) as journal:
+        lob.add_listener(journal)
+        lob.add_order("AAA", "buy", 20, 10, owner="desk-1")
+        lob.add_order(7, "buy", 19, 5, owner=42)
+        lob.add_order("BBB", "buy", 18, 5)
+        with pytest.raises(TypeError):
+            journal.append_add("CCC", BUY, 18, 5, owner=("desk", 1))
+    assert [record[6] for record in read_journal(path)] == [
+        "desk-1", 42, None
+    ]
+    restored = LimitOrderBook(log_events=False)
+    restore(restored, journal_path=path)
+    assert restored.mass_cancel(owner=42) == [7]
+    assert restored.resting_ids() == ["AAA", "BBB"]
@@ -1,7 +1,18 @@
 import pytest
 from unittest.mock import MagicMock
 from src.algorithms import limit_order_book
-from src.data_structures.order import Order
+from src.data_structures.order import Order, IOC, FOK
+from src.data_structures.fills import Fill
+from src.data_structures.price_level import LevelSummary
+from src.data_structures.order_pool import BUY, SELL
+from src.algorithms.limit_order_book import (
+    ACTION_ADD, ACTION_CANCEL, ACTION_AMEND
+)
+from benchmarks.flow_generator import batch_columns, generate_flow, run
+from src.data_structures.events import (
+    EventRingBuffer, AckEvent, TradeEvent, CancelEvent, AmendEvent,
+    AmendRejectEvent, KillEvent, ExpiredEvent, CancelRejectEvent, ClockEvent
+)
 from sortedcontainers import SortedDict
 import logging
 
@@ -44,10 +55,10 @@ def test_add_order(limit_order_book_full_object, caplog):
     ('SSTz','Order SSTz cancel failed - already fully filled\n')
 ])
 def test_cancel_order(limit_order_book_object, caplog, test_order_id,expected_log):
-    limit_order_book_object.order_map = {
-        'SSBT': Order('SSBT', 'buy', 2,5),
-        'SST': Order('SST', 'buy', 1,10)}
-    limit_order_book_object.order_status = {'SSBT': 'active', 'SST': 'active', 'SSTz': 'filled'}
+    limit_order_book_object.add_order('SSBT', 'buy', 2, 5)
+    limit_order_book_object.add_order('SST', 'buy', 1, 10)
+    limit_order_book_object.add_order('SSTz', 'sell', 3, 5)
+    limit_order_book_object.add_order('SSTb', 'buy', 3, 5)
     with caplog.at_level(logging.INFO):
         limit_order_book_object.cancel_order(test_order_id)
         assert len(limit_order_book_object.order_map) == 2
@@ -63,10 +74,429 @@ def test_match_orders(limit_order_book_full_object, caplog, test_order,res1,res2
         assert limit_order_book_full_object.order_status=={'AAA': 'active', 'AAB': 'active', 'ABA': 'active'}
         limit_order_book_full_object.add_order(*test_order)
         assert len(limit_order_book_full_object.order_map) == res1
-        assert list(limit_order_book_full_object.order_map.keys()) == res2
+        assert limit_order_book_full_object.resting_ids() == res2
         assert limit_order_book_full_object.order_status==res3
         assert expected_log1 in caplog.text
         assert expected_log2 in caplog.text
 
 
 
+def test_cancel_order_removes_exact_order(limit_order_book_full_object):
+    assert limit_order_book_full_object.cancel_order("AAB")
+    level = limit_order_book_full_object.buy_orders[20]
+    pool = limit_order_book_full_object.pool
+    assert [pool.order_ids[handle] for handle in level] == [
+        limit_order_book_full_object.key("AAA")
+    ]
+    assert len(pool) == 2
+    assert limit_order_book_full_object.order_status["AAB"] == 'cancelled'
+    assert not limit_order_book_full_object.cancel_order("AAB")
+
+
+def test_events_reported_to_listeners(limit_order_book_full_object):
+    events = EventRingBuffer()
+    limit_order_book_full_object.add_listener(events)
+    limit_order_book_full_object.add_order("SST", "sell", 20, 15)
+    limit_order_book_full_object.cancel_order("AAB")
+    assert events.drain() == [
+        AckEvent("SST", "sell", 20, 15),
+        TradeEvent("SST", "AAA", "sell", 10, 20, 5),
+        TradeEvent("SST", "AAB", "sell", 5, 20, 0),
+        CancelEvent("AAB", "buy", 20, 5),
+    ]
+
+
+def test_log_events_switched_off(caplog):
+    lob = limit_order_book.LimitOrderBook(log_events=False)
+    with caplog.at_level(logging.INFO):
+        lob.add_order("AAA", "buy", 20, 10)
+        lob.add_order("SST", "sell", 20, 10)
+    assert caplog.text == ''
+    assert lob.order_status == {'AAA': 'filled', 'SST': 'filled'}
+
+
+def test_add_order_returns_fills(limit_order_book_full_object):
+    fills = limit_order_book_full_object.add_order("SST", "sell", 10, 25)
+    assert list(fills) == [
+        Fill("AAA", "SST", 10, 20),
+        Fill("AAB", "SST", 10, 20),
+        Fill("ABA", "SST", 5, 10),
+    ]
+    assert limit_order_book_full_object.add_order("XYZ", "sell", 50, 1) is fills
+    assert len(fills) == 0
+
+
+def test_top_of_book_and_depth(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    assert lob.best_ask() is None
+    assert lob.spread() is None
+    lob.add_order("S1", "sell", 25, 4)
+    lob.add_order("S2", "sell", 30, 6)
+    lob.add_order("SST", "sell", 20, 5)
+    assert lob.best_bid() == LevelSummary(20, 15, 2)
+    assert lob.best_ask() == LevelSummary(25, 4, 1)
+    assert lob.spread() == 5
+    lob.cancel_order("AAB")
+    assert lob.depth(1) == ([LevelSummary(20, 5, 1)], [LevelSummary(25, 4, 1)])
+    assert lob.depth() == (
+        [LevelSummary(20, 5, 1), LevelSummary(10, 10, 1)],
+        [LevelSummary(25, 4, 1), LevelSummary(30, 6, 1)],
+    )
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 9000, 'max_price': 11000},
+])
+def test_level_aggregates_match_resting_orders(backend_kwargs):
+    lob = limit_order_book.LimitOrderBook(log_events=False, **backend_kwargs)
+    run(lob, generate_flow(3000, seed=5))
+    pool = lob.pool
+    for book in (lob.buy_orders, lob.sell_orders):
+        for price, level in book.items():
+            assert level.count == len(list(level))
+            assert level.quantity == sum(pool.quantities[h] for h in level)
+
+
+def test_cancel_reject_reasons_within_retention(caplog):
+    lob = limit_order_book.LimitOrderBook(status_max_terminal=1)
+    lob.add_order("AAA", "buy", 20, 10)
+    lob.add_order("ABA", "buy", 20, 10)
+    lob.cancel_order("ABA")
+    with caplog.at_level(logging.INFO):
+        assert not lob.cancel_order("ABA")
+        lob.add_order("SST", "sell", 20, 10)
+        assert not lob.cancel_order("SST")
+        assert not lob.cancel_order("AAA")
+    assert 'Order ABA cancel failed - already cancelled\n' in caplog.text
+    assert 'Order SST cancel failed - already fully filled\n' in caplog.text
+    assert 'Order AAA cancel failed - no such active order\n' in caplog.text
+    assert lob.order_status == {'SST': 'filled'}
+
+
+def test_process_batch_matches_single_calls():
+    flow = generate_flow(2000, seed=11)
+    single = limit_order_book.LimitOrderBook(log_events=False)
+    trades = run(single, flow)[1]
+
+    batch = limit_order_book.LimitOrderBook(log_events=False)
+    columns = batch_columns(flow)
+    result = batch.process_batch(*columns)
+    assert list(zip(result.resting_ids, result.aggressor_ids,
+                    result.quantities, result.prices)) == trades
+    assert [flow[i][1] for i in result.order_index] == result.aggressor_ids
+    assert batch.order_status == single.order_status
+
+
+def test_add_orders_batch(limit_order_book_full_object):
+    result = limit_order_book_full_object.add_orders_batch(
+        ["S1", "S2"], [SELL, SELL], [20, 10], [15, 10]
+    )
+    assert list(result.order_index) == [0, 0, 1, 1]
+    assert result.resting_ids == ["AAA", "AAB", "AAB", "ABA"]
+    assert list(result.quantities) == [10, 5, 5, 5]
+    with pytest.raises(ValueError):
+        limit_order_book_full_object.add_orders_batch(["S3"], [2], [20], [1])
+
+
+def test_process_batch_numpy_columns(limit_order_book_full_object):
+    np = pytest.importorskip("numpy")
+    result = limit_order_book_full_object.process_batch(
+        np.array(["S1", "AAA"]), np.array([SELL, BUY]), np.array([20, 0]),
+        np.array([5, 0]), np.array([ACTION_ADD, ACTION_CANCEL])
+    )
+    columns = result.to_numpy()
+    assert columns['quantities'].tolist() == [5]
+    assert limit_order_book_full_object.order_status['AAA'] == 'cancelled'
+
+
+def test_instrumentation_snapshot():
+    lob = limit_order_book.LimitOrderBook(log_events=False, instrument=True)
+    lob.add_order("AAA", "buy", 20, 10)
+    lob.add_order("AAB", "buy", 20, 10)
+    lob.add_order("ABA", "buy", 19, 10)
+    lob.cancel_order("AAB")
+    lob.add_order("SST", "sell", 19, 15)
+    lob.set_expiry("ABA", 5)
+    assert lob.expire(10) == ["ABA"]
+    metrics = lob.metrics_snapshot()
+    assert metrics['add_order_ns']['count'] == 4
+    assert metrics['match_orders_ns']['count'] == 4
+    assert metrics['cancel_order_ns']['count'] == 1
+    assert metrics['cancel_level_depth']['max'] == 2
+    assert metrics['orders_consumed']['count'] == 1
+    assert metrics['orders_consumed']['max'] == 2
+    assert metrics['levels_touched']['max'] == 2
+    assert metrics['expire_ns']['count'] == 1
+    assert metrics['expired_per_call']['max'] == 1
+    assert limit_order_book.LimitOrderBook().metrics_snapshot() == {}
+
+
+def test_instrumentation_times_batches():
+    lob = limit_order_book.LimitOrderBook(log_events=False, instrument=True)
+    lob.add_orders_batch(["AAA", "AAB"], [BUY, BUY], [20, 19], [5, 5])
+    lob.process_batch(
+        ["SST", "AAB"], [SELL, BUY], [20, 0], [8, 0],
+        [ACTION_ADD, ACTION_CANCEL]
+    )
+    metrics = lob.metrics_snapshot()
+    assert metrics['process_batch_ns']['count'] == 2
+    assert metrics['batch_messages']['max'] == 2
+    assert metrics['add_order_ns']['count'] == 0
+    assert metrics['match_orders_ns']['count'] == 3
+    assert metrics['orders_consumed']['count'] == 1
+    assert metrics['cancel_order_ns']['count'] == 1
+
+
+def test_amend_reduce_keeps_priority(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    handle = lob.order_map[lob.key("AAA")]
+    assert lob.amend_order("AAA", quantity=4)
+    assert lob.order_map[lob.key("AAA")] == handle
+    assert lob.best_bid() == LevelSummary(20, 14, 2)
+    lob.add_order("SST", "sell", 20, 6)
+    assert list(lob.fills) == [Fill("AAA", "SST", 4, 20), Fill("AAB", "SST", 2, 20)]
+    assert lob.order_status["AAA"] == 'filled'
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 1, 'max_price': 100},
+])
+def test_amend_replace_rematches_and_loses_priority(backend_kwargs):
+    lob = limit_order_book.LimitOrderBook(log_events=False, **backend_kwargs)
+    buffer = EventRingBuffer()
+    for args in (("AAA", "buy", 20, 10), ("AAB", "buy", 20, 10),
+                 ("S1", "sell", 25, 4)):
+        lob.add_order(*args)
+    lob.add_listener(buffer)
+    assert lob.amend_order("AAA", quantity=12)
+    assert lob.depth(1)[0] == [LevelSummary(20, 22, 2)]
+    assert list(lob.buy_orders[20]) == [
+        lob.order_map[lob.key("AAB")], lob.order_map[lob.key("AAA")]
+    ]
+    assert lob.amend_order("AAB", price=25)
+    assert list(lob.fills) == [Fill("S1", "AAB", 4, 25)]
+    assert lob.best_bid() == LevelSummary(25, 6, 1)
+    assert lob.best_ask() is None
+    assert lob.order_status["AAB"] == 'partial'
+    assert lob.amend_order("AAB", quantity=0)
+    assert buffer.drain() == [
+        AmendEvent("AAA", "buy", 20, 12),
+        AmendEvent("AAB", "buy", 25, 10),
+        TradeEvent("AAB", "S1", "buy", 4, 25, 6),
+        CancelEvent("AAB", "buy", 25, 6),
+    ]
+    assert not lob.amend_order("AAB", quantity=1)
+    assert not lob.amend_order("S1", price=30)
+    assert not lob.amend_order("XYZ", price=30)
+    assert buffer.drain() == [
+        AmendRejectEvent("AAB", "cancelled"),
+        AmendRejectEvent("S1", "filled"),
+        AmendRejectEvent("XYZ", "unknown"),
+    ]
+
+
+def test_amend_replace_keeps_partial_status(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    lob.add_order("SST", "sell", 20, 4)
+    assert lob.amend_order("AAA", price=21)
+    assert lob.fills.count == 0
+    assert lob.order_status["AAA"] == 'partial'
+    assert lob.best_bid() == LevelSummary(21, 6, 1)
+
+
+def test_process_batch_amend(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    lob.add_order("S1", "sell", 25, 5)
+    result = lob.process_batch(
+        ["AAA", "AAB"], [0, 0], [None, 25], [2, None],
+        [ACTION_AMEND, ACTION_AMEND]
+    )
+    assert list(result.order_index) == [1]
+    assert result.resting_ids == ["S1"]
+    assert lob.best_bid() == LevelSummary(25, 5, 1)
+    assert lob.depth(2)[0][1] == LevelSummary(20, 2, 1)
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 1, 'max_price': 100},
+])
+def test_ioc_and_market_never_rest(backend_kwargs):
+    lob = limit_order_book.LimitOrderBook(log_events=False, **backend_kwargs)
+    lob.add_order("S1", "sell", 20, 5)
+    lob.add_order("S2", "sell", 22, 5)
+    buffer = EventRingBuffer()
+    lob.add_listener(buffer)
+    fills = lob.add_order("IOC", "buy", 21, 8, order_type='ioc')
+    assert list(fills) == [Fill("S1", "IOC", 5, 20)]
+    fills = lob.add_order("MKT", "buy", None, 8, order_type='market')
+    assert list(fills) == [Fill("S2", "MKT", 5, 22)]
+    assert lob.resting_ids() == []
+    assert lob.best_bid() is None and lob.best_ask() is None
+    assert lob.order_status["IOC"] == 'cancelled'
+    assert buffer.drain() == [
+        AckEvent("IOC", "buy", 21, 8, 'ioc'),
+        TradeEvent("IOC", "S1", "buy", 5, 20, 3),
+        KillEvent("IOC", "buy", 21, 3),
+        AckEvent("MKT", "buy", None, 8, 'market'),
+        TradeEvent("MKT", "S2", "buy", 5, 22, 3),
+        KillEvent("MKT", "buy", None, 3),
+    ]
+
+
+def test_fok_is_all_or_nothing(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    depth = lob.depth()
+    assert not lob.can_fill("sell", 20, 21)
+    assert lob.can_fill("sell", 10, 21)
+    fills = lob.add_order("FOK1", "sell", 20, 21, order_type='fok')
+    assert fills.count == 0
+    assert lob.depth() == depth
+    assert lob.order_status["FOK1"] == 'cancelled'
+    fills = lob.add_order("FOK2", "sell", 10, 21, order_type='fok')
+    assert list(fills) == [
+        Fill("AAA", "FOK2", 10, 20), Fill("AAB", "FOK2", 10, 20),
+        Fill("ABA", "FOK2", 1, 10),
+    ]
+    assert lob.order_status["FOK2"] == 'filled'
+    assert lob.resting_ids() == ["ABA"]
+    with pytest.raises(ValueError):
+        lob.add_order("X", "sell", 10, 1, order_type='gtc')
+
+
+def test_process_batch_order_types(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    result = lob.process_batch(
+        ["F", "I"], [SELL, SELL], [20, 20], [25, 25], order_types=[FOK, IOC]
+    )
+    assert list(result.order_index) == [1, 1]
+    assert lob.best_bid() == LevelSummary(10, 10, 1)
+    assert lob.resting_ids() == ["ABA"]
+
+
+def test_good_till_time_expiry(limit_order_book_full_object):
+    lob = limit_order_book_full_object
+    buffer = EventRingBuffer()
+    lob.add_listener(buffer)
+    lob.add_order("G1", "buy", 20, 5, expire_at=100)
+    lob.add_order("G2", "sell", 30, 5, ttl=50)
+    lob.add_order("G3", "buy", 15, 5, expire_at=100)
+    lob.add_order("G4", "buy", 15, 5, expire_at=100)
+    assert lob.expiries == {
+        lob.key("G1"): 100, lob.key("G2"): 50, lob.key("G3"): 100,
+        lob.key("G4"): 100,
+    }
+    lob.cancel_order("G3")
+    lob.add_order("SST", "sell", 15, 5)
+    assert lob.amend_order("G4", price=16)
+    buffer.drain()
+    assert lob.expire(49) == []
+    assert lob.expire(60) == ["G2"]
+    assert lob.best_ask() is None
+    assert lob.expire(100) == ["G1", "G4"]
+    assert buffer.drain() == [
+        ClockEvent(49),
+        ClockEvent(60),
+        ExpiredEvent("G2", "sell", 30, 5, 60),
+        ClockEvent(100),
+        ExpiredEvent("G1", "buy", 20, 5, 100),
+        ExpiredEvent("G4", "buy", 16, 5, 100),
+    ]
+    assert lob.expire(100) == []
+    assert not buffer.drain()
+    assert lob.order_status["G1"] == 'expired'
+    assert lob.order_status["G3"] == 'cancelled'
+    assert lob.order_status["AAA"] == 'partial'
+    assert not lob.expiries and set(lob.resting_ids()) == {"AAA", "AAB", "ABA"}
+    assert not lob.cancel_order("G1")
+    assert buffer.drain() == [CancelRejectEvent("G1", "expired")]
+    lob.add_order("G5", "buy", 15, 5, ttl=10)
+    assert lob.expiries[lob.key("G5")] == 110
+    with pytest.raises(ValueError):
+        lob.add_order("G6", "buy", 15, 5, order_type='ioc', ttl=10)
+
+
+def test_expiry_of_reused_id_is_dropped(limit_order_book_object):
+    lob = limit_order_book_object
+    lob.add_order("G1", "buy", 20, 5, expire_at=100)
+    lob.add_order("SST", "sell", 20, 5)
+    lob.add_order("G1", "buy", 20, 5)
+    assert lob.expire(200) == []
+    assert lob.resting_ids() == ["G1"]
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 1, 'max_price': 100},
+])
+def test_mass_cancel_by_owner(backend_kwargs):
+    lob = limit_order_book.LimitOrderBook(log_events=False, **backend_kwargs)
+    lob.add_order("A1", "buy", 20, 5, owner="alice")
+    lob.add_order("B1", "buy", 20, 5, owner="bob")
+    lob.add_order("A2", "buy", 18, 5, owner="alice")
+    lob.add_order("A3", "sell", 30, 5, owner="alice")
+    lob.add_order("A4", "sell", 40, 5, owner="alice", ttl=10)
+    lob.add_order("X1", "sell", 25, 5)
+    lob.add_order("A5", "buy", 25, 5, owner="alice")
+    assert lob.key("A5") not in lob.order_owner
+    lob.add_order("SST", "sell", 20, 5)
+    assert lob.key("A1") not in lob.order_owner
+    buffer = EventRingBuffer()
+    lob.add_listener(buffer)
+    assert lob.mass_cancel(owner="alice", side="sell",
+                           price_range=(None, 35)) == ["A3"]
+    assert lob.mass_cancel(owner="alice") == ["A2", "A4"]
+    assert buffer.drain() == [
+        CancelEvent("A3", "sell", 30, 5),
+        CancelEvent("A2", "buy", 18, 5),
+        CancelEvent("A4", "sell", 40, 5),
+    ]
+    assert lob.mass_cancel(owner="alice") == []
+    assert lob.owners == {"bob": {lob.key("B1"): None}}
+    assert not lob.expiries
+    assert lob.depth() == ([LevelSummary(20, 5, 1)], [])
+    assert lob.order_status["A2"] == 'cancelled'
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 1, 'max_price': 100},
+])
+def test_mass_cancel_by_side_and_price_range(backend_kwargs):
+    lob = limit_order_book.LimitOrderBook(log_events=False, **backend_kwargs)
+    for index, price in enumerate((10, 12, 12, 14, 16)):
+        lob.add_order(f"B{index}", "buy", price, 1, owner="bob")
+        lob.add_order(f"S{index}", "sell", price + 10, 1)
+    assert lob.mass_cancel(side="buy", price_range=(12, 14)) == [
+        "B3", "B1", "B2"
+    ]
+    assert [level.price for level in lob.depth()[0]] == [16, 10]
+    assert list(lob.owners["bob"]) == [lob.key("B0"), lob.key("B4")]
+    assert lob.mass_cancel(price_range=(16, 22)) == ["B4", "S0", "S1", "S2"]
+    assert lob.mass_cancel(side="sell") == ["S3", "S4"]
+    assert not lob.sell_orders
+    assert lob.resting_ids() == ["B0"]
+    lob.add_order("S5", "sell", 10, 1)
+    assert not lob.order_map and not lob.owners
+    with pytest.raises(ValueError):
+        lob.mass_cancel(side="both")
+
+
+def test_keys_are_interned_and_reused_after_eviction():
+    lob = limit_order_book.LimitOrderBook(
+        log_events=False, status_max_terminal=0
+    )
+    lob.add_order("A", "buy", 20, 5)
+    key = lob.key("A")
+    assert isinstance(key, int) and lob.order_map[key] == 0
+    assert lob.order_status.ids[key] == "A"
+    fills = lob.add_order("S", "sell", 20, 5)
+    assert list(fills) == [Fill("A", "S", 5, 20)]
+    assert lob.key("A") is None and lob.key("S") is None
+    lob.add_order("B", "buy", 20, 5)
+    assert len(lob.order_status.ids) == 2
+    assert not lob.cancel_order("A")
+    assert lob.resting_ids() == ["B"]
+    assert lob.cancel_order("B")
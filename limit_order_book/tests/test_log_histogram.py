@@ -0,0 +1,31 @@
+import pytest
+from src.data_structures.log_histogram import LogHistogram
+
+
+@pytest.mark.parametrize("value", [0, 1, 31, 32, 47, 48, 1000, 123456789])
+def test_log_histogram_bucket_bounds(value):
+    index = LogHistogram.index(value)
+    assert LogHistogram.upper_bound(index) >= value
+    assert index == 0 or LogHistogram.upper_bound(index - 1) < value
+
+
+def test_log_histogram_percentiles():
+    histogram = LogHistogram()
+    for value in range(1, 1001):
+        histogram.record(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 1000
+    assert (snapshot['min'], snapshot['max']) == (1, 1000)
+    assert snapshot['mean'] == 500.5
+    assert 500 <= snapshot['p50'] <= 500 * 1.07
+    assert 990 <= snapshot['p99'] <= 1000
+    histogram.reset()
+    assert histogram.snapshot()['count'] == 0
+    assert histogram.percentile(0.5) == 0
+
+
+def test_log_histogram_clamps_huge_values():
+    histogram = LogHistogram(max_bits=10)
+    histogram.record(10 ** 9)
+    assert histogram.count == 1
+    assert histogram.percentile(1.0) == 10 ** 9
@@ -0,0 +1,116 @@
+import pytest
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.algorithms.market_data import MarketDataFeed, ConflatingPublisher
+from src.data_structures.events import LevelUpdate, OrderUpdate
+from benchmarks.flow_generator import FlowGenerator, CANCEL, AMEND
+
+
+def apply_updates(levels: dict, orders: dict, updates) -> None:
+    for update in updates:
+        if type(update) is LevelUpdate:
+            if update.count:
+                levels[update.side, update.price] = (
+                    update.quantity, update.count
+                )
+            else:
+                del levels[update.side, update.price]
+        elif update.action == 'delete':
+            del orders[update.order_id]
+        else:
+            if update.action == 'add':
+                assert update.order_id not in orders
+            orders[update.order_id] = (
+                update.side, update.price, update.quantity
+            )
+
+
+def book_levels(lob) -> dict:
+    bids, asks = lob.depth(len(lob.buy_orders) + len(lob.sell_orders))
+    levels = {('buy', level.price): level[1:] for level in bids}
+    levels.update({('sell', level.price): level[1:] for level in asks})
+    return levels
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 0, 'max_price': 20_000},
+])
+def test_updates_rebuild_the_book(backend_kwargs):
+    lob = LimitOrderBook(log_events=False, **backend_kwargs)
+    feed = MarketDataFeed()
+    lob.set_market_data(feed, l3=True)
+    levels, orders = {}, {}
+    feed.subscribe(lambda updates: apply_updates(levels, orders, updates))
+    generator = FlowGenerator(seed=3, amend_ratio=0.2)
+    for index, (kind, message) in enumerate(generator.generate(3000)):
+        if kind == CANCEL:
+            lob.cancel_order(message[1])
+        elif kind == AMEND:
+            lob.amend_order(message[1], message[3], message[2])
+        else:
+            lob.add_order(*message[1:], ttl=index % 7 or None, owner=index % 5)
+        if index % 500 == 0:
+            lob.mass_cancel(owner=1, side='buy')
+            lob.mass_cancel(price_range=(9_990, 10_000))
+        lob.expire(index)
+        feed.publish()
+        assert levels == book_levels(lob)
+    pool = lob.pool
+    assert orders == {
+        order_id: (
+            'buy' if pool.sides[handle] == 0 else 'sell',
+            pool.prices[handle], pool.quantities[handle]
+        )
+        for order_id, handle in zip(lob.resting_ids(), lob.order_map.values())
+    }
+    assert feed.seq > 3000 and not len(feed)
+
+
+def test_one_level_update_per_level_swept():
+    lob = LimitOrderBook(log_events=False)
+    for order_id, price in (("S1", 20), ("S2", 20), ("S3", 21)):
+        lob.add_order(order_id, "sell", price, 5)
+    updates = []
+    lob.set_market_data(updates.append)
+    lob.add_order("B1", "buy", 21, 12)
+    assert updates == [
+        LevelUpdate("sell", 20, 0, 0),
+        LevelUpdate("sell", 21, 3, 1),
+    ]
+    updates.clear()
+    lob.set_market_data(updates.append, l3=True)
+    lob.amend_order("S3", 2)
+    lob.add_order("B2", "buy", 19, 4)
+    assert updates == [
+        OrderUpdate("modify", "S3", "sell", 21, 2),
+        LevelUpdate("sell", 21, 2, 1),
+        OrderUpdate("add", "B2", "buy", 19, 4),
+        LevelUpdate("buy", 19, 4, 1),
+    ]
+    lob.set_market_data(None)
+    lob.cancel_order("B2")
+    assert len(updates) == 4
+
+
+def test_conflating_publisher_windows():
+    now = [0.0]
+    delivered = []
+    publisher = ConflatingPublisher(
+        delivered.append, max_updates=4, interval=1.0, clock=lambda: now[0]
+    )
+    l3 = OrderUpdate("add", "B1", "buy", 10, 5)
+    publisher([LevelUpdate("buy", 10, 5, 1), l3])
+    publisher([LevelUpdate("buy", 10, 8, 2)])
+    assert delivered == []
+    publisher([LevelUpdate("sell", 12, 1, 1)])
+    assert delivered == [[
+        l3, LevelUpdate("buy", 10, 8, 2), LevelUpdate("sell", 12, 1, 1),
+    ]]
+    publisher([LevelUpdate("buy", 10, 0, 0)])
+    now[0] = 0.5
+    assert publisher.poll() == 0
+    now[0] = 1.0
+    assert publisher.poll() == 1
+    assert delivered[-1] == [LevelUpdate("buy", 10, 0, 0)]
+    assert publisher.flush() == 0
+    assert (publisher.received, publisher.delivered) == (5, 4)
@@ -4,9 +4,13 @@ from src.data_structures import order
 def test_order_initialization():
     new_order = order.Order('ABC', "buy", 3, 4)
     assert new_order is not None
-    assert new_order.__dict__==  {'order_id': 'ABC', 'side': 'buy', 'price': 3, 'quantity': 4, 'original_quantity': 4}
+    assert not hasattr(new_order, '__dict__')
+    assert (new_order.order_id, new_order.side, new_order.price,
+            new_order.quantity, new_order.original_quantity) == ('ABC', 'buy', 3, 4, 4)
     assert   repr(new_order) == 'ABC buy 4 @ 3'
 
 
-
-
+def test_order_with_side_code():
+    new_order = order.Order('ABC', 1, 3, 4, key=7)
+    assert (new_order.side, new_order.key) == (1, 7)
+    assert repr(new_order) == 'ABC sell 4 @ 3'
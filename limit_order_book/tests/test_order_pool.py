@@ -0,0 +1,20 @@
+from src.data_structures.order_pool import OrderPool, BUY, SELL
+
+
+def test_order_pool_allocate_and_grow():
+    pool = OrderPool(1)
+    first = pool.allocate('A', BUY, 10, 5)
+    second = pool.allocate('B', SELL, 11, 7)
+    assert pool.capacity == 2
+    assert len(pool) == 2
+    assert pool.order_ids[second] == 'B'
+    assert (pool.sides[first], pool.prices[first], pool.quantities[first]) == (BUY, 10, 5)
+
+
+def test_order_pool_reuses_released_handles():
+    pool = OrderPool(4)
+    handle = pool.allocate('A', BUY, 10, 5)
+    pool.release(handle)
+    assert len(pool) == 0
+    assert pool.order_ids[handle] is None
+    assert pool.allocate('B', SELL, 12, 1) == handle
@@ -0,0 +1,37 @@
+import pytest
+from src.data_structures.order_status import (
+    OrderStatusStore, ACTIVE, FILLED, CANCELLED, UNKNOWN
+)
+
+
+def test_order_status_store_mapping_view():
+    store = OrderStatusStore()
+    store.set_state('AAA', ACTIVE)
+    store['ABA'] = 'cancelled'
+    assert store == {'AAA': 'active', 'ABA': 'cancelled'}
+    assert store.state('ABA') == CANCELLED
+    assert store.state('XYZ') == UNKNOWN
+    assert 'XYZ' not in store
+    with pytest.raises(KeyError):
+        store['XYZ']
+
+
+def test_order_status_store_evicts_oldest_terminal():
+    store = OrderStatusStore(max_terminal=2)
+    store.set_state('LIVE', ACTIVE)
+    for order_id in ('F1', 'F2', 'F3'):
+        store.set_state(order_id, FILLED)
+    assert store == {'LIVE': 'active', 'F2': 'filled', 'F3': 'filled'}
+    slot = store.intern('NEW')
+    assert slot == 1
+
+
+def test_order_status_store_evicts_by_age():
+    now = [0.0]
+    store = OrderStatusStore(max_age=10, clock=lambda: now[0])
+    store.set_state('F1', FILLED)
+    now[0] = 5
+    store.set_state('F2', CANCELLED)
+    now[0] = 12
+    assert store.evict() == 1
+    assert list(store) == ['F2']
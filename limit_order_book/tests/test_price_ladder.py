@@ -0,0 +1,68 @@
+import pytest
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.data_structures.price_ladder import PriceLadder
+from benchmarks.flow_generator import generate_flow, run
+
+
+@pytest.mark.parametrize("descending,expected", [
+    (False, [2, 70, 130]),
+    (True, [130, 70, 2]),
+])
+def test_price_ladder_order(descending, expected):
+    ladder = PriceLadder(0, 200, 2, descending=descending)
+    for price in (70, 130, 2):
+        ladder[price] = str(price)
+    assert list(ladder) == expected
+    assert ladder.peekitem(0) == (expected[0], str(expected[0]))
+    del ladder[expected[0]]
+    assert ladder.peekitem(0) == (expected[1], str(expected[1]))
+    assert len(ladder) == 2
+
+
+@pytest.mark.parametrize("descending,bounds,expected", [
+    (False, (None, None), [2, 70, 130]),
+    (False, (3, 130), [70, 130]),
+    (False, (-50, 69), [2]),
+    (True, (129, None), [70, 2]),
+    (True, (500, 70), [130, 70]),
+    (True, (1, None), []),
+])
+def test_price_ladder_irange(descending, bounds, expected):
+    ladder = PriceLadder(0, 200, 2, descending=descending)
+    for price in (70, 130, 2):
+        ladder[price] = str(price)
+    assert list(ladder.irange(*bounds)) == expected
+    ladder.clear()
+    assert not ladder and list(ladder) == []
+    ladder[4] = 'level'
+    assert ladder.peekitem(0) == (4, 'level')
+
+
+def test_price_ladder_off_grid():
+    ladder = PriceLadder(10, 20, 2)
+    assert ladder.get(11) is None
+    assert 30 not in ladder
+    with pytest.raises(ValueError):
+        ladder[11] = 'level'
+    with pytest.raises(KeyError):
+        del ladder[12]
+    with pytest.raises(IndexError):
+        ladder.peekitem(0)
+
+
+def test_ladder_backend_matches_sorted_backend():
+    flow = generate_flow(5000, seed=3)
+    sorted_lob = LimitOrderBook(log_events=False)
+    ladder_lob = LimitOrderBook(
+        log_events=False, backend='ladder', min_price=9000, max_price=11000
+    )
+    assert run(sorted_lob, flow)[1] == run(ladder_lob, flow)[1]
+    assert sorted_lob.order_status == ladder_lob.order_status
+    assert list(sorted_lob.buy_orders) == list(ladder_lob.buy_orders)
+
+
+def test_ladder_backend_rejects_price_outside_grid():
+    lob = LimitOrderBook(backend='ladder', min_price=1, max_price=100)
+    with pytest.raises(ValueError):
+        lob.add_order('AAA', 'buy', 101, 1)
+    assert lob.order_status == {}
@@ -0,0 +1,34 @@
+import pytest
+from src.data_structures.order_pool import OrderPool, BUY, NIL
+from src.data_structures.price_level import PriceLevel
+
+
+@pytest.fixture
+def pool():
+    return OrderPool(2)
+
+
+def test_price_level_fifo(pool):
+    level = PriceLevel(pool)
+    handles = [pool.allocate(f'O{i}', BUY, 10, 1) for i in range(3)]
+    for handle in handles:
+        level.append(handle)
+    assert len(level) == 3
+    assert list(level) == handles
+    assert level.head == handles[0]
+    assert level.tail == handles[2]
+
+
+def test_price_level_remove_from_middle(pool):
+    level = PriceLevel(pool)
+    first, middle, last = (pool.allocate(f'O{i}', BUY, 10, 1) for i in range(3))
+    for handle in (first, middle, last):
+        level.append(handle)
+    level.remove(middle)
+    assert list(level) == [first, last]
+    assert pool.next[first] == last and pool.prev[last] == first
+    assert pool.prev[middle] == NIL and pool.next[middle] == NIL
+    level.remove(first)
+    level.remove(last)
+    assert len(level) == 0
+    assert level.head == NIL and level.tail == NIL
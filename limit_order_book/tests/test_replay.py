@@ -0,0 +1,124 @@
+import pytest
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.replay.engine import replay
+from src.replay.readers import read_csv, write_csv, read_binary, write_binary
+from benchmarks.flow_generator import generate_flow, run, FlowGenerator
+
+
+@pytest.fixture
+def flow():
+    return generate_flow(1000, seed=4)
+
+
+@pytest.fixture
+def amend_flow():
+    generator = FlowGenerator(seed=4, amend_ratio=0.4)
+    return generator.prefill(50) + [
+        message for _, message in generator.generate(1000)
+    ]
+
+
+def test_csv_round_trip(tmp_path, flow):
+    path = str(tmp_path / 'flow.csv')
+    assert write_csv(flow, path) == len(flow)
+    assert list(read_csv(path, chunk_size=64)) == flow
+
+
+def test_csv_rejects_unknown_action(tmp_path):
+    path = tmp_path / 'flow.csv'
+    path.write_text('action,order_id,side,price,quantity\nmodify,A,,,\n')
+    with pytest.raises(ValueError):
+        list(read_csv(str(path)))
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'use_mmap': True},
+    {'chunk_size': 7},
+    {'chunk_size': 4096},
+])
+def test_binary_round_trip(tmp_path, flow, kwargs):
+    path = str(tmp_path / 'flow.bin')
+    assert write_binary(flow, path) == len(flow)
+    assert list(read_binary(path, **kwargs)) == flow
+
+
+@pytest.mark.parametrize("batch_size", [0, 64])
+def test_replay_matches_direct_calls(flow, batch_size):
+    expected = LimitOrderBook(log_events=False)
+    trades = run(expected, flow)[1]
+    progress = []
+    lob = LimitOrderBook(log_events=False)
+    stats = replay(
+        lob, iter(flow), batch_size=batch_size, progress=progress.append,
+        progress_every=256
+    )
+    assert stats.messages == len(flow)
+    assert stats.adds + stats.cancels == len(flow)
+    assert stats.trades == len(trades)
+    assert progress and progress[0].messages >= 256
+    assert lob.order_status == expected.order_status
+
+
+def test_amend_round_trip(tmp_path, amend_flow):
+    csv_path = str(tmp_path / 'flow.csv')
+    binary_path = str(tmp_path / 'flow.bin')
+    write_csv(amend_flow, csv_path)
+    assert list(read_csv(csv_path)) == amend_flow
+    write_binary(amend_flow, binary_path)
+    assert list(read_binary(binary_path)) == amend_flow
+
+
+@pytest.mark.parametrize("batch_size", [0, 64])
+def test_replay_amends(amend_flow, batch_size):
+    expected = LimitOrderBook(log_events=False)
+    replay(expected, amend_flow)
+    lob = LimitOrderBook(log_events=False)
+    stats = replay(lob, amend_flow, batch_size=batch_size)
+    amends = sum(message[0] == 'amend' for message in amend_flow)
+    assert stats.amends == amends > 0
+    assert stats.adds + stats.cancels + stats.amends == len(amend_flow)
+    assert lob.depth(1000) == expected.depth(1000)
+    assert lob.order_status == expected.order_status
+
+
+def test_order_type_round_trip(tmp_path):
+    flow = [
+        ('add', 'A', 'buy', 20, 10),
+        ('add', 'B', 'sell', 20, 4, 'ioc'),
+        ('add', 'C', 'sell', 19, 40, 'fok'),
+        ('add', 'D', 'sell', None, 2, 'market'),
+    ]
+    csv_path = str(tmp_path / 'flow.csv')
+    binary_path = str(tmp_path / 'flow.bin')
+    write_csv(flow, csv_path)
+    assert list(read_csv(csv_path)) == flow
+    write_binary(flow, binary_path)
+    assert list(read_binary(binary_path)) == flow
+    for batch_size in (0, 2):
+        lob = LimitOrderBook(log_events=False)
+        assert replay(lob, flow, batch_size=batch_size).trades == 2
+        assert lob.best_bid().quantity == 4
+        assert lob.resting_ids() == ['A']
+
+
+def test_expiry_messages(tmp_path):
+    flow = [
+        ('add', 'A', 'buy', 20, 10),
+        ('expiry', 'A', 100),
+        ('add', 'B', 'buy', 19, 10),
+        ('expire', 100),
+        ('add', 'C', 'sell', 19, 4),
+    ]
+    csv_path = str(tmp_path / 'flow.csv')
+    binary_path = str(tmp_path / 'flow.bin')
+    write_csv(flow, csv_path)
+    assert list(read_csv(csv_path)) == flow
+    write_binary(flow, binary_path)
+    assert list(read_binary(binary_path)) == flow
+    for batch_size in (0, 2):
+        lob = LimitOrderBook(log_events=False)
+        stats = replay(lob, flow, batch_size=batch_size)
+        assert (stats.messages, stats.adds, stats.cancels) == (5, 3, 0)
+        assert lob.order_status == {
+            'A': 'expired', 'B': 'partial', 'C': 'filled'
+        }
@@ -0,0 +1,31 @@
+import struct
+from src.data_structures.shm_ring import SharedRingBuffer
+
+RECORD = struct.Struct('<qB9p')
+
+
+def test_shared_ring_buffer_fifo_and_full():
+    ring = SharedRingBuffer(RECORD, 2)
+    try:
+        assert ring.get() is None
+        assert ring.put(1, 0, b'a')
+        assert ring.put(2, 1, b'bb')
+        assert not ring.put(3, 0, b'c')
+        assert ring.get() == (1, 0, b'a')
+        assert ring.put(3, 0, b'c')
+        assert ring.drain() == [(2, 1, b'bb'), (3, 0, b'c')]
+        assert len(ring) == 0
+    finally:
+        ring.close()
+
+
+def test_shared_ring_buffer_attach_by_name():
+    ring = SharedRingBuffer(RECORD, 4)
+    other = SharedRingBuffer(RECORD, 4, name=ring.name, create=False)
+    try:
+        ring.put(7, 1, b'x')
+        assert other.drain(limit=1) == [(7, 1, b'x')]
+        assert len(ring) == 0
+    finally:
+        other.close()
+        ring.close()
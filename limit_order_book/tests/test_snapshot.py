@@ -0,0 +1,147 @@
+import pytest
+from src.algorithms.limit_order_book import LimitOrderBook
+from src.persistence.journal import Journal
+from src.persistence.snapshot import write_snapshot, load_snapshot, restore
+from src.replay.engine import replay
+from benchmarks.flow_generator import generate_flow, run, FlowGenerator
+
+
+def book_state(lob):
+    pool, ids = lob.pool, lob.order_status.ids
+    return (
+        [(price, [(ids[pool.order_ids[h]], pool.quantities[h])
+                  for h in level])
+         for book in (lob.buy_orders, lob.sell_orders)
+         for price, level in book.items()],
+        lob.depth(1000),
+        dict(lob.order_status),
+        sorted(lob.resting_ids()),
+    )
+
+
+@pytest.mark.parametrize("backend_kwargs", [
+    {},
+    {'backend': 'ladder', 'min_price': 9000, 'max_price': 11000},
+])
+def test_snapshot_round_trip(tmp_path, backend_kwargs):
+    path = str(tmp_path / 'book.snapshot')
+    lob = LimitOrderBook(log_events=False, **backend_kwargs)
+    run(lob, generate_flow(3000, seed=2))
+    write_snapshot(lob, path, seq=42)
+
+    restored = LimitOrderBook(log_events=False, **backend_kwargs)
+    assert load_snapshot(restored, path) == 42
+    assert book_state(restored) == book_state(lob)
+    restored.add_order("NEW", "buy", 11000, 10**6)
+    lob.add_order("NEW", "buy", 11000, 10**6)
+    assert list(restored.fills) == list(lob.fills)
+
+
+def test_snapshot_int_ids(tmp_path):
+    path = str(tmp_path / 'book.snapshot')
+    lob = LimitOrderBook(log_events=False)
+    lob.add_order(1, "buy", 20, 10)
+    lob.add_order(2, "sell", 20, 4)
+    write_snapshot(lob, path)
+    restored = LimitOrderBook(log_events=False)
+    load_snapshot(restored, path)
+    assert book_state(restored) == book_state(lob)
+
+
+def test_restore_replays_journal_tail(tmp_path):
+    snapshot_path = str(tmp_path / 'book.snapshot')
+    journal_path = str(tmp_path / 'book.journal')
+    flow = generate_flow(2000, seed=9)
+    lob = LimitOrderBook(log_events=False)
+    with Journal(journal_path, fsync_every=0) as journal:
+        lob.add_listener(journal)
+        run(lob, flow[:1500])
+        write_snapshot(lob, snapshot_path, seq=journal.seq)
+        run(lob, flow[1500:])
+
+    restored = LimitOrderBook(log_events=False)
+    restore(restored, snapshot_path, journal_path)
+    assert book_state(restored) == book_state(lob)
+
+    replayed = LimitOrderBook(log_events=False)
+    restore(replayed, journal_path=journal_path)
+    assert book_state(replayed) == book_state(lob)
+
+
+def test_restore_replays_amends(tmp_path):
+    journal_path = str(tmp_path / 'book.journal')
+    generator = FlowGenerator(seed=6, amend_ratio=0.5)
+    flow = generator.prefill(200) + [
+        message for _, message in generator.generate(2000)
+    ]
+    lob = LimitOrderBook(log_events=False)
+    with Journal(journal_path, fsync_every=0) as journal:
+        lob.add_listener(journal)
+        replay(lob, flow)
+    restored = LimitOrderBook(log_events=False)
+    restore(restored, journal_path=journal_path)
+    assert book_state(restored) == book_state(lob)
+
+
+def test_snapshot_and_journal_keep_deadlines(tmp_path):
+    snapshot_path = str(tmp_path / 'book.snapshot')
+    journal_path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(journal_path, fsync_every=0) as journal:
+        lob.add_listener(journal)
+        lob.add_order("G1", "buy", 20, 5, expire_at=100)
+        lob.add_order("G2", "buy", 21, 5, expire_at=200)
+        lob.expire(50)
+        write_snapshot(lob, snapshot_path, seq=journal.seq)
+        lob.add_order("G3", "sell", 30, 5, ttl=100)
+        lob.add_order("G4", "sell", 31, 5, ttl=110)
+        lob.expire(150)
+    assert lob.order_status["G1"] == lob.order_status["G3"] == 'expired'
+
+    for paths in ((snapshot_path, journal_path), (None, journal_path)):
+        restored = LimitOrderBook(log_events=False)
+        restore(restored, *paths)
+        assert book_state(restored) == book_state(lob)
+        assert restored.expiries == {
+            restored.key("G2"): 200, restored.key("G4"): 160
+        }
+        assert restored.expire(200) == ["G4", "G2"]
+
+
+def test_restore_keeps_book_time_without_expired_orders(tmp_path):
+    journal_path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(journal_path, fsync_every=0) as journal:
+        lob.add_listener(journal)
+        lob.add_order("G1", "buy", 20, 5, ttl=5000)
+        assert lob.expire(1000) == []
+        lob.add_order("G2", "buy", 21, 5, ttl=100)
+    restored = LimitOrderBook(log_events=False)
+    restore(restored, journal_path=journal_path)
+    assert restored.now == lob.now == 1000
+    assert restored.expiries == lob.expiries == {
+        lob.key("G1"): 5000, lob.key("G2"): 1100
+    }
+
+
+def test_snapshot_and_journal_keep_owners(tmp_path):
+    snapshot_path = str(tmp_path / 'book.snapshot')
+    journal_path = str(tmp_path / 'book.journal')
+    lob = LimitOrderBook(log_events=False)
+    with Journal(journal_path, fsync_every=0) as journal:
+        lob.add_listener(journal)
+        lob.add_order("A1", "buy", 20, 5, owner="alice")
+        lob.add_order("B1", "buy", 21, 5, owner="bob")
+        lob.add_order("X1", "sell", 30, 5)
+        write_snapshot(lob, snapshot_path, seq=journal.seq)
+        lob.add_order("A2", "sell", 31, 5, owner="alice")
+        lob.add_order("B2", "sell", 21, 2, owner="bob")
+
+    for paths in ((snapshot_path, journal_path), (None, journal_path)):
+        restored = LimitOrderBook(log_events=False)
+        restore(restored, *paths)
+        assert book_state(restored) == book_state(lob)
+        assert restored.owners == lob.owners
+        assert restored.mass_cancel(owner="alice") == ["A1", "A2"]
+        assert restored.mass_cancel(owner="bob") == ["B1"]
+        assert restored.resting_ids() == ["X1"]
@@ -0,0 +1,43 @@
+import random
+import pytest
+from src.data_structures.timer_wheel import TimerWheel
+
+
+@pytest.mark.parametrize("slot_bits,levels", [(2, 2), (3, 3), (8, 4)])
+def test_timer_wheel_matches_sorted_deadlines(slot_bits, levels):
+    rng = random.Random(slot_bits * 10 + levels)
+    wheel = TimerWheel(now=rng.randint(0, 1000), slot_bits=slot_bits,
+                       levels=levels)
+    pending = []
+    for step in range(3000):
+        if rng.random() < 0.6:
+            deadline = wheel.now + rng.choice(
+                (rng.randint(-5, 10), rng.randint(0, 300),
+                 rng.randint(0, 100_000))
+            )
+            wheel.schedule(deadline, step)
+            pending.append((deadline, step))
+        else:
+            now = wheel.now + rng.choice((0, 1, rng.randint(0, 5000)))
+            fired = wheel.advance(now)
+            due = sorted(timer for timer in pending if timer[0] <= now)
+            assert sorted(fired) == due
+            pending = [timer for timer in pending if timer[0] > now]
+            assert len(wheel) == len(pending)
+
+
+def test_timer_wheel_fires_in_deadline_order():
+    wheel = TimerWheel(slot_bits=4, levels=2)
+    for deadline in (300, 5, 17, 16, 5000, 250):
+        wheel.schedule(deadline, deadline)
+    assert wheel.advance(100) == [(5, 5), (16, 16), (17, 17)]
+    assert wheel.advance(10 ** 6) == [(250, 250), (300, 300), (5000, 5000)]
+    assert len(wheel) == 0
+    assert wheel.now == 10 ** 6
+
+
+def test_timer_wheel_skips_empty_time():
+    wheel = TimerWheel()
+    wheel.schedule(10 ** 12, 'far')
+    assert wheel.advance(10 ** 12 - 1) == []
+    assert wheel.advance(10 ** 12) == [(10 ** 12, 'far')]